@@ -62,16 +62,45 @@ macro(_rosbuild_list_find _list _item _idx)
     endforeach(_i)
 endmacro(_rosbuild_list_find)
 
-# Check validity of manifest.xml, to avoid esoteric build errors
+# Check validity of manifest.xml, to avoid esoteric build errors.
+# roslib.manifestcheck leaves a stamp under ROS_HOME for every valid
+# manifest; if the stamp is newer than the manifest, the check is
+# skipped. If the manifest has changed, only it is validated. If it has
+# no stamp yet while other packages have, all manifests on the package
+# path are validated in one invocation, so that the other packages
+# find their stamps.
 macro(_rosbuild_check_manifest)
-  execute_process(
-    COMMAND ${PYTHON_EXECUTABLE} -c "import roslib.manifest; roslib.manifest.parse_file('manifest.xml')"
-    OUTPUT_VARIABLE _manifest_error
-    ERROR_VARIABLE _manifest_error
-    RESULT_VARIABLE _manifest_failed
-    WORKING_DIRECTORY ${PROJECT_SOURCE_DIR}
-    OUTPUT_STRIP_TRAILING_WHITESPACE
-  )
+  set(_manifest_file ${PROJECT_SOURCE_DIR}/manifest.xml)
+  set(_manifest_stamp "")
+  if(NOT CMAKE_VERSION VERSION_LESS 2.8.7)
+    if(DEFINED ENV{ROS_HOME})
+      set(_ros_home $ENV{ROS_HOME})
+    else(DEFINED ENV{ROS_HOME})
+      set(_ros_home $ENV{HOME}/.ros)
+    endif(DEFINED ENV{ROS_HOME})
+    # same physical path as hashed by roslib.manifestcheck
+    get_filename_component(_manifest_realpath ${_manifest_file} REALPATH)
+    string(SHA1 _manifest_hash "${_manifest_realpath}")
+    set(_manifest_stamp ${_ros_home}/roslib_manifest_check/${_manifest_hash})
+  endif(NOT CMAKE_VERSION VERSION_LESS 2.8.7)
+  set(_manifest_failed 0)
+  set(_manifest_check_args ${_manifest_file})
+  if(_manifest_stamp)
+    get_filename_component(_manifest_stamp_dir ${_manifest_stamp} PATH)
+    if(IS_DIRECTORY ${_manifest_stamp_dir} AND NOT EXISTS ${_manifest_stamp})
+      set(_manifest_check_args --all ${_manifest_file})
+    endif(IS_DIRECTORY ${_manifest_stamp_dir} AND NOT EXISTS ${_manifest_stamp})
+  endif(_manifest_stamp)
+  if(NOT _manifest_stamp OR "${_manifest_file}" IS_NEWER_THAN "${_manifest_stamp}")
+    execute_process(
+      COMMAND ${PYTHON_EXECUTABLE} -c "import sys, roslib.manifestcheck; sys.exit(roslib.manifestcheck.main())" ${_manifest_check_args}
+      OUTPUT_VARIABLE _manifest_error
+      ERROR_VARIABLE _manifest_error
+      RESULT_VARIABLE _manifest_failed
+      WORKING_DIRECTORY ${PROJECT_SOURCE_DIR}
+      OUTPUT_STRIP_TRAILING_WHITESPACE
+    )
+  endif(NOT _manifest_stamp OR "${_manifest_file}" IS_NEWER_THAN "${_manifest_stamp}")
   if(_manifest_failed)
     message("[rosbuild] Error from syntax check of ${PROJECT_NAME}/manifest.xml")
     message("${_manifest_error}")
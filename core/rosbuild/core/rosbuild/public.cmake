@@ -752,14 +752,22 @@ macro(rosbuild_get_srvs srvvar)
   endforeach(_srv)
 endmacro(rosbuild_get_srvs)
 
-# Compute msg/srv depenendency list, with simple caching
+# Compute msg/srv depenendency list, with simple caching.  If
+# ROSBUILD_GENDEPS_SERVER is set, in CMake or in the environment, the
+# dependencies are requested from a persistent gendeps server, which is
+# started on demand and keeps its state warm across calls.
 macro(rosbuild_gendeps _pkg _msgfile)
   # Did we already compute it?
   if(NOT ${_pkg}_${_msgfile}_GENDEPS_COMPUTED)
+    if(ROSBUILD_GENDEPS_SERVER OR "$ENV{ROSBUILD_GENDEPS_SERVER}")
+      set(_gendeps ${gendeps_client_exe})
+    else()
+      set(_gendeps ${gendeps_exe})
+    endif()
     # Call out to the gendeps tool to get full paths to .msg files on
     # which this one depends, for proper dependency tracking
     execute_process(
-      COMMAND ${gendeps_exe} ${_input}
+      COMMAND ${_gendeps} ${_input}
       OUTPUT_VARIABLE __other_msgs
       ERROR_VARIABLE __rospack_err_ignore
       OUTPUT_STRIP_TRAILING_WHITESPACE)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark for roslib.depgraph. Compares the in-process dependency
+graph with the rospack/rosstack subprocesses that roslib.rospack used
+to spawn for every query. The public roslib.rospack wrappers are timed
+as well, as they include the validation of the cached graph.
+
+Usage: bench_depgraph.py [options]
+
+A synthetic workspace is generated (see bench_workspace.py). The
+subprocess versions are only timed if rospack and rosstack are on the
+PATH.
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import roslib.depgraph
+import roslib.manifestcache
+import roslib.rospack
+
+QUERIES = ['deps1', 'deps', 'depends-on1', 'depends-on']
+STACK_QUERIES = ['depends1', 'depends', 'depends-on1', 'depends-on']
+
+# query name -> DependencyGraph method
+_METHODS = {'deps1': 'deps1', 'deps': 'deps', 'depends1': 'deps1', 'depends': 'deps',
+            'depends-on1': 'depends_on1', 'depends-on': 'depends_on'}
+# (command, query name) -> roslib.rospack wrapper
+_WRAPPERS = {('rospack', 'deps1'): 'rospack_depends_1', ('rospack', 'deps'): 'rospack_depends',
+             ('rospack', 'depends-on1'): 'rospack_depends_on_1', ('rospack', 'depends-on'): 'rospack_depends_on',
+             ('rosstack', 'depends1'): 'rosstack_depends_1', ('rosstack', 'depends'): 'rosstack_depends',
+             ('rosstack', 'depends-on1'): 'rosstack_depends_on_1', ('rosstack', 'depends-on'): 'rosstack_depends_on'}
+
+def _which(name):
+    for d in os.environ.get('PATH', '').split(os.pathsep):
+        if os.path.isfile(os.path.join(d, name)):
+            return True
+    return False
+
+def _time_queries(fn, names):
+    start = time.time()
+    for name in names:
+        fn(name)
+    return (time.time() - start) / len(names)
+
+def _subprocess_fn(command, query):
+    def fn(name):
+        subprocess.Popen([command, query, name], stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()
+    return fn
+
+def _report(label, t, base=None):
+    if base:
+        print("  %-24s %12.2fus %10.1fx"%(label, t * 1e6, base / t))
+    else:
+        print("  %-24s %12.2fus"%(label, t * 1e6))
+
+def bench_main(argv=sys.argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-n", "--packages",
+                      dest="packages", default=2000, type="int",
+                      help="Number of packages of generated workspace (default 2000)")
+    parser.add_option("-g", "--graph",
+                      dest="graph", default="random",
+                      help="Shape of the dependency graph (default random)")
+    parser.add_option("-q", "--queries",
+                      dest="queries", default=100, type="int",
+                      help="Number of queries per command (default 100)")
+    parser.add_option("--no-rospack",
+                      dest="rospack", default=True, action="store_false",
+                      help="Do not time the rospack and rosstack subprocesses")
+    (options, args) = parser.parse_args(argv[1:])
+
+    import bench_workspace
+    tmp = tempfile.mkdtemp(prefix='roslib_bench_')
+    try:
+        ws = bench_workspace.generate_workspace(tmp, packages=options.packages, graph=options.graph)
+        os.environ.update(ws['env'])
+        env = ws['env']
+        step = max(1, len(ws['packages']) // options.queries)
+        packages = ws['packages'][::step][:options.queries]
+        stacks = ws['stacks']
+
+        for label, load in [('package graph', roslib.depgraph.load_package_graph),
+                            ('stack graph', roslib.depgraph.load_stack_graph)]:
+            roslib.manifestcache.clear()
+            start = time.time()
+            load(env['ROS_ROOT'], env['ROS_PACKAGE_PATH'])
+            cold = time.time() - start
+            start = time.time()
+            load(env['ROS_ROOT'], env['ROS_PACKAGE_PATH'])
+            print("%s: %.3fs cold, %.3fs with manifest cache"%(label, cold, time.time() - start))
+
+        for command, queries, names, load in [
+            ('rospack', QUERIES, packages, roslib.depgraph.load_package_graph),
+            ('rosstack', STACK_QUERIES, stacks, roslib.depgraph.load_stack_graph)]:
+            if not names:
+                continue
+            run_subprocess = options.rospack and _which(command)
+            print("%s, %s names"%(command, len(names)))
+            for query in queries:
+                # a fresh graph per query, so that memoization is included
+                graph = load(env['ROS_ROOT'], env['ROS_PACKAGE_PATH'])
+                t = _time_queries(getattr(graph, _METHODS[query]), names)
+                base = None
+                if run_subprocess:
+                    base = _time_queries(_subprocess_fn(command, query), names)
+                    _report('%s %s'%(command, query), base)
+                _report('depgraph %s'%query, t, base)
+                wrapper = getattr(roslib.rospack, _WRAPPERS[(command, query)])
+                # warm up the cached graph/index of the environment
+                wrapper(names[0])
+                _report(_WRAPPERS[(command, query)], _time_queries(wrapper, names), base)
+            if not run_subprocess:
+                print("  (%s subprocess not timed)"%command)
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    bench_main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark for roslib.packages.get_pkg_dir. Compares the in-process
+package locator and the binary package index against spawning
+'rospack find' for every lookup.
+
+Usage: bench_get_pkg_dir.py [options] [packages...]
+
+If no packages are specified, all packages on the current
+ROS_PACKAGE_PATH are looked up.
+"""
+
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import time
+
+import roslib.packages
+
+def _time(fn, packages, repeat):
+    start = time.time()
+    for i in range(repeat):
+        for p in packages:
+            fn(p)
+    return time.time() - start
+
+def _rospack_find(package):
+    subprocess.Popen(['rospack', 'find', package], stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()
+
+def _get_pkg_dir(package):
+    roslib.packages.get_pkg_dir(package, required=False)
+
+def _cold_crawl(package):
+    roslib.packages._pkg_locators.clear()
+    env = os.environ
+    roslib.packages._get_pkg_locator(env.get(roslib.packages.ROS_ROOT, None),
+                                     env.get(roslib.packages.ROS_PACKAGE_PATH, None)).find(package)
+
+def _cold_index(package):
+    roslib.packages._pkg_indexes.clear()
+    roslib.packages.get_pkg_dir(package, required=False)
+
+def bench_main(argv=sys.argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options] [packages...]")
+    parser.add_option("-r", "--repeat",
+                      dest="repeat", default=3, type="int",
+                      help="Number of times to look up each package")
+    parser.add_option("--no-rospack",
+                      dest="rospack", default=True, action="store_false",
+                      help="Do not benchmark the rospack subprocess")
+    (options, args) = parser.parse_args(argv[1:])
+
+    packages = args
+    if not packages:
+        env = os.environ
+        packages = roslib.packages._get_pkg_locator(env.get(roslib.packages.ROS_ROOT, None),
+                                                    env.get(roslib.packages.ROS_PACKAGE_PATH, None)).list()
+    if not packages:
+        parser.error("no packages to look up, please check ROS_PACKAGE_PATH")
+    count = len(packages) * options.repeat
+    print("%s lookups of %s packages"%(count, len(packages)))
+
+    results = [('crawl (cold)', _time(_cold_crawl, packages, options.repeat)),
+               ('binary index (cold)', _time(_cold_index, packages, options.repeat)),
+               ('get_pkg_dir (warm)', _time(_get_pkg_dir, packages, options.repeat))]
+    if options.rospack:
+        try:
+            results.append(('rospack find', _time(_rospack_find, packages, options.repeat)))
+        except OSError as e:
+            print("cannot run rospack: %s"%e, file=sys.stderr)
+    for name, t in results:
+        print("%-20s %10.3fs total %10.1fus/lookup"%(name, t, t / count * 1e6))
+
+if __name__ == '__main__':
+    bench_main()
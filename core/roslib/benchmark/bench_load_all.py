@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark for roslib.manifest.load_all. Shows how parsing all
+manifests of a workspace scales with the number of processes.
+
+Usage: bench_load_all.py [options] [directories...]
+
+If no directories are specified, a synthetic workspace is generated
+(see bench_workspace.py). The manifest cache is disabled unless
+--cache is specified, so that parsing is measured.
+"""
+
+from __future__ import print_function
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import roslib.crawler
+import roslib.manifest
+import roslib.manifestcache
+
+def _process_counts(max_processes):
+    counts = []
+    n = 1
+    while n < max_processes:
+        counts.append(n)
+        n *= 2
+    counts.append(max_processes)
+    return counts
+
+def bench_main(argv=sys.argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options] [directories...]")
+    parser.add_option("-n", "--packages",
+                      dest="packages", default=5000, type="int",
+                      help="Number of packages of generated workspace (default 5000)")
+    parser.add_option("-j", "--max-processes",
+                      dest="max_processes", default=multiprocessing.cpu_count(), type="int",
+                      help="Maximum number of processes (default: number of CPUs)")
+    parser.add_option("-r", "--repeat",
+                      dest="repeat", default=3, type="int",
+                      help="Number of runs per process count, the best is reported")
+    parser.add_option("--cache",
+                      dest="cache", default=False, action="store_true",
+                      help="Use the manifest cache")
+    (options, args) = parser.parse_args(argv[1:])
+
+    if not options.cache:
+        os.environ[roslib.manifestcache.NO_CACHE] = '1'
+    tmp = None
+    dirs = args
+    if not dirs:
+        import bench_workspace
+        tmp = tempfile.mkdtemp(prefix='roslib_bench_')
+        ws = bench_workspace.generate_workspace(tmp, packages=options.packages)
+        dirs = ws['paths']
+    try:
+        pkg_dirs = []
+        for result in roslib.crawler.crawl(dirs):
+            pkg_dirs.extend(result.packages.values())
+        if not pkg_dirs:
+            parser.error("no packages found")
+        print("%s packages, %s CPUs"%(len(pkg_dirs), multiprocessing.cpu_count()))
+
+        base = None
+        for processes in _process_counts(options.max_processes):
+            times = []
+            for i in range(options.repeat):
+                roslib.manifestcache.clear()
+                start = time.time()
+                manifests, errors = roslib.manifest.load_all(pkg_dirs, processes=processes)
+                times.append(time.time() - start)
+            t = min(times)
+            if base is None:
+                base = t
+            print("%3s processes %10.3fs %8.2fx %s errors"%(processes, t, base / t, len(errors)))
+    finally:
+        if tmp:
+            shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    bench_main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark for roslib.manifestlib.parse. Compares the single-pass
+expat parser against building a DOM (parse_dom).
+
+Usage: bench_manifest_parse.py [options] [files/directories...]
+
+If no files are specified, the manifests of all packages and stacks
+on the current ROS_PACKAGE_PATH are parsed.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import roslib.manifest
+import roslib.manifestlib
+import roslib.packages
+import roslib.stack_manifest
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+FIELDS = ['description', 'brief', 'author', 'license', 'license_url', 'url',
+          'depends', 'rosdeps', 'platforms', 'logo', 'exports', 'version',
+          'versioncontrol', 'status', 'notes', 'unknown_tags', '_type']
+
+def _find_manifests(paths):
+    import roslib.crawler
+    files = []
+    for result in roslib.crawler.crawl(paths):
+        for d in result.packages.values():
+            f = os.path.join(d, roslib.manifest.MANIFEST_FILE)
+            if os.path.isfile(f):
+                files.append((roslib.manifest.Manifest, f))
+        for d in result.stacks.values():
+            files.append((roslib.stack_manifest.StackManifest, os.path.join(d, roslib.stack_manifest.STACK_FILE)))
+    return files
+
+def _load(files):
+    texts = []
+    for cls, f in files:
+        with open(f) as fh:
+            texts.append((cls, f, fh.read()))
+    return texts
+
+def _parse_all(parse, texts):
+    results = []
+    for cls, f, text in texts:
+        try:
+            results.append(parse(cls(), text, f))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def _time(parse, texts, repeat):
+    start = time.time()
+    for i in range(repeat):
+        _parse_all(parse, texts)
+    return time.time() - start
+
+def _peak_memory(parse, texts):
+    """
+    @return: peak memory allocated while parsing a single manifest,
+    in bytes, or None if tracemalloc is not available
+    """
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        for cls, f, text in texts:
+            try:
+                parse(cls(), text, f)
+            except Exception:
+                pass
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+def _value(v):
+    if isinstance(v, list):
+        return [_value(x) for x in v]
+    elif hasattr(v, 'toxml'):
+        return v.toxml()
+    elif hasattr(v, 'xml'):
+        return v.__class__, v.xml()
+    return v
+
+def _same(a, b):
+    if isinstance(a, Exception) or isinstance(b, Exception):
+        return type(a) == type(b) and str(a) == str(b)
+    for k in FIELDS:
+        if _value(getattr(a, k)) != _value(getattr(b, k)):
+            return False
+    return True
+
+def bench_main(argv=sys.argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options] [files/directories...]")
+    parser.add_option("-r", "--repeat",
+                      dest="repeat", default=10, type="int",
+                      help="Number of times to parse each manifest")
+    (options, args) = parser.parse_args(argv[1:])
+
+    files = []
+    dirs = []
+    for a in args:
+        if os.path.isdir(a):
+            dirs.append(a)
+        elif os.path.basename(a) == roslib.stack_manifest.STACK_FILE:
+            files.append((roslib.stack_manifest.StackManifest, a))
+        else:
+            files.append((roslib.manifest.Manifest, a))
+    if not args:
+        env = os.environ
+        dirs = roslib.packages._get_pkg_locator(env.get(roslib.packages.ROS_ROOT, None),
+                                                env.get(roslib.packages.ROS_PACKAGE_PATH, None)).paths
+    files.extend(_find_manifests(dirs))
+    if not files:
+        parser.error("no manifests to parse")
+    texts = _load(files)
+    print("%s parses of %s manifests"%(len(texts) * options.repeat, len(texts)))
+
+    mismatches = [f for (cls, f, t), a, b in zip(texts, _parse_all(roslib.manifestlib.parse_dom, texts),
+                                                _parse_all(roslib.manifestlib.parse, texts)) if not _same(a, b)]
+    for f in mismatches:
+        print("results differ for %s"%f, file=sys.stderr)
+
+    for name, parse in [('dom', roslib.manifestlib.parse_dom), ('expat', roslib.manifestlib.parse)]:
+        t = _time(parse, texts, options.repeat)
+        mem = _peak_memory(parse, texts)
+        print("%-6s %10.3fs total %10.1fus/manifest %10s KB peak/manifest"%(
+            name, t, t / (len(texts) * options.repeat) * 1e6, mem // 1024 if mem is not None else '-'))
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    bench_main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark for roslib.gentools.compute_md5 on synthetic message type
+graphs. The types are arranged in layers; every type embeds types of
+the next layer, so that types deep in the graph are reachable along
+many paths. Compares the md5 computation with and without the md5
+memo table of the registry, and checks that both agree.
+
+Usage: bench_md5.py [options]
+"""
+
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+import rospkg
+
+import roslib.gentools
+import roslib.msgs
+
+HEADER_MSG = 'uint32 seq\ntime stamp\nstring frame_id\n'
+
+class _NoMemo(dict):
+    """
+    md5 memo table that never remembers anything
+    """
+    def __setitem__(self, key, value):
+        pass
+
+def generate_types(depth, width, fields, seed=0):
+    """
+    @return: text of synthetic .msg files by type name. Each type of
+    layer i has a Header, some builtin fields and fields of types of
+    layer i+1.
+    @rtype: {str: str}
+    """
+    rand = random.Random(seed)
+    types = {}
+    for layer in range(depth):
+        for i in range(width):
+            lines = ['Header header', 'int32 x', 'float64[] y']
+            if layer + 1 < depth:
+                for j in range(fields):
+                    t = 'bench_msgs/L%sT%s'%(layer + 1, rand.randrange(width))
+                    if rand.random() < 0.2:
+                        t += '[]'
+                    lines.append('%s f%s'%(t, j))
+            types['bench_msgs/L%sT%s'%(layer, i)] = '\n'.join(lines) + '\n'
+    return types
+
+def create_registry(types):
+    """
+    @return: initialized registry with the types registered
+    @rtype: L{roslib.msgs.MsgRegistry}
+    """
+    registry = roslib.msgs.MsgRegistry()
+    header = roslib.msgs.load_from_string(HEADER_MSG, '', 'std_msgs/Header', 'Header')
+    for k in [roslib.msgs.HEADER, 'std_msgs/Header', 'roslib/Header']:
+        registry.register(k, header)
+    for k, spec in roslib.msgs.EXTENDED_BUILTINS.items():
+        registry.register(k, spec)
+    registry.initialized = True
+    for name, text in types.items():
+        registry.register(name, roslib.msgs.load_from_string(text, 'bench_msgs', name, name.split('/')[1]))
+    return registry
+
+def compute_md5s(registry, names, rospack):
+    md5s = {}
+    for name in names:
+        spec = registry.get_registered(name)
+        deps = roslib.gentools.get_dependencies(spec, 'bench_msgs', compute_files=False,
+                                                rospack=rospack, registry=registry)
+        md5s[name] = roslib.gentools.compute_md5(deps, rospack, registry=registry)
+    return md5s
+
+def bench_main(argv=sys.argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-d", "--depth",
+                      dest="depth", default=6, type="int",
+                      help="Number of layers of the type graph (default 6)")
+    parser.add_option("-w", "--width",
+                      dest="width", default=8, type="int",
+                      help="Number of types per layer (default 8)")
+    parser.add_option("-f", "--fields",
+                      dest="fields", default=3, type="int",
+                      help="Number of embedded types per type (default 3)")
+    parser.add_option("-r", "--repeat",
+                      dest="repeat", default=3, type="int",
+                      help="Number of runs per mode, the best is reported")
+    (options, args) = parser.parse_args(argv[1:])
+
+    types = generate_types(options.depth, options.width, options.fields)
+    # md5 of every top-level type
+    names = ['bench_msgs/L0T%s'%i for i in range(options.width)]
+    rospack = rospkg.RosPack()
+    print("%s types, %s layers, %s embedded types per type"%(len(types), options.depth, options.fields))
+
+    results = {}
+    base = None
+    for label, memo in [('no memo', False), ('memo', True)]:
+        times = []
+        for i in range(options.repeat):
+            registry = create_registry(types)
+            if not memo:
+                registry.md5s = _NoMemo()
+            start = time.time()
+            results[memo] = compute_md5s(registry, names, rospack)
+            times.append(time.time() - start)
+        t = min(times)
+        if base is None:
+            base = t
+        print("%-10s %8.3fs %8.2fx"%(label, t, base / t))
+
+    if results[False] != results[True]:
+        print("ERROR: md5 sums differ")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(bench_main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark for roslib.msgs.load_from_string. Compares the parse
+throughput of the regular expression based parser with the
+line-by-line reference parser on a synthetic .msg corpus, and checks
+that both produce the same MsgSpec instances.
+
+Usage: bench_msg_parse.py [options]
+"""
+
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+import roslib.msgs
+
+FIELD_TYPES = ['int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32', 'int64', 'uint64',
+               'float32', 'float64', 'string', 'bool', 'time', 'duration', 'Header']
+CONSTANT_TYPES = ['int32', 'uint8', 'float64', 'string']
+
+def generate_corpus(messages, fields, seed=0):
+    """
+    @return: text of synthetic .msg files, which declare fields of
+    builtin types, of other messages in the corpus and arrays thereof,
+    with some constants and comments
+    @rtype: [str]
+    """
+    rand = random.Random(seed)
+    corpus = []
+    for i in range(messages):
+        lines = ['# Message %s of a synthetic corpus'%i]
+        for j in range(fields):
+            r = rand.random()
+            if r < 0.05:
+                t = rand.choice(CONSTANT_TYPES)
+                lines.append('%s CONST_%s=%s'%(t, j, 'value %s'%j if t == 'string' else j))
+                continue
+            if r < 0.6:
+                t = rand.choice(FIELD_TYPES)
+            elif r < 0.8:
+                t = 'Msg%s'%rand.randrange(messages)
+            else:
+                t = 'other_msgs/Msg%s'%rand.randrange(messages)
+            if rand.random() < 0.2:
+                t += rand.choice(['[]', '[%s]'%rand.randrange(1, 16)])
+            line = '%s field_%s'%(t, j)
+            if rand.random() < 0.2:
+                line += '  # field %s'%j
+            lines.append(line)
+        corpus.append('\n'.join(lines) + '\n')
+    return corpus
+
+def _parse(corpus, fast):
+    return [roslib.msgs._load_from_string(text, 'bench_msgs', fast=fast) for text in corpus]
+
+def _same(a, b):
+    return a == b and a.package == b.package and \
+        [repr(f) for f in a.parsed_fields()] == [repr(f) for f in b.parsed_fields()]
+
+def bench_main(argv=sys.argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-n", "--messages",
+                      dest="messages", default=2000, type="int",
+                      help="Number of messages of the corpus (default 2000)")
+    parser.add_option("-f", "--fields",
+                      dest="fields", default=30, type="int",
+                      help="Number of declarations per message (default 30)")
+    parser.add_option("-r", "--repeat",
+                      dest="repeat", default=3, type="int",
+                      help="Number of runs per parser, the best is reported")
+    (options, args) = parser.parse_args(argv[1:])
+
+    corpus = generate_corpus(options.messages, options.fields)
+    lines = sum([text.count('\n') for text in corpus])
+    size = sum([len(text) for text in corpus])
+    print("%s messages, %s lines, %.1f MB"%(len(corpus), lines, size / 1e6))
+
+    results = {}
+    base = None
+    for label, fast in [('reference', False), ('fast', True)]:
+        times = []
+        for i in range(options.repeat):
+            start = time.time()
+            results[fast] = _parse(corpus, fast)
+            times.append(time.time() - start)
+        t = min(times)
+        if base is None:
+            base = t
+        print("%-10s %8.3fs %10.0f lines/s %8.2fx"%(label, t, lines / t, base / t))
+
+    different = [i for i, (a, b) in enumerate(zip(results[False], results[True])) if not _same(a, b)]
+    if different:
+        print("ERROR: %s messages parsed differently, e.g. message %s"%(len(different), different[0]))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(bench_main())
@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark harness for the roslib package and stack lookup APIs that
+dominate tool startup. A synthetic workspace is generated and the
+cold and warm performance of each API is recorded in a JSON report,
+which can be compared across commits.
+
+Usage: bench_workspace.py [options]
+
+Each API is run in a fresh process. The cold run starts with empty
+in-process and on-disk (ROS_HOME) caches, the warm run repeats the
+same calls in the same process. For each run the wall time, the
+number of stat and directory listing calls made from Python and the
+peak RSS of the process are recorded.
+"""
+
+from __future__ import print_function
+
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+GRAPHS = ['none', 'chain', 'tree', 'wide', 'random']
+
+def _write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+def _dependencies(i, graph, fanout, rand):
+    """
+    @return: indices of the packages that package i depends on. Only
+    lower indices are returned, so that the graph is acyclic.
+    @rtype: [int]
+    """
+    if i == 0 or graph == 'none':
+        return []
+    elif graph == 'chain':
+        return [i - 1]
+    elif graph == 'tree':
+        return [(i - 1) // fanout]
+    elif graph == 'wide':
+        return list(range(min(i, fanout)))
+    elif graph == 'random':
+        return sorted(rand.sample(range(i), min(i, fanout)))
+    raise ValueError("unknown graph shape [%s]"%graph)
+
+def _nesting(i, depth, width=10):
+    """
+    @return: relative directory path of package i for the given nesting depth
+    @rtype: str
+    """
+    parts = []
+    for level in range(depth):
+        parts.append('d%s_%s'%(level, i % width))
+        i //= width
+    return os.path.join(*parts) if parts else ''
+
+def generate_workspace(root, packages=1000, depth=2, stacks=10, symlinks=0,
+                       graph='tree', fanout=3, paths=1, seed=0):
+    """
+    Generate a synthetic workspace.
+
+    @param root: directory to generate the workspace in
+    @type  root: str
+    @param packages: number of packages
+    @type  packages: int
+    @param depth: number of directory levels above each package
+    @type  depth: int
+    @param stacks: number of stacks. Packages are distributed evenly
+    among stacks, every package is in a stack if stacks > 0.
+    @type  stacks: int
+    @param symlinks: number of packages that are created outside of
+    the package path and symlinked into it
+    @type  symlinks: int
+    @param graph: shape of the dependency graph, one of L{GRAPHS}
+    @type  graph: str
+    @param fanout: dependencies per package ('wide', 'random') or
+    children per package ('tree')
+    @type  fanout: int
+    @param paths: number of ROS_PACKAGE_PATH entries
+    @type  paths: int
+    @return: workspace description: environment and package, stack
+    and node names
+    @rtype: dict
+    """
+    rand = random.Random(seed)
+    ros_root = os.path.join(root, 'ros')
+    ros_home = os.path.join(root, 'ros_home')
+    external = os.path.join(root, 'external')
+    path_dirs = [os.path.join(root, 'path%s'%p) for p in range(paths)]
+    for d in [ros_root, ros_home, external] + path_dirs:
+        os.makedirs(d)
+
+    names = ['pkg_%05d'%i for i in range(packages)]
+    stack_names = ['stack_%03d'%s for s in range(stacks)]
+    symlinked = set(rand.sample(range(packages), min(symlinks, packages)))
+    for i, name in enumerate(names):
+        base = path_dirs[i % paths]
+        if stacks:
+            stack = stack_names[i % stacks]
+            base = os.path.join(base, stack)
+            if not os.path.exists(os.path.join(base, 'stack.xml')):
+                os.makedirs(base)
+                _write(os.path.join(base, 'stack.xml'),
+                       '<stack>\n  <description>%s</description>\n  <version>1.0.%s</version>\n</stack>\n'%(stack, i % stacks))
+        pkg_dir = os.path.join(base, _nesting(i, depth), name)
+        if i in symlinked:
+            target = os.path.join(external, name)
+            if not os.path.isdir(os.path.dirname(pkg_dir)):
+                os.makedirs(os.path.dirname(pkg_dir))
+            os.symlink(target, pkg_dir)
+            pkg_dir = target
+        os.makedirs(os.path.join(pkg_dir, 'nodes'))
+        depends = ''.join(['  <depend package="%s"/>\n'%names[d] for d in _dependencies(i, graph, fanout, rand)])
+        _write(os.path.join(pkg_dir, 'manifest.xml'),
+               '<package>\n  <description brief="%s">%s</description>\n  <license>BSD</license>\n%s</package>\n'%(name, name, depends))
+        node = os.path.join(pkg_dir, 'nodes', name + '_node')
+        _write(node, '#!/bin/sh\n')
+        os.chmod(node, 0o755)
+
+    return {
+        'env': {'ROS_ROOT': ros_root,
+                'ROS_PACKAGE_PATH': os.pathsep.join(path_dirs),
+                'ROS_HOME': ros_home},
+        'paths': path_dirs,
+        'packages': names,
+        'stacks': stack_names,
+        }
+
+class StatCounter(object):
+    """
+    Count stat and directory listing calls made from Python by
+    wrapping the os functions. Calls made from C, e.g. by
+    os.DirEntry.is_dir(), are not counted.
+    """
+
+    def __init__(self):
+        self.stat = 0
+        self.listdir = 0
+        self._saved = []
+
+    def _wrap(self, module, name, counter):
+        fn = getattr(module, name, None)
+        if fn is None:
+            return
+        def wrapper(*args, **kwds):
+            setattr(self, counter, getattr(self, counter) + 1)
+            return fn(*args, **kwds)
+        self._saved.append((module, name, fn))
+        setattr(module, name, wrapper)
+
+    def __enter__(self):
+        import roslib.crawler
+        self._wrap(os, 'stat', 'stat')
+        self._wrap(os, 'lstat', 'stat')
+        self._wrap(os, 'listdir', 'listdir')
+        self._wrap(os, 'scandir', 'listdir')
+        self._wrap(roslib.crawler, 'scandir', 'listdir')
+        return self
+
+    def __exit__(self, *args):
+        for module, name, fn in reversed(self._saved):
+            setattr(module, name, fn)
+        self._saved = []
+
+def _sample(names, count, seed):
+    if count >= len(names):
+        return list(names)
+    return random.Random(seed).sample(names, count)
+
+def _bench_get_pkg_dir(ws, options):
+    import roslib.packages
+    for p in _sample(ws['packages'], options.lookups, options.seed):
+        roslib.packages.get_pkg_dir(p)
+
+def _bench_list_pkgs_by_path(ws, options):
+    import roslib.packages
+    cache = {}
+    for p in ws['paths']:
+        roslib.packages.list_pkgs_by_path(p, cache=cache)
+
+def _bench_list_stacks_by_path(ws, options):
+    import roslib.stacks
+    cache = {}
+    for p in ws['paths']:
+        roslib.stacks.list_stacks_by_path(p, cache=cache)
+
+def _bench_stack_of(ws, options):
+    import roslib.stacks
+    for p in _sample(ws['packages'], options.lookups, options.seed):
+        roslib.stacks.stack_of(p)
+
+def _bench_expand_to_packages(ws, options):
+    import roslib.stacks
+    names = _sample(ws['stacks'], options.lookups, options.seed) + \
+        _sample(ws['packages'], options.lookups, options.seed)
+    roslib.stacks.expand_to_packages(names)
+
+def _bench_find_resource(ws, options):
+    import roslib.packages
+    for p in _sample(ws['packages'], options.lookups, options.seed):
+        roslib.packages.find_resource(p, p + '_node')
+
+CASES = [
+    ('get_pkg_dir', _bench_get_pkg_dir),
+    ('list_pkgs_by_path', _bench_list_pkgs_by_path),
+    ('list_stacks_by_path', _bench_list_stacks_by_path),
+    ('stack_of', _bench_stack_of),
+    ('expand_to_packages', _bench_expand_to_packages),
+    ('find_resource', _bench_find_resource),
+    ]
+
+def _clear_ros_home(ros_home):
+    for f in os.listdir(ros_home):
+        path = os.path.join(ros_home, f)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+def _peak_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on OS X, kilobytes elsewhere
+    if sys.platform == 'darwin':
+        rss //= 1024
+    return rss
+
+def _run_case(name, ws, options, queue):
+    """
+    Run the cold and warm runs of a benchmark case in the current
+    process and put the results on queue.
+    """
+    try:
+        os.environ.update(ws['env'])
+        fn = dict(CASES)[name]
+        results = []
+        for run in ['cold', 'warm']:
+            with StatCounter() as counter:
+                start = time.time()
+                fn(ws, options)
+                wall_time = time.time() - start
+            results.append({'api': name,
+                            'run': run,
+                            'wall_time': wall_time,
+                            'stat_calls': counter.stat,
+                            'listdir_calls': counter.listdir,
+                            'peak_rss_kb': _peak_rss_kb()})
+        queue.put((results, None))
+    except Exception as e:
+        queue.put((None, '%s: %s'%(e.__class__.__name__, e)))
+
+def run_benchmarks(ws, options, cases=None):
+    """
+    Run benchmark cases, each one in a fresh process.
+    @return: results of the cold and warm runs of each case
+    @rtype: [dict]
+    """
+    results = []
+    for name, _ in CASES:
+        if cases and name not in cases:
+            continue
+        _clear_ros_home(ws['env']['ROS_HOME'])
+        queue = multiprocessing.Queue()
+        p = multiprocessing.Process(target=_run_case, args=(name, ws, options, queue))
+        p.start()
+        case_results, error = queue.get()
+        p.join()
+        if error:
+            print("%s failed: %s"%(name, error), file=sys.stderr)
+            results.append({'api': name, 'error': error})
+            continue
+        for r in case_results:
+            print("%-20s %-5s %10.3fs %8s stat %8s listdir %8s KB"%(
+                r['api'], r['run'], r['wall_time'], r['stat_calls'], r['listdir_calls'], r['peak_rss_kb']))
+        results.extend(case_results)
+    return results
+
+def _revision():
+    import subprocess
+    try:
+        p = subprocess.Popen(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out = p.communicate()[0]
+        if p.returncode == 0:
+            return out.decode().strip()
+    except OSError:
+        pass
+    return None
+
+def bench_main(argv=sys.argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options] [apis...]")
+    parser.add_option("-n", "--packages",
+                      dest="packages", default=1000, type="int",
+                      help="Number of packages (default 1000)")
+    parser.add_option("--depth",
+                      dest="depth", default=2, type="int",
+                      help="Directory levels above each package (default 2)")
+    parser.add_option("--stacks",
+                      dest="stacks", default=10, type="int",
+                      help="Number of stacks, 0 for no stacks (default 10)")
+    parser.add_option("--symlinks",
+                      dest="symlinks", default=0, type="int",
+                      help="Number of symlinked packages (default 0)")
+    parser.add_option("--graph",
+                      dest="graph", default="tree", type="choice", choices=GRAPHS,
+                      help="Dependency graph shape: %s (default tree)"%', '.join(GRAPHS))
+    parser.add_option("--fanout",
+                      dest="fanout", default=3, type="int",
+                      help="Dependency graph fanout (default 3)")
+    parser.add_option("--paths",
+                      dest="paths", default=1, type="int",
+                      help="Number of ROS_PACKAGE_PATH entries (default 1)")
+    parser.add_option("--lookups",
+                      dest="lookups", default=100, type="int",
+                      help="Number of packages/stacks to look up per run (default 100)")
+    parser.add_option("--seed",
+                      dest="seed", default=0, type="int",
+                      help="Random seed")
+    parser.add_option("-w", "--workspace",
+                      dest="workspace", default=None,
+                      help="Generate the workspace in this (non-existent) directory and keep it")
+    parser.add_option("-o", "--output",
+                      dest="output", default=None,
+                      help="Write JSON report to file")
+    (options, args) = parser.parse_args(argv[1:])
+
+    for a in args:
+        if a not in dict(CASES):
+            parser.error("unknown api [%s], must be one of %s"%(a, ', '.join([n for n, _ in CASES])))
+
+    root = options.workspace or tempfile.mkdtemp(prefix='roslib_bench_')
+    config = dict([(k, getattr(options, k)) for k in ['packages', 'depth', 'stacks', 'symlinks', 'graph', 'fanout', 'paths', 'lookups', 'seed']])
+    try:
+        start = time.time()
+        ws = generate_workspace(root, packages=options.packages, depth=options.depth, stacks=options.stacks,
+                                symlinks=options.symlinks, graph=options.graph, fanout=options.fanout,
+                                paths=options.paths, seed=options.seed)
+        print("generated %s packages in %s stacks in %.1fs"%(options.packages, options.stacks, time.time() - start))
+        results = run_benchmarks(ws, options, args)
+    finally:
+        if not options.workspace:
+            shutil.rmtree(root)
+
+    report = {'revision': _revision(),
+              'python': sys.version.split()[0],
+              'platform': sys.platform,
+              'config': config,
+              'results': results}
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+if __name__ == '__main__':
+    bench_main()
@@ -3,7 +3,9 @@
 @[if DEVELSPACE]@
 # set path to gendeps executable in develspace
 set(gendeps_exe @(CMAKE_CURRENT_SOURCE_DIR)/scripts/gendeps)
+set(gendeps_client_exe @(CMAKE_CURRENT_SOURCE_DIR)/scripts/gendeps_client)
 @[else]@
 # set path to gendeps executable in installspace
 set(gendeps_exe ${roslib_DIR}/../../../@(CATKIN_PACKAGE_BIN_DESTINATION)/gendeps)
+set(gendeps_client_exe ${roslib_DIR}/../../../@(CATKIN_PACKAGE_BIN_DESTINATION)/gendeps_client)
 @[end if]@
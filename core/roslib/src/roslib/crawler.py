@@ -0,0 +1,229 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Internal library for crawling ROS package paths. The crawler finds
+packages and stacks in a single pass and is shared by
+L{roslib.packages} and L{roslib.stacks}.
+"""
+
+import os
+
+try:
+    from os import scandir
+except ImportError:
+    # Python < 3.5
+    scandir = None
+
+from multiprocessing.pool import ThreadPool
+
+try:
+    from xml.etree.cElementTree import ElementTree
+except ImportError:
+    from xml.etree.ElementTree import ElementTree
+
+MANIFEST_FILE = 'manifest.xml'
+PACKAGE_FILE = 'package.xml'
+STACK_FILE = 'stack.xml'
+
+# marker files that stop the crawler from descending into a directory
+CATKIN_IGNORE = 'CATKIN_IGNORE'
+ROSPACK_NOSUBDIRS = 'rospack_nosubdirs'
+
+# upper bound on the number of package path roots crawled concurrently
+MAX_THREADS = 8
+
+class CrawlResult(object):
+    """
+    Packages and stacks found underneath a single package path root.
+    """
+    __slots__ = ['path', 'packages', 'stacks', 'dir_mtimes']
+
+    def __init__(self, path):
+        """
+        @param path: package path root that was crawled
+        @type  path: str
+        """
+        self.path = path
+        # {name: directory}, first match within the root wins
+        self.packages = {}
+        self.stacks = {}
+        # {directory: mtime} of every crawled directory that is not a
+        # package. Directory mtimes change when entries are added,
+        # removed or renamed, so these are sufficient to detect that
+        # the result is out of date.
+        self.dir_mtimes = {}
+
+def get_package_xml_name(package_xml_path):
+    """
+    @return: value of the <name> tag of a catkin package.xml file, or
+    None if the file cannot be parsed
+    @rtype: str
+    """
+    try:
+        root = ElementTree(None, package_xml_path)
+        name = root.findtext('name')
+    except Exception:
+        return None
+    if name:
+        return name.strip() or None
+    return None
+
+def get_mtime(path):
+    """
+    @return: modification time of path, or None if path does not exist
+    @rtype: float
+    """
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def _list_dir(d):
+    """
+    @return: names of files and names of sub-directories in d. Symlinks
+    are resolved.
+    @rtype: (set(str), [str])
+    """
+    files = set()
+    dirs = []
+    if scandir is not None:
+        for entry in scandir(d):
+            try:
+                if entry.is_dir():
+                    dirs.append(entry.name)
+                else:
+                    files.add(entry.name)
+            except OSError:
+                # dangling symlink
+                pass
+    else:
+        for name in os.listdir(d):
+            if os.path.isdir(os.path.join(d, name)):
+                dirs.append(name)
+            else:
+                files.add(name)
+    return files, dirs
+
+def crawl_path(path):
+    """
+    Crawl a single package path root. Symlinked directories are
+    followed; directories that have already been visited (as
+    identified by device and inode number) are skipped, which protects
+    against symlink loops.
+
+    @param path: directory to crawl
+    @type  path: str
+    @return: packages and stacks found in path
+    @rtype: L{CrawlResult}
+    """
+    path = os.path.abspath(path)
+    result = CrawlResult(path)
+    packages = result.packages
+    stacks = result.stacks
+    dir_mtimes = result.dir_mtimes
+    basename = os.path.basename
+    join = os.path.join
+
+    visited = set()
+    # depth-first, using an explicit stack of (directory, in_stack)
+    # entries. Stacks are not nested, so directories inside of a stack
+    # are only searched for packages.
+    todo = [(path, False)]
+    while todo:
+        d, in_stack = todo.pop()
+        try:
+            s = os.stat(d)
+        except OSError:
+            if d == path:
+                # record missing root so that its creation is noticed
+                dir_mtimes[d] = None
+            continue
+        key = (s.st_dev, s.st_ino)
+        if key in visited:
+            continue
+        visited.add(key)
+        try:
+            files, subdirs = _list_dir(d)
+        except OSError:
+            continue
+
+        if CATKIN_IGNORE in files:
+            dir_mtimes[d] = s.st_mtime
+            continue #leaf
+        if STACK_FILE in files and not in_stack:
+            stacks.setdefault(basename(d), d)
+            in_stack = True
+        if MANIFEST_FILE in files:
+            packages.setdefault(basename(d), d)
+            continue #leaf
+        elif PACKAGE_FILE in files:
+            package = get_package_xml_name(join(d, PACKAGE_FILE))
+            if package is not None:
+                packages.setdefault(package, d)
+                continue #leaf
+
+        dir_mtimes[d] = s.st_mtime
+        if ROSPACK_NOSUBDIRS in files:
+            # rospack_nosubdirs means 'do not descend', it does not
+            # hide a package or stack in the same directory
+            continue #leaf
+        # remove hidden dirs (esp. .svn/.git). Reverse-sort so that
+        # sub-directories are popped in alphabetical order.
+        subdirs = sorted([x for x in subdirs if x[0] != '.'], reverse=True)
+        todo.extend([(join(d, x), in_stack) for x in subdirs])
+    return result
+
+def crawl(paths, threads=None):
+    """
+    Crawl package path roots concurrently.
+
+    @param paths: package path roots
+    @type  paths: [str]
+    @param threads: (optional) number of threads to use. Defaults to
+    one per root, up to L{MAX_THREADS}.
+    @type  threads: int
+    @return: crawl results in the same order as paths
+    @rtype: [L{CrawlResult}]
+    """
+    paths = list(paths)
+    if threads is None:
+        threads = min(len(paths), MAX_THREADS)
+    if threads <= 1 or len(paths) <= 1:
+        return [crawl_path(p) for p in paths]
+    pool = ThreadPool(threads)
+    try:
+        return pool.map(crawl_path, paths)
+    finally:
+        pool.close()
+        pool.join()
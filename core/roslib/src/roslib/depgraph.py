@@ -0,0 +1,455 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Internal library for in-process package and stack dependency
+queries, which replace spawning rospack/rosstack. The manifests of an
+environment are loaded once into an integer-indexed adjacency
+structure; transitive closures are computed on demand as integer
+bitsets and memoized.
+"""
+
+import os
+import time
+from xml.etree.ElementTree import ElementTree
+
+import rospkg
+
+import roslib.crawler
+import roslib.envcache
+import roslib.exceptions
+import roslib.manifest
+import roslib.packages
+import roslib.stack_manifest
+
+# package.xml dependency tags that are considered package dependencies
+PACKAGE_XML_DEPENDS = ['depend', 'build_depend', 'buildtool_depend', 'build_export_depend',
+                       'run_depend', 'exec_depend', 'test_depend']
+
+# seconds for which a cached graph is used without checking its sources
+VALIDATE_INTERVAL = 1.0
+
+class DependencyGraphException(roslib.exceptions.ROSLibException):
+    """
+    Exception that indicates that a dependency query cannot be
+    answered, e.g. because the package does not exist or a dependency
+    is missing or circular.
+    """
+    pass
+
+def _bits(bits):
+    """
+    @return: indices of the set bits, in ascending order
+    @rtype: [int]
+    """
+    indices = []
+    while bits:
+        low = bits & -bits
+        indices.append(low.bit_length() - 1)
+        bits ^= low
+    return indices
+
+class DependencyGraph(object):
+    """
+    Dependency graph of the packages or stacks of an environment.
+    Nodes are numbered by sorted name; the transitive closure and
+    reverse closure of a node are bitsets over node numbers.
+    """
+
+    def __init__(self, kind, depends, errors=None, sources=None):
+        """
+        @param kind: 'package' or 'stack', used in error messages
+        @type  kind: str
+        @param depends: direct dependencies by name, in manifest order
+        @type  depends: {str: [str]}
+        @param errors: (optional) errors of nodes whose manifest
+        cannot be loaded, by name. These nodes have no dependencies.
+        @type  errors: {str: str}
+        @param sources: (optional) stat keys of the files and
+        directories the graph was loaded from, see L{is_stale()}
+        @type  sources: {str: tuple}
+        """
+        self.kind = kind
+        # time the sources were last found to be up to date, see
+        # L{get_package_graph()}
+        self.validated = time.time()
+        self.names = sorted(set(depends) | set(errors or {}))
+        self.index = dict([(n, i) for i, n in enumerate(self.names)])
+        self.sources = sources or {}
+        self._errors = errors or {}
+        # direct dependencies in manifest order, and missing dependencies
+        self._deps1 = []
+        self._missing = {}
+        for i, n in enumerate(self.names):
+            deps1 = []
+            for d in depends.get(n, []):
+                j = self.index.get(d, None)
+                if j is None:
+                    self._missing.setdefault(i, []).append(d)
+                elif j not in deps1:
+                    deps1.append(j)
+            self._deps1.append(tuple(deps1))
+        self._rdeps1 = [[] for n in self.names]
+        for i, deps1 in enumerate(self._deps1):
+            for j in deps1:
+                self._rdeps1[j].append(i)
+        self._closures = [None] * len(self.names)
+        self._rclosures = [None] * len(self.names)
+        self._ordered = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def is_stale(self):
+        """
+        @return: True if any of the sources of the graph has changed
+        @rtype: bool
+        """
+        for path, key in self.sources.items():
+            if _stat_key(path) != key:
+                return True
+        return False
+
+    def _get_index(self, name):
+        try:
+            i = self.index[name]
+        except KeyError:
+            raise DependencyGraphException("%s '%s' not found"%(self.kind, name))
+        if name in self._errors:
+            raise DependencyGraphException(self._errors[name])
+        return i
+
+    def _close(self, i, adjacency, closures):
+        """
+        Compute the closure of node i over adjacency, memoizing the
+        closures of all nodes visited.
+        @return: closure of node i
+        @rtype: int
+        @raise DependencyGraphException: if there is a cycle
+        """
+        if closures[i] is not None:
+            return closures[i]
+        stack = [(i, 0)]
+        on_stack = set([i])
+        while stack:
+            node, k = stack[-1]
+            adj = adjacency[node]
+            if k < len(adj):
+                stack[-1] = (node, k + 1)
+                j = adj[k]
+                if closures[j] is None:
+                    if j in on_stack:
+                        raise DependencyGraphException("circular dependency involving %s '%s'"%(self.kind, self.names[j]))
+                    on_stack.add(j)
+                    stack.append((j, 0))
+            else:
+                bits = 0
+                for j in adj:
+                    bits |= (1 << j) | closures[j]
+                closures[node] = bits
+                on_stack.discard(node)
+                stack.pop()
+        return closures[i]
+
+    def _check_deps(self, i, bits):
+        """
+        @raise DependencyGraphException: if node i or any node of its
+        closure bits has missing dependencies or could not be loaded
+        """
+        for j in [i] + _bits(bits):
+            if j in self._missing:
+                raise DependencyGraphException("%s '%s' depends on non-existent %s '%s'"%(
+                    self.kind, self.names[j], self.kind, self._missing[j][0]))
+            if self.names[j] in self._errors:
+                raise DependencyGraphException(self._errors[self.names[j]])
+
+    def deps1(self, name):
+        """
+        @return: direct dependencies of name, in manifest order
+        @rtype: [str]
+        @raise DependencyGraphException: if name does not exist or has missing dependencies
+        """
+        i = self._get_index(name)
+        self._check_deps(i, 0)
+        return [self.names[j] for j in self._deps1[i]]
+
+    def deps(self, name):
+        """
+        @return: all dependencies of name, ordered such that each
+        dependency comes after its own dependencies
+        @rtype: [str]
+        @raise DependencyGraphException: if name does not exist, or a
+        dependency is missing or circular
+        """
+        i = self._get_index(name)
+        ordered = self._ordered.get(i, None)
+        if ordered is None:
+            self._check_deps(i, self._close(i, self._deps1, self._closures))
+            # post-order depth-first traversal, as rospack
+            ordered = []
+            seen = set([i])
+            stack = [(i, 0)]
+            while stack:
+                node, k = stack[-1]
+                adj = self._deps1[node]
+                if k < len(adj):
+                    stack[-1] = (node, k + 1)
+                    j = adj[k]
+                    if j not in seen:
+                        seen.add(j)
+                        stack.append((j, 0))
+                else:
+                    stack.pop()
+                    if node != i:
+                        ordered.append(node)
+            self._ordered[i] = ordered
+        return [self.names[j] for j in ordered]
+
+    def depends_on1(self, name):
+        """
+        @return: names that depend directly on name, sorted
+        @rtype: [str]
+        @raise DependencyGraphException: if name does not exist
+        """
+        i = self._get_index(name)
+        return [self.names[j] for j in sorted(self._rdeps1[i])]
+
+    def depends_on(self, name):
+        """
+        @return: names that depend on name, sorted
+        @rtype: [str]
+        @raise DependencyGraphException: if name does not exist or a
+        dependency is circular
+        """
+        i = self._get_index(name)
+        return [self.names[j] for j in _bits(self._close(i, self._rdeps1, self._rclosures))]
+
+    def depends(self, name, dep):
+        """
+        @return: True if name depends on dep, directly or indirectly
+        @rtype: bool
+        """
+        i = self._get_index(name)
+        j = self._get_index(dep)
+        return bool(self._close(i, self._deps1, self._closures) >> j & 1)
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size, st.st_ino)
+
+def _crawl(paths, attr):
+    """
+    @return: {name: directory} of packages or stacks, first path
+    wins, and stat keys of the crawled directories
+    @rtype: ({str: str}, {str: tuple})
+    """
+    dirs = {}
+    sources = {}
+    for result in reversed(roslib.crawler.crawl(paths)):
+        dirs.update(getattr(result, attr))
+        for d in result.dir_mtimes:
+            sources[d] = _stat_key(d)
+    return dirs, sources
+
+def _parse_package_xml(path):
+    """
+    @return: dependencies and exports of a catkin package.xml file
+    @rtype: ([str], [(str, {str: str})])
+    """
+    root = ElementTree(None, path).getroot()
+    depends = [e.text.strip() for e in root if e.tag in PACKAGE_XML_DEPENDS and e.text]
+    exports = []
+    for e in root.findall('export'):
+        exports.extend([(t.tag, dict(t.attrib)) for t in e])
+    return depends, exports
+
+def load_package_graph(ros_root, ros_package_path, processes=None):
+    """
+    Load the package dependency graph of an environment. Dependencies
+    of catkin packages without a manifest.xml are read from
+    package.xml; names that are not packages, i.e. system
+    dependencies, are ignored for those.
+    @return: package dependency graph
+    @rtype: L{DependencyGraph}
+    """
+    paths = rospkg.environment._compute_package_paths(ros_root, ros_package_path)
+    pkg_dirs, sources = _crawl(paths, 'packages')
+    manifest_dirs = []
+    package_xml_dirs = []
+    for name, d in pkg_dirs.items():
+        if os.path.isfile(os.path.join(d, roslib.manifest.MANIFEST_FILE)):
+            manifest_dirs.append(d)
+        else:
+            package_xml_dirs.append((name, d))
+
+    depends = {}
+    errors = {}
+    manifests, manifest_errors = roslib.manifest.load_all(manifest_dirs, processes=processes)
+    for d in manifest_dirs:
+        name = os.path.basename(d)
+        path = os.path.join(d, roslib.manifest.MANIFEST_FILE)
+        sources[path] = _stat_key(path)
+        if name in manifests:
+            depends[name] = [dep.package for dep in manifests[name].depends]
+    for path, e in manifest_errors.items():
+        errors[os.path.basename(os.path.dirname(path))] = str(e)
+    for name, d in package_xml_dirs:
+        path = os.path.join(d, roslib.crawler.PACKAGE_FILE)
+        sources[path] = _stat_key(path)
+        try:
+            depends[name] = _parse_package_xml(path)[0]
+        except Exception as e:
+            errors[name] = "Invalid package.xml file [%s]: %s"%(path, e)
+    catkin = set([name for name, d in package_xml_dirs])
+    for name in catkin:
+        if name in depends:
+            depends[name] = [d for d in depends[name] if d in pkg_dirs]
+    return DependencyGraph('package', depends, errors, sources)
+
+def load_package_subgraph(package, ros_root, ros_package_path):
+    """
+    Load the part of the package dependency graph of an environment
+    that is reachable from package. Only the manifests of package and
+    its dependencies are read, in this process.
+    @return: dependency graph of package and its dependencies
+    @rtype: L{DependencyGraph}
+    """
+    pkg_dirs = roslib.packages._get_pkg_locator(ros_root, ros_package_path).pkg_dirs()
+    depends = {}
+    errors = {}
+    todo = [package]
+    while todo:
+        name = todo.pop()
+        if name in depends or name in errors or name not in pkg_dirs:
+            continue
+        d = pkg_dirs[name]
+        path = os.path.join(d, roslib.manifest.MANIFEST_FILE)
+        if os.path.isfile(path):
+            try:
+                depends[name] = [dep.package for dep in roslib.manifest.parse_file(path).depends]
+            except Exception as e:
+                errors[name] = str(e)
+                continue
+        else:
+            path = os.path.join(d, roslib.crawler.PACKAGE_FILE)
+            try:
+                depends[name] = [dep for dep in _parse_package_xml(path)[0] if dep in pkg_dirs]
+            except Exception as e:
+                errors[name] = "Invalid package.xml file [%s]: %s"%(path, e)
+                continue
+        todo.extend(depends[name])
+    return DependencyGraph('package', depends, errors)
+
+def load_stack_graph(ros_root, ros_package_path, processes=None):
+    """
+    Load the stack dependency graph of an environment.
+    @return: stack dependency graph
+    @rtype: L{DependencyGraph}
+    """
+    paths = rospkg.environment._compute_package_paths(ros_root, ros_package_path)
+    stack_dirs, sources = _crawl(paths, 'stacks')
+    depends = {}
+    errors = {}
+    manifests, manifest_errors = roslib.stack_manifest.load_all(list(stack_dirs.values()), processes=processes)
+    for name, d in stack_dirs.items():
+        path = os.path.join(d, roslib.stack_manifest.STACK_FILE)
+        sources[path] = _stat_key(path)
+        if name in manifests:
+            depends[name] = [dep.stack for dep in manifests[name].depends]
+    for path, e in manifest_errors.items():
+        errors[os.path.basename(os.path.dirname(path))] = str(e)
+    return DependencyGraph('stack', depends, errors=errors, sources=sources)
+
+# {(ros_root, ros_package_path): DependencyGraph}
+_package_graphs = roslib.envcache.EnvCache('package_graphs', load_package_graph)
+_stack_graphs = roslib.envcache.EnvCache('stack_graphs', load_stack_graph)
+
+def _get_graph(registry, env):
+    if env is None:
+        env = os.environ
+    key = (env.get(rospkg.environment.ROS_ROOT, None), env.get(rospkg.environment.ROS_PACKAGE_PATH, None))
+    graph = registry.get(key)
+    # checking the sources stats every manifest, which costs far more
+    # than a query
+    now = time.time()
+    if not 0 <= now - graph.validated < VALIDATE_INTERVAL:
+        if graph.is_stale():
+            registry.pop(key)
+            graph = registry.get(key)
+        else:
+            graph.validated = now
+    return graph
+
+def get_package_graph(env=None):
+    """
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: package dependency graph of the environment. The graph
+    is cached and reloaded when manifests or package directories
+    change, which is checked at most every L{VALIDATE_INTERVAL} seconds.
+    @rtype: L{DependencyGraph}
+    """
+    return _get_graph(_package_graphs, env)
+
+def get_package_subgraph(package, env=None):
+    """
+    @param package: package name
+    @type  package: str
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: dependency graph of package and its dependencies, see
+    L{load_package_subgraph()}. Unlike L{get_package_graph()}, this
+    does not read the other manifests of the environment.
+    @rtype: L{DependencyGraph}
+    """
+    if env is None:
+        env = os.environ
+    return load_package_subgraph(package, env.get(rospkg.environment.ROS_ROOT, None),
+                                 env.get(rospkg.environment.ROS_PACKAGE_PATH, None))
+
+def get_stack_graph(env=None):
+    """
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: stack dependency graph of the environment. The graph is
+    cached and reloaded when manifests or stack directories change,
+    which is checked at most every L{VALIDATE_INTERVAL} seconds.
+    @rtype: L{DependencyGraph}
+    """
+    return _get_graph(_stack_graphs, env)
@@ -0,0 +1,143 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Registry of caches that are only valid for a single ROS environment,
+e.g. a (ROS_ROOT, ROS_PACKAGE_PATH) pair. A process that works with
+several environments, e.g. from multiple threads, keeps one cache per
+environment instead of discarding the cache whenever the environment
+changes.
+"""
+
+import threading
+
+from collections import OrderedDict
+
+# default number of environments kept per registry
+DEFAULT_SIZE = 8
+
+# {name: EnvCache}
+_registries = {}
+
+class EnvCache(object):
+    """
+    Lock-protected map of environment keys to per-environment cache
+    objects. Cache objects are created on demand and whole
+    environments are evicted in least-recently-used order.
+    """
+
+    def __init__(self, name, factory, max_size=DEFAULT_SIZE):
+        """
+        @param name: name of registry, used by L{get_stats()}
+        @type  name: str
+        @param factory: function that creates the cache object of an
+        environment, called with the elements of the key as arguments
+        @type  factory: fn(*key)
+        @param max_size: maximum number of environments to keep
+        @type  max_size: int
+        """
+        self.name = name
+        self.factory = factory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        _registries[name] = self
+
+    def get(self, key):
+        """
+        @param key: environment key
+        @type  key: tuple
+        @return: cache object of environment, created if necessary
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                value = self._entries.pop(key)
+            else:
+                self.misses += 1
+                value = self.factory(*key)
+                while len(self._entries) >= self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            self._entries[key] = value
+            return value
+
+    def peek(self, key, default=None):
+        """
+        @return: cache object of environment, or default if there is
+        none. Counters and LRU order are not updated.
+        """
+        with self._lock:
+            return self._entries.get(key, default)
+
+    def pop(self, key):
+        """
+        Discard the cache object of an environment.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Discard all cache objects and reset counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """
+        @return: hit, miss and eviction counts and number of cached environments
+        @rtype: {str: int}
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'size': len(self._entries)}
+
+def get_stats():
+    """
+    @return: statistics of all registries by name, see L{EnvCache.stats()}
+    @rtype: {str: {str: int}}
+    """
+    return dict([(name, r.stats()) for name, r in _registries.items()])
@@ -0,0 +1,219 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Batch mode of the gendeps tool. Computes the file dependencies, md5
+sums and full text of many .msg/.srv files in one invocation, instead
+of paying interpreter startup, roslib import and registry warm-up for
+every file. Files are processed in topological order, embedded types
+first, and share one L{roslib.msgs.MsgRegistry}, so that the md5 sum of
+a message computed for its own file is reused by every message that
+embeds it.
+"""
+
+import os
+
+import rospkg
+
+import roslib.gentools
+import roslib.msgs
+import roslib.names
+import roslib.packages
+import roslib.srvs
+
+def get_option_parser(prog):
+    """
+    @return: command-line parser of the gendeps tool
+    @rtype: optparse.OptionParser
+    """
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options] [files...]", prog=prog)
+    parser.add_option("-m", "--md5",
+                      dest="md5", default=False,
+                      action="store_true",
+                      help="Generate md5 hash of files")
+    parser.add_option("-s", "--sha1",
+                      dest="sha1", default=False,
+                      action="store_true",
+                      help="Generate SHA1 hash of files")
+    parser.add_option("-c", "--cat",
+                      dest="cat_files", default=False,
+                      action="store_true",
+                      help="Generate concatenated list of files")
+    parser.add_option("-b", "--batch",
+                      dest="batch", default=False,
+                      action="store_true",
+                      help="Process many files and write the dependencies, md5 hash and concatenated text of each as JSON")
+    parser.add_option("-p", "--package",
+                      dest="packages", default=[],
+                      action="append", metavar="PACKAGE",
+                      help="In batch mode, process all msg and srv files of PACKAGE")
+    return parser
+
+def get_package_files(package):
+    """
+    @param package: package name
+    @type  package: str
+    @return: paths of the .msg and .srv files of package
+    @rtype: [str]
+    @raise InvalidROSPkgException: if package cannot be located
+    """
+    package_dir = roslib.packages.get_pkg_dir(package)
+    files = []
+    for subdir, ext in [('msg', roslib.msgs.EXT), ('srv', roslib.srvs.EXT)]:
+        d = os.path.join(package_dir, subdir)
+        if os.path.isdir(d):
+            files.extend(sorted([os.path.join(d, f) for f in os.listdir(d) if f.endswith(ext)]))
+    return files
+
+def _load_file(f):
+    """
+    Load msg/srv file the same way as L{roslib.gentools.get_file_dependencies()}
+    @return: package name, type name, spec and names of embedded types
+    @rtype: (str, str, L{roslib.msgs.MsgSpec}/L{roslib.srvs.SrvSpec}, [str])
+    """
+    package = rospkg.get_package_name(f)
+    if f.endswith(roslib.msgs.EXT):
+        _, spec = roslib.msgs.load_from_file(f)
+        types = spec.types
+        ext = roslib.msgs.EXT
+    elif f.endswith(roslib.srvs.EXT):
+        _, spec = roslib.srvs.load_from_file(f)
+        types = spec.request.types + spec.response.types
+        ext = roslib.srvs.EXT
+    else:
+        raise roslib.msgs.MsgSpecException("[%s] does not appear to be a message or service"%f)
+    type_ = roslib.names.resource_name(package or '', os.path.basename(f)[:-len(ext)])
+    embedded = []
+    for t in types:
+        t = roslib.msgs.base_msg_type(t)
+        if roslib.msgs.is_builtin(t):
+            continue
+        if t == roslib.msgs.HEADER:
+            t = roslib.gentools._header_type_name
+        elif package and roslib.names.PRN_SEPARATOR not in t:
+            t = roslib.names.resource_name(package, t)
+        embedded.append(t)
+    return package, type_, spec, embedded
+
+def _topological_order(files, embedded, file_by_type):
+    """
+    @return: files ordered so that files of embedded types come before
+    the files that embed them. Cycles are broken arbitrarily.
+    @rtype: [str]
+    """
+    ordered = []
+    done = set()
+    for root in files:
+        if root in done:
+            continue
+        done.add(root)
+        stack = [(root, iter(embedded[root]))]
+        while stack:
+            f, it = stack[-1]
+            for t in it:
+                dep = file_by_type.get(t, None)
+                if dep is not None and dep not in done:
+                    done.add(dep)
+                    stack.append((dep, iter(embedded[dep])))
+                    break
+            else:
+                stack.pop()
+                ordered.append(f)
+    return ordered
+
+def compute(files, rospack=None, registry=None):
+    """
+    Compute dependencies, md5 sums and full text of msg/srv files.
+    Errors are reported per file instead of aborting the batch.
+
+    @param files: paths of .msg and .srv files
+    @type  files: [str]
+    @param rospack: (optional) rospack instance for caching of deps
+    @type  rospack: rospkg.RosPack
+    @param registry: (optional) registry of message types, defaults
+    to a new registry
+    @type  registry: L{roslib.msgs.MsgRegistry}
+    @return: one dictionary per file, in the order the files were
+    processed, with the keys:
+      * 'file': path of the file, as specified
+      * 'type': type name, e.g. 'std_msgs/String'
+      * 'deps': paths of the .msg files of the embedded types, in the
+        order printed by gendeps
+      * 'md5': md5 sum
+      * 'full_text': concatenated text of the file and of the embedded types
+    or, if the file cannot be processed, 'file' and 'error'.
+    @rtype: [{str: object}]
+    """
+    if rospack is None:
+        rospack = rospkg.RosPack()
+    if registry is None:
+        registry = roslib.msgs.MsgRegistry()
+    results = {}
+    failed = []
+    loaded = {}
+    embedded = {}
+    file_by_type = {}
+    for f in files:
+        if f in loaded or f in results:
+            continue
+        try:
+            loaded[f] = _load_file(f)
+        except Exception as e:
+            results[f] = {'file': f, 'error': str(e)}
+            failed.append(f)
+            continue
+        embedded[f] = loaded[f][3]
+        file_by_type.setdefault(loaded[f][1], f)
+
+    ordered = _topological_order([f for f in files if f in loaded], embedded, file_by_type)
+    for f in ordered:
+        package, type_, spec, _ = loaded[f]
+        try:
+            deps = roslib.gentools.get_dependencies(spec, package, rospack=rospack, registry=registry)
+            md5 = roslib.gentools.compute_md5(deps, rospack=rospack, registry=registry)
+            full_text = roslib.gentools.compute_full_text(deps, registry=registry)
+        except Exception as e:
+            results[f] = {'file': f, 'error': str(e)}
+            continue
+        if isinstance(spec, roslib.msgs.MsgSpec) and package:
+            # files that embed this type reuse its md5 sum, unless the
+            # type is already registered from another file
+            if not registry.is_registered(type_):
+                registry.register(type_, roslib.msgs.load_from_file(f, package)[1])
+            if registry.get_registered(type_).text == spec.text:
+                registry.md5s.setdefault(type_, md5)
+        results[f] = {'file': f, 'type': type_, 'deps': list(deps['files'].values()),
+                      'md5': md5, 'full_text': full_text}
+    # files that failed to load come last
+    return [results[f] for f in ordered + failed]
@@ -0,0 +1,423 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Persistent gendeps server. rosbuild runs gendeps once per msg/srv
+file and CMake rule, and every run pays interpreter startup, roslib
+import and registry warm-up. The server keeps a L{roslib.msgs.MsgRegistry},
+its md5 memo and the computed results across requests, and answers
+requests of the gendeps_client script on a Unix domain socket under
+ROS_HOME. Results are invalidated when the stat of any msg, srv or
+manifest file they were computed from changes.
+
+One server runs per environment: the socket name is derived from
+ROS_ROOT, ROS_PACKAGE_PATH and PYTHONPATH, see L{get_socket_path()}.
+Servers started concurrently, e.g. by clients under make -j, serialize
+on a lock file and all but one exit. The server exits after it has
+been idle for a while.
+
+Protocol: the client sends a JSON object with the keys 'argv' (gendeps
+arguments, without the program name) and 'cwd', then shuts down its
+side of the connection. The server answers with a JSON object with
+the keys 'stdout', 'stderr' and 'code' (exit code), or with 'fallback'
+set if the client should run gendeps itself.
+"""
+
+from __future__ import print_function
+
+import errno
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+try:
+    import socketserver # Python 3.x
+except ImportError:
+    import SocketServer as socketserver # Python 2.x
+
+import rospkg
+
+import roslib.gendeps
+import roslib.msgs
+
+SOCKET_DIR = 'roslib_gendeps'
+## seconds of inactivity after which the server exits
+IDLE_TIMEOUT = 600
+## environment variables that select the server
+ENV_KEYS = ['ROS_ROOT', 'ROS_PACKAGE_PATH', 'PYTHONPATH']
+
+def get_socket_path(env=None):
+    """
+    @param env: override os.environ dictionary
+    @type  env: dict
+    @return: path of the socket of the server of environment. The
+    gendeps_client script computes the same path.
+    @rtype: str
+    """
+    if env is None:
+        env = os.environ
+    key = '\n'.join(['%s=%s'%(k, env.get(k, '')) for k in ENV_KEYS])
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(rospkg.get_ros_home(env), SOCKET_DIR, '%s.sock'%digest)
+
+## stat key of files that may have changed after they were read
+_RACY = ()
+
+def _stat_key(path):
+    try:
+        s = os.stat(path)
+    except OSError:
+        return None
+    return (s.st_mtime, s.st_size, s.st_ino)
+
+def _stat_key_since(path, start):
+    """
+    Stat key of a file that has been read after start, which does not
+    match the file if it was modified after start. Modification times
+    may only have a resolution of one second.
+    """
+    key = _stat_key(path)
+    if key is not None and key[0] >= start - 1:
+        return _RACY
+    return key
+
+def _manifest_files(package_dir):
+    return [os.path.join(package_dir, 'manifest.xml'), os.path.join(package_dir, 'package.xml')]
+
+class GendepsCache(object):
+    """
+    Registry, md5 memo and results of L{roslib.gendeps.compute()},
+    invalidated by the stat of the files the results depend on.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Discard all state.
+        """
+        self.rospack = rospkg.RosPack()
+        self.registry = roslib.msgs.MsgRegistry()
+        ## results by absolute file path
+        self.results = {}
+        ## stat keys of the files that the registry and the results depend on
+        self.stamps = {}
+
+    def is_stale(self):
+        """
+        @return: True if any file that the state depends on has changed
+        @rtype: bool
+        """
+        for path, key in self.stamps.items():
+            if _stat_key(path) != key:
+                return True
+        return False
+
+    def compute(self, files):
+        """
+        L{roslib.gendeps.compute()}, with cached results.
+        @param files: absolute paths of .msg and .srv files
+        @type  files: [str]
+        @return: results, in the order they were processed
+        @rtype: [{str: object}]
+        """
+        with self.lock:
+            if self.is_stale():
+                self.reset()
+            results = [self.results[f] for f in files if f in self.results]
+            missing = [f for f in files if f not in self.results]
+            if missing:
+                stamps = self.stamps
+                # stat the files and the manifests of their packages
+                # before they are read
+                for f in missing:
+                    for p in [f] + _manifest_files(os.path.dirname(os.path.dirname(f))):
+                        if p not in stamps:
+                            stamps[p] = _stat_key(p)
+                start = time.time()
+                computed = roslib.gendeps.compute(missing, self.rospack, self.registry)
+                # embedded types and the manifests of the dependencies,
+                # which determine the types that may be loaded, are only
+                # known once they have been read
+                for r in computed:
+                    for p in r.get('deps', []) + self._get_dependency_manifests(r['file']):
+                        if p not in stamps:
+                            stamps[p] = _stat_key_since(p, start)
+                    if 'error' not in r:
+                        self.results[r['file']] = r
+                    results.append(r)
+            return results
+
+    def _get_dependency_manifests(self, f):
+        """
+        @return: paths of the manifest files of the package of f and of
+        the packages it depends on, directly or indirectly. Packages
+        that cannot be found are skipped.
+        @rtype: [str]
+        """
+        package = rospkg.get_package_name(f)
+        if not package:
+            return []
+        rospack = self.rospack
+        paths = []
+        todo = [package]
+        seen = set(todo)
+        while todo:
+            p = todo.pop()
+            try:
+                paths.extend(_manifest_files(rospack.get_path(p)))
+                depends = rospack.get_depends(p, implicit=False)
+            except rospkg.ResourceNotFound:
+                continue
+            for d in depends:
+                if d not in seen:
+                    seen.add(d)
+                    todo.append(d)
+        return paths
+
+def handle(cache, argv, cwd):
+    """
+    Run gendeps with warm state.
+    @param cache: server state
+    @type  cache: L{GendepsCache}
+    @param argv: gendeps arguments, without the program name
+    @type  argv: [str]
+    @param cwd: working directory of the client
+    @type  cwd: str
+    @return: response, see module documentation
+    @rtype: dict
+    """
+    parser = roslib.gendeps.get_option_parser('gendeps')
+    try:
+        (options, args) = parser.parse_args(argv)
+    except SystemExit:
+        return {'fallback': True}
+    single = not options.batch and not options.packages and len(args) == 1 and \
+        [options.md5, options.cat_files].count(True) <= 1
+    if options.sha1 or (not options.batch and not single) or \
+            (options.batch and (options.md5 or options.cat_files)):
+        # let gendeps report the error
+        return {'fallback': True}
+
+    files = [os.path.join(cwd, f) for f in args]
+    try:
+        for p in options.packages:
+            files.extend(roslib.gendeps.get_package_files(p))
+    except Exception as e:
+        return {'stdout': '', 'stderr': '%s\n'%e, 'code': 1}
+    results = cache.compute(files)
+
+    errors = [r for r in results if 'error' in r]
+    stderr = ''.join(['%s: %s\n'%(r['file'], r['error']) for r in errors])
+    if options.batch:
+        # report files as specified
+        names = dict(zip(files, args))
+        results = [dict(r, file=names.get(r['file'], r['file'])) for r in results]
+        stdout = json.dumps(results, indent=1, sort_keys=True) + '\n'
+    elif errors:
+        return {'stdout': '', 'stderr': '%s\n'%errors[0]['error'], 'code': 1}
+    elif options.md5:
+        stdout = results[0]['md5'] + '\n'
+    elif options.cat_files:
+        stdout = results[0]['full_text'] + '\n'
+    else:
+        stdout = ' '.join(results[0]['deps']) + '\n'
+    return {'stdout': stdout, 'stderr': stderr, 'code': 1 if errors else 0}
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server
+        try:
+            try:
+                request = json.loads(self.rfile.read().decode('utf-8'))
+                response = handle(server.cache, request['argv'], request['cwd'])
+            except Exception as e:
+                response = {'fallback': True, 'stderr': '%s\n'%e}
+            self.wfile.write(json.dumps(response).encode('utf-8'))
+        finally:
+            server.end_request()
+
+class GendepsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix domain socket server answering gendeps requests
+    """
+    daemon_threads = True
+
+    def __init__(self, path, idle_timeout=IDLE_TIMEOUT):
+        """
+        Bind to a temporary name and listen before the socket is renamed
+        to path, so that clients never see a socket that is not ready.
+        The caller must hold the lock of path, see L{serve()}.
+        @param path: socket path
+        @type  path: str
+        """
+        self.path = path
+        self.cache = GendepsCache()
+        self.idle_timeout = idle_timeout
+        self.active = 0
+        self.last_request = time.time()
+        self._lock = threading.Lock()
+        tmp = '%s.%s'%(path, os.getpid())
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        socketserver.UnixStreamServer.__init__(self, tmp, _Handler)
+        os.chmod(tmp, 0o600)
+        os.rename(tmp, path)
+
+    def process_request(self, request, client_address):
+        # count the request before its thread starts, so that the
+        # server does not exit while the request is pending
+        with self._lock:
+            self.active += 1
+        socketserver.ThreadingMixIn.process_request(self, request, client_address)
+
+    def end_request(self):
+        with self._lock:
+            self.active -= 1
+            self.last_request = time.time()
+
+    def is_idle(self):
+        with self._lock:
+            return not self.active and time.time() - self.last_request >= self.idle_timeout
+
+    def run(self):
+        """
+        Serve requests until idle, then remove the socket.
+        """
+        self.timeout = min(self.idle_timeout, 5.0)
+        try:
+            while not self.is_idle():
+                self.handle_request()
+        finally:
+            # remove the name first, so that new clients start a new server
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.server_close()
+
+def _lock_file(path):
+    """
+    @return: open file holding an exclusive lock on path, or None if
+    another process holds it
+    """
+    import fcntl
+    f = open(path, 'a')
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except IOError as e:
+        f.close()
+        if e.errno in (errno.EAGAIN, errno.EACCES):
+            return None
+        raise
+    return f
+
+def serve(path=None, idle_timeout=IDLE_TIMEOUT):
+    """
+    Run the server of the current environment, unless it is already
+    running.
+    @param path: (optional) socket path
+    @type  path: str
+    @return: True if the server ran, False if another server holds the lock
+    @rtype: bool
+    """
+    if path is None:
+        path = get_socket_path()
+    d = os.path.dirname(path)
+    if not os.path.isdir(d):
+        try:
+            os.makedirs(d)
+        except OSError:
+            # created concurrently
+            if not os.path.isdir(d):
+                raise
+    lock = _lock_file(path + '.lock')
+    if lock is None:
+        return False
+    try:
+        GendepsServer(path, idle_timeout).run()
+    finally:
+        lock.close()
+    return True
+
+def request(argv, cwd=None, path=None, timeout=None):
+    """
+    Send a request to a running server.
+    @param argv: gendeps arguments, without the program name
+    @type  argv: [str]
+    @return: response, see module documentation
+    @rtype: dict
+    @raise socket.error: if no server is running
+    """
+    if path is None:
+        path = get_socket_path()
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.settimeout(timeout)
+        s.connect(path)
+        s.sendall(json.dumps({'argv': argv, 'cwd': cwd or os.getcwd()}).encode('utf-8'))
+        s.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        s.close()
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+def main(argv=None):
+    """
+    Command-line entry point of the server
+    """
+    from optparse import OptionParser
+    if argv is None:
+        argv = sys.argv
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("--idle-timeout",
+                      dest="idle_timeout", default=IDLE_TIMEOUT, type="float",
+                      help="Exit after SECONDS without requests (default %s)"%IDLE_TIMEOUT, metavar="SECONDS")
+    (options, args) = parser.parse_args(argv[1:])
+    # exit code 0 if another server holds the lock, which tells the
+    # client to keep waiting for that server
+    serve(idle_timeout=options.idle_timeout)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
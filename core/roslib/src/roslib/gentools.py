@@ -45,6 +45,8 @@ md5sums and message definitions of classes.
 
 import sys
 
+from collections import OrderedDict
+
 try:
     from cStringIO import StringIO # Python 2.x
 except ImportError:
@@ -59,8 +61,16 @@ import roslib.srvs
 
 # name of the Header type as gentools knows it
 _header_type_name = 'std_msgs/Header'
+# names Header is registered under by L{roslib.msgs.MsgRegistry.init()},
+# independent of package dependencies
+_header_type_names = [roslib.msgs.HEADER, _header_type_name, 'roslib/Header']
+
+def _get_registry(registry):
+    if registry is None:
+        return roslib.msgs.get_default_registry()
+    return registry
 
-def _add_msgs_depends(rospack, spec, deps, package_context):
+def _add_msgs_depends(rospack, spec, deps, package_context, registry):
     """
     Add the list of message types that spec depends on to depends.
     @param spec: message to compute dependencies for
@@ -68,9 +78,16 @@ def _add_msgs_depends(rospack, spec, deps, package_context):
     @param deps [str]: list of dependencies. This list will be updated
     with the dependencies of spec when the method completes
     @type  deps: [str]
+    @param registry: registry to look up and register types in
+    @type  registry: L{roslib.msgs.MsgRegistry}
     @raise KeyError for invalid dependent types due to missing package dependencies.
     """
     def _get_valid_packages(package_context, rospack):
+        """
+        @return: packages whose types may be loaded, and False if
+        package_context cannot be found
+        @rtype: ([str], bool)
+        """
         valid_packages = ['', package_context]
         try:
             valid_packages = valid_packages + rospack.get_depends(package_context, implicit=True)
@@ -78,10 +95,11 @@ def _add_msgs_depends(rospack, spec, deps, package_context):
             # this happens in dynamic generation situations where the
             # package is not present.  we soft fail here because we assume
             # missing messages will be caught later during lookup.
-            pass
-        return valid_packages
+            return valid_packages, False
+        return valid_packages, True
 
     valid_packages = None
+    resolved = False
 
     for t in spec.types:
         t = roslib.msgs.base_msg_type(t)
@@ -93,8 +111,18 @@ def _add_msgs_depends(rospack, spec, deps, package_context):
                 # have to re-names Header
                 deps.append(_header_type_name)
 
-            if roslib.msgs.is_registered(t):
-                depspec = roslib.msgs.get_registered(t)
+            if registry.is_registered(t):
+                if t_package and t not in _header_type_names:
+                    # the registry may be shared by several packages
+                    # (roslib.gendeps), so a registered type is not
+                    # necessarily one that package_context may use
+                    # (dynamic generation: not checked if the package
+                    # is not present)
+                    if valid_packages is None:
+                        valid_packages, resolved = _get_valid_packages(package_context, rospack)
+                    if resolved and t_package not in valid_packages:
+                        raise KeyError(t)
+                depspec = registry.get_registered(t)
                 if t != roslib.msgs.HEADER:
                     if '/' in t:
                         deps.append(t)
@@ -102,19 +130,19 @@ def _add_msgs_depends(rospack, spec, deps, package_context):
                         deps.append(package_context+'/'+t)
             else:
                 if valid_packages is None:
-                    valid_packages = _get_valid_packages(package_context, rospack)
+                    valid_packages, resolved = _get_valid_packages(package_context, rospack)
                 if t_package in valid_packages:
                     # if we are allowed to load the message, load it.
                     key, depspec = roslib.msgs.load_by_type(t, package_context)
                     if t != roslib.msgs.HEADER:
                       deps.append(key)
-                    roslib.msgs.register(key, depspec)
+                    registry.register(key, depspec)
                 else:
                     # not allowed to load the message, so error.
                     raise KeyError(t)
-            _add_msgs_depends(rospack, depspec, deps, package_context)
+            _add_msgs_depends(rospack, depspec, deps, package_context, registry)
 
-def compute_md5_text(get_deps_dict, spec, rospack=None):
+def compute_md5_text(get_deps_dict, spec, rospack=None, registry=None):
     """
     Compute the text used for md5 calculation. MD5 spec states that we
     removes comments and non-meaningful whitespace. We also strip
@@ -122,9 +150,17 @@ def compute_md5_text(get_deps_dict, spec, rospack=None):
     reordered ahead of other declarations, in the order that they were
     originally defined.
 
+    The md5 sums of embedded types are memoized in the registry
+    until it is reinitialized.
+
+    @param registry: (optional) registry of message types, defaults to
+    the registry of the roslib.msgs module-level functions
+    @type  registry: L{roslib.msgs.MsgRegistry}
     @return: text for ROS MD5-processing
     @rtype: str
     """
+    registry = _get_registry(registry)
+    md5s = registry.md5s
     uniquedeps = get_deps_dict['uniquedeps']
     package = get_deps_dict['package']
     # #1554: need to suppress computation of files in dynamic generation case
@@ -148,16 +184,19 @@ def compute_md5_text(get_deps_dict, spec, rospack=None):
             if base_msg_type == roslib.msgs.HEADER:
                 base_msg_type = _header_type_name
 
-            sub_pkg, _ = roslib.names.package_resource_name(base_msg_type)
+            sub_pkg, sub_base = roslib.names.package_resource_name(base_msg_type)
             sub_pkg = sub_pkg or package
-            sub_spec = roslib.msgs.get_registered(base_msg_type, package)
-            sub_deps = get_dependencies(sub_spec, sub_pkg, compute_files=compute_files, rospack=rospack)
-            sub_md5 = compute_md5(sub_deps, rospack)
+            key = roslib.names.resource_name(sub_pkg, sub_base)
+            sub_md5 = md5s.get(key, None)
+            if sub_md5 is None:
+                sub_spec = registry.get_registered(base_msg_type, package)
+                sub_deps = get_dependencies(sub_spec, sub_pkg, compute_files=compute_files, rospack=rospack, registry=registry)
+                sub_md5 = md5s[key] = compute_md5(sub_deps, rospack, registry=registry)
             buff.write("%s %s\n"%(sub_md5, name))
 
     return buff.getvalue().strip() # remove trailing new line
 
-def _compute_hash(get_deps_dict, hash, rospack=None):
+def _compute_hash(get_deps_dict, hash, rospack=None, registry=None):
     """
     subroutine of compute_md5()
     @param get_deps_dict: dictionary returned by get_dependencies call
@@ -171,10 +210,10 @@ def _compute_hash(get_deps_dict, hash, rospack=None):
     from roslib.srvs import SrvSpec
     spec = get_deps_dict['spec']
     if isinstance(spec, MsgSpec):
-        hash.update(compute_md5_text(get_deps_dict, spec, rospack=rospack).encode())
+        hash.update(compute_md5_text(get_deps_dict, spec, rospack=rospack, registry=registry).encode())
     elif isinstance(spec, SrvSpec):
-        hash.update(compute_md5_text(get_deps_dict, spec.request, rospack=rospack).encode())
-        hash.update(compute_md5_text(get_deps_dict, spec.response, rospack=rospack).encode())
+        hash.update(compute_md5_text(get_deps_dict, spec.request, rospack=rospack, registry=registry).encode())
+        hash.update(compute_md5_text(get_deps_dict, spec.response, rospack=rospack, registry=registry).encode())
     else:
         raise Exception("[%s] is not a message or service"%spec)
     return hash.hexdigest()
@@ -208,11 +247,13 @@ def compute_md5_v1(get_deps_dict):
     import hashlib
     return _compute_hash_v1(get_deps_dict, hashlib.md5())
 
-def compute_md5(get_deps_dict, rospack=None):
+def compute_md5(get_deps_dict, rospack=None, registry=None):
     """
     Compute md5 hash for message/service
     @param get_deps_dict dict: dictionary returned by get_dependencies call
     @type  get_deps_dict: dict
+    @param registry: (optional) registry of message types
+    @type  registry: L{roslib.msgs.MsgRegistry}
     @return: md5 hash
     @rtype: str
     """
@@ -220,15 +261,15 @@ def compute_md5(get_deps_dict, rospack=None):
         # md5 is deprecated in Python 2.6 in favor of hashlib, but hashlib is
         # unavailable in Python 2.4
         import hashlib
-        return _compute_hash(get_deps_dict, hashlib.md5(), rospack=rospack)
+        return _compute_hash(get_deps_dict, hashlib.md5(), rospack=rospack, registry=registry)
     except ImportError:
         import md5
-        return _compute_hash(get_deps_dict, md5.new(), rospack=rospack)
+        return _compute_hash(get_deps_dict, md5.new(), rospack=rospack, registry=registry)
 
 ## alias
 compute_md5_v2 = compute_md5
 
-def compute_full_text(get_deps_dict):
+def compute_full_text(get_deps_dict, registry=None):
     """
     Compute full text of message/service, including text of embedded
     types.  The text of the main msg/srv is listed first. Embedded
@@ -238,9 +279,12 @@ def compute_full_text(get_deps_dict):
 
     @param get_deps_dict dict: dictionary returned by get_dependencies call
     @type  get_deps_dict: dict
+    @param registry: (optional) registry of message types
+    @type  registry: L{roslib.msgs.MsgRegistry}
     @return: concatenated text for msg/srv file and embedded msg/srv types.
     @rtype:  str
     """
+    registry = _get_registry(registry)
     buff = StringIO()
     sep = '='*80+'\n'
 
@@ -251,12 +295,12 @@ def compute_full_text(get_deps_dict):
     for d in get_deps_dict['uniquedeps']:
         buff.write(sep)
         buff.write("MSG: %s\n"%d)
-        buff.write(roslib.msgs.get_registered(d).text)
+        buff.write(registry.get_registered(d).text)
         buff.write('\n')
     # #1168: remove the trailing \n separator that is added by the concatenation logic
     return buff.getvalue()[:-1]
 
-def get_file_dependencies(f, stdout=sys.stdout, stderr=sys.stderr, rospack=None):
+def get_file_dependencies(f, stdout=sys.stdout, stderr=sys.stderr, rospack=None, registry=None):
     """
     Compute dependencies of the specified message/service file
     @param f: message or service file to get dependencies for
@@ -265,6 +309,8 @@ def get_file_dependencies(f, stdout=sys.stdout, stderr=sys.stderr, rospack=None)
     @type  stdout: file
     @param stderr pipe: stderr pipe
     @type  stderr: file
+    @param registry: (optional) registry of message types
+    @type  registry: L{roslib.msgs.MsgRegistry}
     @return: 'files': list of files that \a file depends on,
     'deps': list of dependencies by type, 'spec': Msgs/Srvs
     instance.
@@ -278,9 +324,9 @@ def get_file_dependencies(f, stdout=sys.stdout, stderr=sys.stderr, rospack=None)
         _, spec = roslib.srvs.load_from_file(f)
     else:
         raise Exception("[%s] does not appear to be a message or service"%spec)
-    return get_dependencies(spec, package, stdout, stderr, rospack=rospack)
+    return get_dependencies(spec, package, stdout, stderr, rospack=rospack, registry=registry)
 
-def get_dependencies(spec, package, compute_files=True, stdout=sys.stdout, stderr=sys.stderr, rospack=None):
+def get_dependencies(spec, package, compute_files=True, stdout=sys.stdout, stderr=sys.stderr, rospack=None, registry=None):
     """
     Compute dependencies of the specified Msgs/Srvs
     @param spec: message or service instance
@@ -294,8 +340,11 @@ def get_dependencies(spec, package, compute_files=True, stdout=sys.stdout, stder
     @param compute_files: (optional, default=True) compute file
     dependencies of message ('files' key in return value)
     @type  compute_files: bool
+    @param registry: (optional) registry to load dependent types into,
+    defaults to the registry of the roslib.msgs module-level functions
+    @type  registry: L{roslib.msgs.MsgRegistry}
     @return: dict:
-      * 'files': list of files that \a file depends on
+      * 'files': files by type that \a file depends on, in the order of 'uniquedeps'
       * 'deps': list of dependencies by type
       * 'spec': Msgs/Srvs instance.
       * 'uniquedeps': list of dependencies with duplicates removed,
@@ -308,39 +357,40 @@ def get_dependencies(spec, package, compute_files=True, stdout=sys.stdout, stder
 
     #we're going to manipulate internal apis of msgs, so have to
     #manually init
-    roslib.msgs._init()
+    registry = _get_registry(registry)
+    registry.init()
 
     deps = []
     try:
         if not rospack:
             rospack = rospkg.RosPack()
         if isinstance(spec, roslib.msgs.MsgSpec):
-            _add_msgs_depends(rospack, spec, deps, package)
+            _add_msgs_depends(rospack, spec, deps, package, registry)
         elif isinstance(spec, roslib.srvs.SrvSpec):
-            _add_msgs_depends(rospack, spec.request, deps, package)
-            _add_msgs_depends(rospack, spec.response, deps, package)
+            _add_msgs_depends(rospack, spec.request, deps, package, registry)
+            _add_msgs_depends(rospack, spec.response, deps, package, registry)
         else:
             raise MsgSpecException("spec does not appear to be a message or service")
     except KeyError as e:
         raise MsgSpecException("Cannot load type %s.  Perhaps the package is missing a dependency."%(str(e)))
 
-    # convert from type names to file names
+    # create unique dependency list
+    uniquedeps = []
+    for d in deps:
+        if not d in uniquedeps:
+            uniquedeps.append(d)
+
+    # convert from type names to file names, in dependency order
 
     if compute_files:
-        files = {}
-        for d in set(deps):
+        files = OrderedDict()
+        for d in uniquedeps:
             d_pkg, t = roslib.names.package_resource_name(d)
             d_pkg = d_pkg or package # convert '' -> local package
             files[d] = roslib.msgs.msg_file(d_pkg, t)
     else:
         files = None
 
-    # create unique dependency list
-    uniquedeps = []
-    for d in deps:
-        if not d in uniquedeps:
-            uniquedeps.append(d)
-
     if compute_files:
         return { 'files': files, 'deps': deps, 'spec': spec, 'package': package, 'uniquedeps': uniquedeps }
     else:
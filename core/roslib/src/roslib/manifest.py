@@ -48,6 +48,7 @@ import roslib.packages
 
 MANIFEST_FILE = 'manifest.xml'
 
+import roslib.manifestcache
 import roslib.manifestlib
 # re-export symbols for backwards compatibility
 from roslib.manifestlib import ManifestException, Depend, Export, ROSDep, VersionControl
@@ -62,13 +63,6 @@ class Manifest(roslib.manifestlib._Manifest):
         Initialize new empty manifest.
         """
         super(Manifest, self).__init__('package')
-        
-    def get_export(self, tag, attr):
-        """
-        @return: exports that match the specified tag and attribute, e.g. 'python', 'path'
-        @rtype: [L{Export}]
-        """
-        return [e.get(attr) for e in self.exports if e.tag == tag if e.get(attr) is not None]
 
 def _manifest_file_by_dir(package_dir, required=True, env=None):
     """
@@ -128,6 +122,22 @@ def load_manifest(package):
     """
     return parse_file(manifest_file(package))
     
+def load_all(paths, processes=None):
+    """
+    Parse many manifest.xml files in parallel. Parsing is fanned out to a
+    process pool in chunks and errors are collected per file instead
+    of aborting.
+    @param paths: manifest.xml file paths or package directories
+    @type  paths: [str]
+    @param processes: number of processes, defaults to the number of CPUs
+    @type  processes: int
+    @return: Manifest instances by package name, and errors by file path.
+    If the same package is in multiple paths, the first one wins.
+    @rtype: ({str: L{Manifest}}, {str: Exception})
+    """
+    files = [os.path.join(p, MANIFEST_FILE) if os.path.isdir(p) else p for p in paths]
+    return roslib.manifestcache.load_all(files, Manifest, processes=processes)
+
 def parse_file(file):
     """
     Parse manifest.xml file
@@ -136,7 +146,7 @@ def parse_file(file):
     @return: Manifest instance
     @rtype: L{Manifest}
     """
-    return roslib.manifestlib.parse_file(Manifest(), file)
+    return roslib.manifestcache.parse_file(Manifest(), file)
 
 def parse(string, filename='string'):
     """
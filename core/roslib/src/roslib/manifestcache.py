@@ -0,0 +1,319 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Internal library for caching parsed manifests (manifest.xml,
+stack.xml). Parsed fields are kept in an in-process LRU and in a
+compact marshal file per manifest under ROS_HOME. Both are validated
+against the (mtime, size, inode) of the manifest file, so that a
+repeat parse is a stat, or a stat and a small read in a new process.
+
+Set the ROSLIB_NO_MANIFEST_CACHE environment variable to bypass the
+cache.
+"""
+
+import hashlib
+import marshal
+import multiprocessing
+import os
+import pickle
+import stat
+import sys
+import threading
+
+from collections import OrderedDict
+
+import roslib.diskcache
+import roslib.manifestlib
+import roslib.snapshot
+
+from roslib.manifestlib import Depend, StackDepend, ROSDep, Platform, Export, VersionControl, \
+    _Lazy, _lazy_from_source
+
+# bump whenever the serialized field layout changes
+FORMAT = 2
+CACHE_DIR = 'roslib_manifest_cache'
+# environment variable that disables the cache if set
+NO_CACHE = 'ROSLIB_NO_MANIFEST_CACHE'
+
+# maximum number of manifests kept in memory
+_LRU_SIZE = 2048
+# {(path, type): (stat key, fields)}
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+
+def _enabled():
+    return not os.environ.get(NO_CACHE, '')
+
+def _stat_key(st):
+    return (st.st_mtime, st.st_size, st.st_ino)
+
+def _cache_file(path, type_):
+    """
+    @return: cache file of manifest. Files are separated by Python
+    version as the marshal format is version-specific.
+    @rtype: str
+    """
+    digest = hashlib.sha1(('%s\0%s'%(path, type_)).encode('utf-8')).hexdigest()
+    return os.path.join(roslib.diskcache.get_cache_dir(CACHE_DIR),
+                        'py%s%s'%sys.version_info[:2], digest)
+
+# index of the dependency names in the fields created by _dump()
+DEPENDS_FIELD = 10
+
+def _dump(m):
+    """
+    @return: fields of manifest m as a marshal-able tuple
+    @rtype: tuple
+    """
+    if m._type == 'stack':
+        depends = [d.stack for d in m.depends]
+    else:
+        depends = [d.package for d in m.depends]
+    vc = m.versioncontrol
+    # lazy fields are stored as the source they are computed from, so
+    # that they are not materialized by caching
+    description = m._description
+    if type(description) is _Lazy:
+        description = ('lazy', description.source)
+    else:
+        description = ('value', description)
+    unknown_tags = m._unknown_tags
+    if type(unknown_tags) is _Lazy:
+        unknown_tags = unknown_tags.source
+    else:
+        unknown_tags = ('elements', [e.toxml().encode('utf-8') for e in unknown_tags])
+    return (description, m.brief, m.author, m.license, m.license_url,
+            m.url, m.logo, m.status, m.version, m.notes,
+            depends,
+            [r.name for r in m.rosdeps],
+            [(p.os, p.version, p.notes) for p in m.platforms],
+            [(e.tag, list(e.attrs.items()), e.str) for e in m.exports],
+            (vc.type, vc.url) if vc is not None else None,
+            unknown_tags)
+
+def _restore(m, fields):
+    """
+    Populate manifest m from fields created by L{_dump()}
+    @return: m
+    @rtype: L{roslib.manifestlib._Manifest}
+    """
+    (description, m.brief, m.author, m.license, m.license_url,
+     m.url, m.logo, m.status, m.version, m.notes,
+     depends, rosdeps, platforms, exports, vc, unknown_tags) = fields
+    kind, description = description
+    if kind == 'lazy':
+        m.description = _lazy_from_source(description)
+    else:
+        m.description = description
+    if m._type == 'stack':
+        m.depends = [StackDepend(d) for d in depends]
+    else:
+        m.depends = [Depend(d) for d in depends]
+    m.rosdeps = [ROSDep(r) for r in rosdeps]
+    m.platforms = [Platform(*p) for p in platforms]
+    m.exports = [Export(tag, dict(attrs), s) for tag, attrs, s in exports]
+    m.versioncontrol = VersionControl(*vc) if vc is not None else None
+    if unknown_tags[1]:
+        m.unknown_tags = _lazy_from_source(unknown_tags)
+    else:
+        m.unknown_tags = []
+    return m
+
+def _read(filename, key):
+    """
+    @return: fields from cache file, or None if file does not exist,
+    is invalid or is out of date
+    @rtype: tuple
+    """
+    try:
+        with open(filename, 'rb') as f:
+            format_, file_key, fields = marshal.loads(f.read())
+    except Exception:
+        return None
+    if format_ != FORMAT or tuple(file_key) != key:
+        return None
+    return fields
+
+def _write(filename, key, fields):
+    try:
+        roslib.diskcache.write_atomic(filename, marshal.dumps((FORMAT, key, fields)))
+    except Exception:
+        # ROS_HOME may not be writable, cache is an optimization only
+        pass
+
+def _lru_get(lru_key, key):
+    with _lru_lock:
+        entry = _lru.pop(lru_key, None)
+        if entry is not None and entry[0] == key:
+            _lru[lru_key] = entry
+            return entry[1]
+    return None
+
+def _lru_put(lru_key, key, fields):
+    with _lru_lock:
+        _lru.pop(lru_key, None)
+        _lru[lru_key] = (key, fields)
+        while len(_lru) > _LRU_SIZE:
+            _lru.popitem(last=False)
+
+def clear():
+    """
+    Clear the in-process cache. The on-disk cache is left intact.
+    """
+    with _lru_lock:
+        _lru.clear()
+
+def parse_file(m, file):
+    """
+    Parse manifest file (package, stack), using cached fields if the
+    file has not changed. Equivalent to
+    L{roslib.manifestlib.parse_file()}.
+
+    @param m: field to populate
+    @type  m: L{roslib.manifestlib._Manifest}
+    @param file: manifest file path
+    @type  file: str
+    @return: return m, populated with parsed fields
+    @rtype: L{roslib.manifestlib._Manifest}
+    @raise ManifestException: if manifest is invalid
+    """
+    if file:
+        fields = roslib.snapshot.get_manifest_fields(os.path.abspath(file))
+        if fields is not None:
+            return _restore(m, fields)
+    if not file or not _enabled():
+        return roslib.manifestlib.parse_file(m, file)
+    try:
+        st = os.stat(file)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        # let parse_file() raise the appropriate error
+        return roslib.manifestlib.parse_file(m, file)
+
+    path = os.path.abspath(file)
+    key = _stat_key(st)
+    lru_key = (path, m._type)
+    fields = _lru_get(lru_key, key)
+    if fields is None:
+        filename = _cache_file(path, m._type)
+        fields = _read(filename, key)
+        if fields is None:
+            # errors are not cached, they are raised on every parse
+            roslib.manifestlib.parse_file(m, file)
+            fields = _dump(m)
+            _write(filename, key, fields)
+            _lru_put(lru_key, key, fields)
+            return m
+        _lru_put(lru_key, key, fields)
+    return _restore(m, fields)
+
+# load_all() does not start processes for fewer manifests than this
+_MIN_PARALLEL = 128
+
+def _load_chunk(args):
+    """
+    Process pool worker of L{load_all()}
+    @param args: manifest type and file paths
+    @type  args: (str, [str])
+    @return: for each path, fields or None and error or None
+    @rtype: [(str, tuple, Exception)]
+    """
+    type_, paths = args
+    results = []
+    for path in paths:
+        try:
+            m = parse_file(roslib.manifestlib._Manifest(type_), path)
+            results.append((path, _dump(m), None))
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = roslib.manifestlib.ManifestException(str(e))
+            results.append((path, None, e))
+    return results
+
+def load_all(paths, factory, processes=None, chunksize=None):
+    """
+    Parse many manifest files, fanning out to a process pool in
+    chunks. Manifests are keyed by the name of the directory they
+    are in; if multiple files have the same key, the first one wins.
+
+    @param paths: manifest file paths
+    @type  paths: [str]
+    @param factory: manifest class, e.g. L{roslib.manifest.Manifest}
+    @type  factory: fn()
+    @param processes: number of processes, defaults to the number of CPUs
+    @type  processes: int
+    @param chunksize: number of manifests per chunk
+    @type  chunksize: int
+    @return: manifests by name, and errors by path
+    @rtype: ({str: L{roslib.manifestlib._Manifest}}, {str: Exception})
+    """
+    manifests = {}
+    errors = {}
+    paths = list(paths)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes <= 1 or len(paths) < _MIN_PARALLEL:
+        for path in paths:
+            try:
+                m = parse_file(factory(), path)
+            except Exception as e:
+                errors[path] = e
+                continue
+            manifests.setdefault(os.path.basename(os.path.dirname(os.path.abspath(path))), m)
+        return manifests, errors
+
+    type_ = factory()._type
+    if chunksize is None:
+        # several chunks per process to balance the load
+        chunksize = max(16, len(paths) // (processes * 4) + 1)
+    chunks = [(type_, paths[i:i+chunksize]) for i in range(0, len(paths), chunksize)]
+    pool = multiprocessing.Pool(processes)
+    try:
+        # results in order of paths so that the first file wins
+        for results in pool.imap(_load_chunk, chunks):
+            for path, fields, error in results:
+                if error is not None:
+                    errors[path] = error
+                    continue
+                name = os.path.basename(os.path.dirname(os.path.abspath(path)))
+                if name not in manifests:
+                    manifests[name] = _restore(factory(), fields)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return manifests, errors
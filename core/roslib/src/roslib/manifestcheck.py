@@ -0,0 +1,157 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Batch validation of manifest.xml files for rosbuild. Validating a
+manifest used to cost one Python interpreter startup and roslib
+import per package. Instead, many manifests are validated in one
+invocation, and for every valid manifest an empty stamp file is
+written under ROS_HOME. rosbuild compares the modification time of
+the stamp with that of the manifest and only runs the validator if
+the manifest has changed since it was last found to be valid.
+
+The stamp of a manifest is ROS_HOME/roslib_manifest_check/<sha1>,
+where <sha1> is the hex SHA-1 of the physical path of the manifest,
+with symlinks resolved, so that a manifest found through a symlinked
+package path has the same stamp as when it is passed by its real path.
+rosbuild computes the same name with get_filename_component(REALPATH)
+and string(SHA1).
+
+Usage::
+
+  python -c "import sys, roslib.manifestcheck as m; sys.exit(m.main())" [--all] [manifest.xml...]
+"""
+
+from __future__ import print_function
+
+import hashlib
+import os
+import sys
+import traceback
+
+import roslib.diskcache
+import roslib.manifest
+
+STAMP_DIR = 'roslib_manifest_check'
+
+def get_stamp_file(path):
+    """
+    @param path: manifest path
+    @type  path: str
+    @return: path of stamp file of manifest
+    @rtype: str
+    """
+    digest = hashlib.sha1(os.path.realpath(path).encode('utf-8')).hexdigest()
+    return os.path.join(roslib.diskcache.get_cache_dir(STAMP_DIR), digest)
+
+def _write_stamp(path):
+    try:
+        roslib.diskcache.write_atomic(get_stamp_file(path), b'')
+    except (IOError, OSError):
+        # ROS_HOME may not be writable, stamps are an optimization only
+        pass
+
+def check_files(paths):
+    """
+    Validate manifest.xml files. A stamp is written for every valid file.
+    @param paths: manifest.xml paths
+    @type  paths: [str]
+    @return: error report by path of invalid manifests, in the format
+    of an uncaught exception as before
+    @rtype: {str: str}
+    """
+    errors = {}
+    for path in paths:
+        try:
+            roslib.manifest.parse_file(path)
+        except Exception:
+            errors[path] = traceback.format_exc()
+            continue
+        _write_stamp(path)
+    return errors
+
+def check_all(env=None):
+    """
+    Validate the manifest.xml files of all packages of the environment
+    in parallel, see L{roslib.manifest.load_all()}. A stamp is written
+    for every valid file.
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: number of valid manifests
+    @rtype: int
+    """
+    import roslib.crawler
+    import rospkg
+    if env is None:
+        env = os.environ
+    paths = []
+    for result in roslib.crawler.crawl(rospkg.get_ros_paths(env)):
+        paths.extend([os.path.join(d, roslib.manifest.MANIFEST_FILE) for d in result.packages.values()])
+    paths = [p for p in paths if os.path.isfile(p)]
+    manifests, errors = roslib.manifest.load_all(paths)
+    valid = 0
+    for path in paths:
+        if path not in errors:
+            _write_stamp(path)
+            valid += 1
+    return valid
+
+def main(argv=None, stderr=sys.stderr):
+    """
+    Command-line entry point. Errors of the specified manifests are
+    reported on stderr.
+    @return: exit code: 0 if all specified manifests are valid, 1 otherwise
+    @rtype: int
+    """
+    from optparse import OptionParser
+    if argv is None:
+        argv = sys.argv
+    parser = OptionParser(usage="usage: %prog [options] [manifest.xml...]")
+    parser.add_option("--all",
+                      dest="all", default=False, action="store_true",
+                      help="Also validate, and write stamps for, all manifests on the package path")
+    (options, args) = parser.parse_args(argv[1:])
+    if options.all:
+        try:
+            check_all()
+        except Exception:
+            # only the specified manifests are reported on
+            pass
+    errors = check_files(args)
+    for path in args:
+        if path in errors:
+            stderr.write(errors[path])
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
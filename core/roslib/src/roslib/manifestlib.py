@@ -43,6 +43,7 @@ import sys
 import os
 import xml.dom
 import xml.dom.minidom as dom
+import xml.parsers.expat as expat
 
 import roslib.exceptions
 
@@ -405,17 +406,102 @@ class VersionControl(object):
         else:
             return '<versioncontrol type="%s" />'%self.type
     
+class _Lazy(object):
+    """
+    Deferred value of a L{_Manifest} field
+    """
+    __slots__ = ['fn', 'source']
+
+    def __init__(self, fn, source=None):
+        """
+        @param fn: function that computes the value
+        @type  fn: fn()
+        @param source: (optional) marshal-able data that the value is
+        computed from, see L{_lazy_from_source()}
+        @type  source: (str, object)
+        """
+        self.fn = fn
+        self.source = source
+
+def _serialize_inner_xml(values):
+    """
+    @param values: ('text', text) or ('xml', source) for each element
+    @type  values: [(str, str)]
+    @return: XML serialization of the contents of the elements, joined
+    by ', ', identical to the DOM serialization
+    @rtype: str
+    """
+    xml = []
+    for kind, v in values:
+        if kind == 'xml':
+            xml.append(''.join([x.toxml() for x in dom.parseString(v).documentElement.childNodes]))
+        elif v:
+            xml.append(dom.Document().createTextNode(v).toxml())
+        else:
+            xml.append('')
+    return ', '.join(xml)
+
+def _parse_elements(sources):
+    """
+    @param sources: standalone XML documents of elements
+    @type  sources: [bytes]
+    @return: DOM elements
+    @rtype: [xml.dom.Element]
+    """
+    return [dom.parseString(s).documentElement for s in sources]
+
+def _lazy_from_source(source):
+    """
+    @param source: ('inner_xml', values) for L{_serialize_inner_xml()}
+    or ('elements', sources) for L{_parse_elements()}. Sources can be
+    persisted, e.g. by L{roslib.manifestcache}, without materializing
+    the value.
+    @type  source: (str, object)
+    @return: deferred value computed from source
+    @rtype: L{_Lazy}
+    """
+    kind, data = source
+    if kind == 'inner_xml':
+        return _Lazy(lambda: _serialize_inner_xml(data), source)
+    elif kind == 'elements':
+        return _Lazy(lambda: _parse_elements(data), source)
+    raise ValueError(kind)
+
+def _lazy_field(name):
+    """
+    @return: property for a L{_Manifest} field that can be assigned a
+    L{_Lazy} value, which is computed on first access
+    @rtype: property
+    """
+    attr = '_' + name
+    def fget(self):
+        value = getattr(self, attr)
+        if type(value) is _Lazy:
+            value = value.fn()
+            setattr(self, attr, value)
+        return value
+    def fset(self, value):
+        setattr(self, attr, value)
+    return property(fget, fset)
+
 class _Manifest(object):
     """
     Object representation of a ROS manifest file
+
+    Fields that are expensive to compute and rarely used, i.e. the
+    XHTML description and the DOM elements of unknown tags, are lazy:
+    the parser stores a lightweight representation, which is only
+    materialized on first access.
     """
-    __slots__ = ['description', 'brief', \
+    __slots__ = ['_description', 'brief', \
                  'author', 'license', 'license_url', 'url', \
                  'depends', 'rosdeps','platforms',\
                  'logo', 'exports', 'version',\
                  'versioncontrol', 'status', 'notes',\
-                 'unknown_tags',\
+                 '_unknown_tags',\
                  '_type']
+    description = _lazy_field('description')
+    unknown_tags = _lazy_field('unknown_tags')
     def __init__(self, _type='package'):
         self.description = self.brief = self.author = \
                            self.license = self.license_url = \
@@ -512,6 +598,263 @@ def parse(m, string, filename='string'):
     @return: return m, populated with parsed fields
     @rtype: L{_Manifest}
     """
+    try:
+        doc = _ExpatDocument(string)
+    except _NeedsDOM:
+        return parse_dom(m, string, filename)
+    except Exception as e:
+        raise ManifestException("invalid XML: %s"%e)
+
+    # the validation below mirrors parse_dom(), check by check, so
+    # that the same errors are raised in the same order
+    root = doc.root
+    if root.tag != m._type:
+        raise ManifestException("manifest must have a single '%s' element"%m._type)
+    children = {}
+    for e in root.children:
+        children.setdefault(e.tag, []).append(e)
+    def first_attr(tag, attr, default):
+        if tag in children:
+            return children[tag][0].attrs.get(attr, '') or ''
+        return default
+    def text(tag, required, merge_multiple=False, allowXHTML=False):
+        nodes = children.get(tag, [])
+        if required:
+            if not nodes:
+                return ''
+            if len(nodes) != 1 and not merge_multiple:
+                raise ManifestException("Invalid manifest file: must have only one '%s' element"%tag)
+        else:
+            if len(nodes) > 1 and not merge_multiple:
+                raise ManifestException("Invalid manifest file: must have a single '%s' element"%tag)
+            if not nodes:
+                return None
+        if allowXHTML:
+            return doc.inner_xml(nodes)
+        return ', '.join([e.text.strip() for e in nodes])
+
+    m.description = text('description', False, allowXHTML=True)
+    m.brief = first_attr('description', 'brief', '')
+    if m._type == 'package':
+        # don't consider rosbuild2 thirdparty depends, see check_depends()
+        depends = [e.attrs for e in children.get('depend', []) if 'thirdparty' not in e.attrs]
+        try:
+            packages = [d['package'] for d in depends]
+        except KeyError:
+            raise ManifestException("Invalid manifest file: depends is missing 'package' attribute")
+        m.depends = [Depend(p) for p in packages]
+    elif m._type == 'stack':
+        m.depends = [StackDepend(d) for d in [e.attrs['stack'] for e in children.get('depend', [])]]
+    m.rosdeps = [ROSDep(n) for n in [e.attrs['name'] for e in children.get('rosdep', [])]]
+    try:
+        vals = [(e.attrs['os'], e.attrs['version'], e.attrs.get('notes', '')) for e in children.get('platform', [])]
+    except KeyError as e:
+        raise ManifestException("<platform> tag is missing required '%s' attribute"%str(e))
+    m.platforms = [Platform(*v) for v in vals]
+    m.exports = []
+    for e in children.get('export', []):
+        m.exports.extend([Export(t.tag, t.attrs, t.text) for t in e.children])
+    if 'versioncontrol' in children:
+        e = children['versioncontrol'][0]
+        m.versioncontrol = VersionControl(e.attrs['type'], e.attrs['url'])
+    else:
+        m.versioncontrol = None
+    m.license = text('license', True)
+    m.license_url = first_attr('license', 'url', '')
+    m.status = first_attr('review', 'status', 'unreviewed')
+    m.notes = first_attr('review', 'notes', '')
+    m.author = text('author', True, merge_multiple=True)
+    m.url = text('url', False)
+    m.version = text('version', False)
+    m.logo = text('logo', False)
+
+    # do some validation on what we just parsed
+    if m._type == 'stack':
+        if m.exports:
+            raise ManifestException("stack manifests are not allowed to have exports")
+        if m.rosdeps:
+            raise ManifestException("stack manifests are not allowed to have rosdeps") 
+
+    # store unrecognized tags
+    unknown_tags = [e for e in root.children if e.tag not in VALID]
+    m.unknown_tags = doc.dom_elements(unknown_tags) if unknown_tags else []
+    return m
+
+class _NeedsDOM(Exception):
+    """
+    Document cannot be parsed by L{_ExpatDocument}: its encoding
+    cannot be sliced by byte offsets or it has a document type
+    declaration, which element fragments would not inherit.
+    """
+    pass
+
+class _Element(object):
+    """
+    Lightweight record of a manifest element
+    """
+    __slots__ = ['tag', 'attrs', 'text', 'children', 'start', 'end', 'plain', 'events']
+
+    def __init__(self, tag, attrs, start):
+        self.tag = tag
+        self.attrs = attrs
+        # contents of direct text children, excluding CDATA sections
+        self.text = ''
+        # child elements (only recorded up to depth MAX_DEPTH)
+        self.children = []
+        # byte range of element in document
+        self.start = start
+        self.end = None
+        # True if element only contains text
+        self.plain = True
+        # True if any parse events occurred inside element
+        self.events = False
+
+class _ExpatDocument(object):
+    """
+    Single-pass expat parse of a manifest. Elements are recorded up
+    to the depth needed to validate a manifest (root, its children and
+    their children, e.g. export tags). The rare fields that need a DOM,
+    i.e. XHTML descriptions and unknown tags, are produced from the
+    byte range of the element.
+    """
+
+    MAX_DEPTH = 3
+
+    def __init__(self, string):
+        """
+        @param string: manifest XML
+        @type  string: str
+        @raise xml.parsers.expat.ExpatError: if string is not valid XML
+        """
+        if isinstance(string, bytes):
+            self.data = string
+            parser = expat.ParserCreate()
+            self.encoding = None
+        else:
+            # same as minidom: unicode input is parsed as UTF-8,
+            # regardless of the declared encoding
+            self.data = string.encode('utf-8')
+            parser = expat.ParserCreate('utf-8')
+            self.encoding = 'utf-8'
+        parser.buffer_text = True
+        parser.XmlDeclHandler = self._xml_decl
+        parser.StartDoctypeDeclHandler = self._doctype
+        parser.StartElementHandler = self._start
+        parser.EndElementHandler = self._end
+        parser.CharacterDataHandler = self._data
+        parser.StartCdataSectionHandler = self._start_cdata
+        parser.EndCdataSectionHandler = self._end_cdata
+        parser.CommentHandler = self._markup
+        parser.ProcessingInstructionHandler = self._pi
+        self._parser = parser
+        self._stack = []
+        self._cdata = False
+        self.root = None
+        parser.Parse(self.data, True)
+        self._parser = None
+
+    def _xml_decl(self, version, encoding, standalone):
+        if encoding and self.encoding is None:
+            self.encoding = encoding
+            if encoding.lower().replace('-', '').startswith(('utf16', 'utf32', 'ucs')):
+                raise _NeedsDOM(encoding)
+
+    def _doctype(self, *args):
+        raise _NeedsDOM()
+
+    def _event(self):
+        if self._stack:
+            self._stack[-1].events = True
+
+    def _start(self, name, attrs):
+        self._event()
+        e = _Element(name, attrs, self._parser.CurrentByteIndex)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.plain = False
+            if len(self._stack) < self.MAX_DEPTH:
+                parent.children.append(e)
+        else:
+            self.root = e
+        self._stack.append(e)
+
+    def _end(self, name):
+        e = self._stack.pop()
+        i = self._parser.CurrentByteIndex
+        if not e.events and self.data[i-2:i] == b'/>':
+            # empty-element tag, index is already past the element
+            e.end = i
+        else:
+            e.end = self.data.index(b'>', i) + 1
+
+    def _data(self, data):
+        self._event()
+        if self._stack and not self._cdata:
+            self._stack[-1].text += data
+
+    def _start_cdata(self):
+        self._markup()
+        self._cdata = True
+
+    def _end_cdata(self):
+        self._cdata = False
+
+    def _markup(self, *args):
+        self._event()
+        if self._stack:
+            self._stack[-1].plain = False
+
+    def _pi(self, target, data):
+        # processing instructions before the root element are not
+        # part of any element
+        self._markup()
+
+    def source(self, e):
+        """
+        @return: standalone XML document of element e. Unlike the
+        parsed document, it is small enough to be retained.
+        @rtype: bytes
+        """
+        header = b''
+        if self.encoding:
+            header = ('<?xml version="1.0" encoding="%s"?>'%self.encoding).encode('ascii')
+        return header + self.data[e.start:e.end]
+
+    def dom_elements(self, elements):
+        """
+        @return: deferred DOMs of elements
+        @rtype: L{_Lazy}
+        """
+        return _lazy_from_source(('elements', [self.source(e) for e in elements]))
+
+    def inner_xml(self, elements):
+        """
+        @return: deferred XML serialization of the contents of
+        elements, joined by ', ', identical to the DOM serialization
+        @rtype: L{_Lazy}
+        """
+        # ('text', text) for elements that only contain text, ('xml',
+        # source) otherwise. Tagged, as byte strings and text cannot be
+        # told apart by type on Python 2.
+        values = []
+        for e in elements:
+            if e.plain:
+                values.append(('text', e.text))
+            else:
+                values.append(('xml', self.source(e)))
+        return _lazy_from_source(('inner_xml', values))
+
+def parse_dom(m, string, filename='string'):
+    """
+    Parse manifest.xml string contents by building a DOM. This is
+    slower than L{parse()}, which produces the same result.
+    @param string: manifest.xml contents
+    @type  string: str
+    @param m: field to populate
+    @type  m: L{_Manifest}
+    @return: return m, populated with parsed fields
+    @rtype: L{_Manifest}
+    """
     try:
         d = dom.parseString(string)
     except Exception as e:
@@ -47,7 +47,9 @@ except ImportError:
     from io import StringIO # Python 3.x
 
 import os
+import re
 import sys
+import threading
 import string
 
 import rospkg
@@ -56,6 +58,8 @@ import roslib.manifest
 import roslib.packages
 import roslib.names
 import roslib.resources
+import roslib.snapshot
+import roslib.speccache
 
 VERBOSE = False
 
@@ -76,6 +80,11 @@ COMMENTCHAR = '#'
 
 class MsgSpecException(Exception): pass
 
+try:
+    _intern = sys.intern
+except AttributeError:
+    _intern = intern #Python 2
+
 #TODOXXX: unit test
 def base_msg_type(type_):
     """
@@ -250,6 +259,25 @@ def _strify_spec(spec, buff=None, indent=''):
             _strify_spec(subspec, buff, indent + '  ')
     return buff.getvalue()
 
+# maximum number of entries of the parser caches below
+_CACHE_SIZE = 65536
+# {type: (base_type, is_array, array_len, is_header, is_builtin)}
+_field_type_cache = {}
+
+def _parse_field_type(type_):
+    """
+    Memoized parse of field type for L{Field}
+    @raise MsgSpecException: if type_ cannot be parsed
+    """
+    info = _field_type_cache.get(type_, None)
+    if info is None:
+        base_type, is_array, array_len = parse_type(type_)
+        info = (_intern(base_type), is_array, array_len, is_header_type(base_type), is_builtin(base_type))
+        if len(_field_type_cache) >= _CACHE_SIZE:
+            _field_type_cache.clear()
+        _field_type_cache[type_] = info
+    return info
+
 class Field(object):
     """
     Container class for storing information about a single field in a MsgSpec
@@ -267,9 +295,7 @@ class Field(object):
     def __init__(self, name, type):
         self.name = name
         self.type = type
-        (self.base_type, self.is_array, self.array_len) = parse_type(type)
-        self.is_header = is_header_type(self.base_type)
-        self.is_builtin = is_builtin(self.base_type)
+        (self.base_type, self.is_array, self.array_len, self.is_header, self.is_builtin) = _parse_field_type(type)
 
     def __repr__(self):
         return "[%s, %s, %s, %s, %s]"%(self.name, self.type, self.base_type, self.is_array, self.array_len)
@@ -357,40 +383,11 @@ def reinit():
     Reinitialize roslib.msgs. This API is for message generators
     (e.g. genpy) that need to re-initialize the registration table.
     """
-    global _initialized , _loaded_packages
-    # unset the initialized state and unregister everything 
-    _initialized = False
-    del _loaded_packages[:]
-    REGISTERED_TYPES.clear()
-    _init()
-    
-_initialized = False
+    _default_registry.reinit()
+
 def _init():
     #lazy-init
-    global _initialized
-    if _initialized:
-        return
-
-    fname = '%s%s'%(HEADER, EXT)
-    std_msgs_dir = roslib.packages.get_pkg_dir('std_msgs')
-    if std_msgs_dir is None:
-        raise MsgSpecException("Unable to locate roslib: %s files cannot be loaded"%EXT)
-    
-    header = os.path.join(std_msgs_dir, 'msg', fname)
-    if not os.path.isfile(header):
-        sys.stderr.write("ERROR: cannot locate %s. Expected to find it at '%s'\n"%(fname, header))
-        return False
-
-    # register Header under both contexted and de-contexted name
-    _, spec = load_from_file(header, '')
-    register(HEADER, spec)
-    register('std_msgs/'+HEADER, spec)    
-    # backwards compat, REP 100
-    register('roslib/'+HEADER, spec)    
-    for k, spec in EXTENDED_BUILTINS.items():
-        register(k, spec)
-        
-    _initialized = True
+    return _default_registry.init()
 
 # .msg file routines ##############################################################       
 
@@ -410,6 +407,11 @@ def list_msg_types(package, include_depends):
     @param include_depends bool: if True, will also list messages in package dependencies
     @return [str]: message type names
     """
+    snapshot = roslib.snapshot.get_env_snapshot()
+    if snapshot is not None:
+        types = snapshot.list_types(package, include_depends, 'msg')
+        if types is not None:
+            return types
     types = roslib.resources.list_package_resources(package, include_depends, 'msg', _msg_filter)
     return [x[:-len(EXT)] for x in types]
 
@@ -438,12 +440,28 @@ def get_pkg_msg_specs(package):
     @rtype: [(str, L{MsgSpec}), [str]]
     """
     _init()
-    types = list_msg_types(package, False)
+    return _get_pkg_msg_specs_by_dir(package, roslib.packages.get_pkg_dir(package))
+
+def _get_pkg_msg_specs_by_dir(package, package_dir):
+    """
+    List all messages that a package contains, with the package
+    directory already resolved.
+    
+    @param package: package to load messages from
+    @type  package: str
+    @param package_dir: directory of package
+    @type  package_dir: str
+    @return: list of message type names and specs for package, as well as a list
+        of message names that could not be processed. 
+    @rtype: [(str, L{MsgSpec}), [str]]
+    """
+    types = roslib.resources.list_package_resources_by_dir(package_dir, False, 'msg', _msg_filter)
+    types = [x[:-len(EXT)] for x in types]
     specs = [] #no fancy list comprehension as we want to show errors
     failures = []
     for t in types:
         try: 
-            typespec = load_from_file(msg_file(package, t), package)
+            typespec = load_from_file(os.path.join(package_dir, 'msg', t+EXT), package)
             specs.append(typespec)
         except Exception as e:
             failures.append(t)
@@ -459,33 +477,7 @@ def load_package_dependencies(package, load_recursive=False):
         prevent packages from incorrectly inheriting dependencies.
     @type  load_recursive: bool
     """
-    global _loaded_packages
-    _init()    
-    if VERBOSE:
-        print("Load dependencies for package", package)
-        
-    if not load_recursive:
-        manifest_file = roslib.manifest.manifest_file(package, True)
-        m = roslib.manifest.parse_file(manifest_file)
-        depends = [d.package for d in m.depends] # #391
-    else:
-        depends = rospkg.RosPack().get_depends(package, implicit=True)
-
-    msgs = []
-    failures = []
-    for d in depends:
-        if VERBOSE:
-            print("Load dependency", d)
-        #check if already loaded
-        # - we are dependent on manifest.getAll returning first-order dependencies first
-        if d in _loaded_packages or d == package:
-            continue
-        _loaded_packages.append(d)
-        specs, failed = get_pkg_msg_specs(d)
-        msgs.extend(specs)
-        failures.extend(failed)
-    for key, spec in msgs:
-        register(key, spec)
+    _default_registry.load_package_dependencies(package, load_recursive)
 
 def load_package(package):
     """
@@ -497,26 +489,7 @@ def load_package(package):
     @param package: package name
     @type  package: str
     """
-    global _loaded_packages
-    _init()    
-    if VERBOSE:
-        print("Load package", package)
-        
-    #check if already loaded
-    # - we are dependent on manifest.getAll returning first-order dependencies first
-    if package in _loaded_packages:
-        if VERBOSE:
-            print("Package %s is already loaded"%package)
-        return
-
-    _loaded_packages.append(package)
-    specs, failed = get_pkg_msg_specs(package)
-    if VERBOSE:
-        print("Package contains the following messages: %s"%specs)
-    for key, spec in specs:
-        #register spec under both local and fully-qualified key
-        register(key, spec)
-        register(package + roslib.names.PRN_SEPARATOR + key, spec)        
+    _default_registry.load_package(package)
 
 def _convert_val(type_, val):
     """
@@ -574,6 +547,82 @@ def load_by_type(msgtype, package_context=''):
         raise MsgSpecException("Cannot locate message type [%s], package [%s] does not exist"%(msgtype, pkg)) 
     return load_from_file(m_f, pkg)
 
+# line with a field declaration 'type name' and an optional comment.
+# Anything else, e.g. constants, goes through _load_line().
+_FIELD_RE = re.compile(r'\s*([^\s=#]+) +([^\s=#]+)\s*(?:#.*)?$')
+# {(package_context, type): resolved type} of valid field types
+_field_types = {}
+# valid field names
+_field_names = set()
+
+def _resolve_field_type(type_, package_context):
+    """
+    Memoized validation and resolution of field type declaration
+    @return: type_, prefixed with package_context if it is relative
+    @rtype: str
+    @raise MsgSpecException: if type_ is not a legal message type
+    """
+    key = (package_context, type_)
+    resolved = _field_types.get(key, None)
+    if resolved is None:
+        if not is_valid_msg_type(type_):
+            raise MsgSpecException("%s is not a legal message type"%type_)
+        resolved = type_
+        if package_context and not SEP in type_:
+            if not base_msg_type(type_) in RESERVED_TYPES:
+                resolved = "%s/%s"%(package_context, type_)
+        resolved = _intern(resolved)
+        if len(_field_types) >= _CACHE_SIZE:
+            _field_types.clear()
+        _field_types[key] = resolved
+    return resolved
+
+def _load_line(orig_line, l, package_context, types, names, constants):
+    """
+    Parse a single declaration of a .msg file and append it to
+    types/names or constants.
+    @param orig_line: line of .msg file
+    @type  orig_line: str
+    @param l: orig_line stripped of comments and surrounding whitespace
+    @type  l: str
+    @raise MsgSpecException: if declaration is invalid
+    """
+    splits = [s for s in [x.strip() for x in l.split(" ")] if s] #split type/name, filter out empties
+    type_ = splits[0]
+    if not is_valid_msg_type(type_):
+        raise MsgSpecException("%s is not a legal message type"%type_)
+    if CONSTCHAR in l:
+        if not is_valid_constant_type(type_):
+            raise MsgSpecException("%s is not a legal constant type"%type_)
+        if type_ == 'string':
+            # strings contain anything to the right of the equals sign, there are no comments allowed
+            idx = orig_line.find(CONSTCHAR)
+            name = orig_line[orig_line.find(' ')+1:idx]
+            val = orig_line[idx+1:]
+        else:
+            splits = [x.strip() for x in ' '.join(splits[1:]).split(CONSTCHAR)] #resplit on '='
+            if len(splits) != 2:
+                raise MsgSpecException("Invalid declaration: %s"%l)
+            name = splits[0]
+            val = splits[1]
+        try:
+            val_converted  = _convert_val(type_, val)
+        except Exception as e:
+            raise MsgSpecException("Invalid declaration: %s"%e)
+        constants.append(Constant(type_, name, val_converted, val.strip()))
+    else:
+        if len(splits) != 2:
+            raise MsgSpecException("Invalid declaration: %s"%l)
+        name = splits[1]
+        if not is_valid_msg_field_name(name):
+            raise MsgSpecException("%s is not a legal message field name"%name)
+        if package_context and not SEP in type_:
+            if not base_msg_type(type_) in RESERVED_TYPES:
+                #print "rewrite", type_, "to", "%s/%s"%(package_context, type_)
+                type_ = "%s/%s"%(package_context, type_)
+        types.append(type_)
+        names.append(name)
+
 def load_from_string(text, package_context='', full_name='', short_name=''):
     """
     Load message specification from a string.
@@ -586,50 +635,71 @@ def load_from_string(text, package_context='', full_name='', short_name=''):
     @rtype: L{MsgSpec}
     @raise MsgSpecException: if syntax errors or other problems are detected in file
     """
+    return _load_from_string(text, package_context, full_name, short_name)
+
+def _load_from_string(text, package_context='', full_name='', short_name='', fast=True):
+    """
+    Implementation of L{load_from_string()}. Plain field declarations
+    are matched with a single regular expression, and their types are
+    validated and resolved once per package context.
+    @param fast: if False, parse every declaration with L{_load_line()}
+    @type  fast: bool
+    """
     types = []
     names = []
     constants = []
+    field_match = _FIELD_RE.match
+    field_types = _field_types
+    field_names = _field_names
     for orig_line in text.split('\n'):
-        l = orig_line.split(COMMENTCHAR)[0].strip() #strip comments
-        if not l:
-            continue #ignore empty lines
-        splits = [s for s in [x.strip() for x in l.split(" ")] if s] #split type/name, filter out empties
-        type_ = splits[0]
-        if not is_valid_msg_type(type_):
-            raise MsgSpecException("%s is not a legal message type"%type_)
-        if CONSTCHAR in l:
-            if not is_valid_constant_type(type_):
-                raise MsgSpecException("%s is not a legal constant type"%type_)
-            if type_ == 'string':
-                # strings contain anything to the right of the equals sign, there are no comments allowed
-                idx = orig_line.find(CONSTCHAR)
-                name = orig_line[orig_line.find(' ')+1:idx]
-                val = orig_line[idx+1:]
-            else:
-                splits = [x.strip() for x in ' '.join(splits[1:]).split(CONSTCHAR)] #resplit on '='
-                if len(splits) != 2:
-                    raise MsgSpecException("Invalid declaration: %s"%l)
-                name = splits[0]
-                val = splits[1]
-            try:
-                val_converted  = _convert_val(type_, val)
-            except Exception as e:
-                raise MsgSpecException("Invalid declaration: %s"%e)
-            constants.append(Constant(type_, name, val_converted, val.strip()))
-        else:
-            if len(splits) != 2:
-                raise MsgSpecException("Invalid declaration: %s"%l)
-            name = splits[1]
+        m = field_match(orig_line) if fast else None
+        if m is None:
+            l = orig_line.split(COMMENTCHAR)[0].strip() #strip comments
+            if l: #ignore empty lines
+                _load_line(orig_line, l, package_context, types, names, constants)
+            continue
+        type_, name = m.groups()
+        resolved = field_types.get((package_context, type_), None)
+        if resolved is None:
+            resolved = _resolve_field_type(type_, package_context)
+        type_ = resolved
+        if name not in field_names:
             if not is_valid_msg_field_name(name):
                 raise MsgSpecException("%s is not a legal message field name"%name)
-            if package_context and not SEP in type_:
-                if not base_msg_type(type_) in RESERVED_TYPES:
-                    #print "rewrite", type_, "to", "%s/%s"%(package_context, type_)
-                    type_ = "%s/%s"%(package_context, type_)
-            types.append(type_)
-            names.append(name)
+            if len(_field_names) >= _CACHE_SIZE:
+                _field_names.clear()
+            _field_names.add(name)
+        types.append(type_)
+        names.append(name)
     return MsgSpec(types, names, constants, text, full_name, short_name, package_context)
 
+def _dump_spec(spec):
+    """
+    @return: fields of spec, without its text, for L{roslib.speccache}
+    @rtype: tuple
+    """
+    return (spec.types, spec.names, [(c.type, c.name, c.val, c.val_text) for c in spec.constants])
+
+def _restore_spec(fields, text, package_context, full_name, short_name):
+    """
+    @return: spec from fields created by L{_dump_spec()}
+    @rtype: L{MsgSpec}
+    """
+    types, names, constants = fields
+    return MsgSpec(list(types), list(names), [Constant(*c) for c in constants], text,
+                   full_name, short_name, package_context)
+
+def _load_from_string_cached(text, package_context, full_name, short_name):
+    """
+    L{load_from_string()}, using the spec cache
+    """
+    fields = roslib.speccache.get('msg', text, package_context)
+    if fields is not None:
+        return _restore_spec(fields, text, package_context, full_name, short_name)
+    spec = load_from_string(text, package_context, full_name, short_name)
+    roslib.speccache.put('msg', text, package_context, _dump_spec(spec))
+    return spec
+
 def load_from_file(file_path, package_context=''):
     """
     Convert the .msg representation in the file to a MsgSpec instance.
@@ -664,7 +734,7 @@ def load_from_file(file_path, package_context=''):
     try:
         try:
             text = f.read()
-            return (type_, load_from_string(text, package_context, type_, base_type_))
+            return (type_, _load_from_string_cached(text, package_context, type_, base_type_))
         except MsgSpecException as e:
             raise MsgSpecException('%s: %s'%(file_name, e))
     finally:
@@ -719,8 +789,197 @@ EXTENDED_BUILTINS = { TIME : load_from_string(TIME_MSG), DURATION: load_from_str
 
 RESERVED_TYPES  = BUILTIN_TYPES + [HEADER]
 
-REGISTERED_TYPES = { } 
-_loaded_packages = [] #keep track of packages so that we only load once (note: bug #59)
+class MsgRegistry(object):
+    """
+    Table of registered message specs and of the packages whose
+    messages have been loaded into it. The module-level registration
+    functions operate on a default instance, L{get_default_registry()};
+    code generators that process several packages concurrently can
+    each use their own instance instead.
+    """
+
+    def __init__(self):
+        ## registered specs by type name
+        self.types = {}
+        #keep track of packages so that we only load once (note: bug #59)
+        self.loaded_packages = set()
+        self.initialized = False
+        ## md5 sums of registered types by resolved type name, see
+        ## L{roslib.gentools.compute_md5_text()}
+        self.md5s = {}
+        self.lock = threading.RLock()
+
+    def reinit(self):
+        """
+        Unregister everything, then register the builtin types again.
+        """
+        with self.lock:
+            self.initialized = False
+            self.loaded_packages.clear()
+            self.types.clear()
+            self.md5s.clear()
+            self.init()
+
+    def init(self):
+        """
+        Register Header and the extended builtin types, if not
+        already done.
+        @return: False if the Header message cannot be found
+        @rtype: bool
+        """
+        with self.lock:
+            if self.initialized:
+                return
+
+            fname = '%s%s'%(HEADER, EXT)
+            std_msgs_dir = roslib.packages.get_pkg_dir('std_msgs')
+            if std_msgs_dir is None:
+                raise MsgSpecException("Unable to locate roslib: %s files cannot be loaded"%EXT)
+
+            header = os.path.join(std_msgs_dir, 'msg', fname)
+            if not os.path.isfile(header):
+                sys.stderr.write("ERROR: cannot locate %s. Expected to find it at '%s'\n"%(fname, header))
+                return False
+
+            # register Header under both contexted and de-contexted name
+            _, spec = load_from_file(header, '')
+            self.register(HEADER, spec)
+            self.register('std_msgs/'+HEADER, spec)
+            # backwards compat, REP 100
+            self.register('roslib/'+HEADER, spec)
+            for k, spec in EXTENDED_BUILTINS.items():
+                self.register(k, spec)
+
+            self.initialized = True
+
+    def is_registered(self, msg_type_name):
+        """
+        @param msg_type_name: name of message type
+        @type  msg_type_name: str
+        @return: True if msg spec for specified msg type name is
+        registered. NOTE: builtin types are not registered.
+        @rtype: bool
+        """
+        return msg_type_name in self.types
+
+    def get_registered(self, msg_type_name, default_package=None):
+        """
+        @param msg_type_name: name of message type
+        @type  msg_type_name: str
+        @return: msg spec for msg type name
+        @rtype: L{MsgSpec}
+        """
+        types = self.types
+        if msg_type_name in types:
+            return types[msg_type_name]
+        elif default_package:
+            # if msg_type_name has no package specifier, try with default package resolution
+            p, n = roslib.names.package_resource_name(msg_type_name)
+            if not p:
+                return types[roslib.names.resource_name(default_package, msg_type_name)]
+        raise KeyError(msg_type_name)
+
+    def register(self, msg_type_name, msg_spec):
+        """
+        Load MsgSpec into the type dictionary
+
+        @param msg_type_name: name of message type
+        @type  msg_type_name: str
+        @param msg_spec: spec to load
+        @type  msg_spec: L{MsgSpec}
+        """
+        if VERBOSE:
+            print("Register msg %s"%msg_type_name)
+        with self.lock:
+            old = self.types.get(msg_type_name, None)
+            if old is not None and old != msg_spec:
+                # md5 sums of dependent types may change as well
+                self.md5s.clear()
+            self.types[msg_type_name] = msg_spec
+
+    def load_package_dependencies(self, package, load_recursive=False):
+        """
+        Register all messages that the specified package depends on.
+
+        @param load_recursive: (optional) if True, load all dependencies,
+            not just direct dependencies. By default, this is false to
+            prevent packages from incorrectly inheriting dependencies.
+        @type  load_recursive: bool
+        """
+        with self.lock:
+            self.init()
+            if VERBOSE:
+                print("Load dependencies for package", package)
+
+            if not load_recursive:
+                manifest_file = roslib.manifest.manifest_file(package, True)
+                m = roslib.manifest.parse_file(manifest_file)
+                depends = [d.package for d in m.depends] # #391
+            else:
+                depends = rospkg.RosPack().get_depends(package, implicit=True)
+
+            loaded = self.loaded_packages
+            # resolve all dependencies in one pass
+            pkg_dirs, missing = roslib.packages.get_pkg_dirs(
+                [d for d in depends if d not in loaded and d != package])
+            msgs = []
+            failures = []
+            for d in depends:
+                if VERBOSE:
+                    print("Load dependency", d)
+                #check if already loaded
+                # - we are dependent on manifest.getAll returning first-order dependencies first
+                if d in loaded or d == package:
+                    continue
+                if d in missing:
+                    raise roslib.packages.InvalidROSPkgException(missing[d])
+                loaded.add(d)
+                specs, failed = _get_pkg_msg_specs_by_dir(d, pkg_dirs[d])
+                msgs.extend(specs)
+                failures.extend(failed)
+            for key, spec in msgs:
+                self.register(key, spec)
+
+    def load_package(self, package):
+        """
+        Load package into the registry. All messages found in the
+        package will be registered if they are successfully loaded.
+
+        @param package: package name
+        @type  package: str
+        """
+        with self.lock:
+            self.init()
+            if VERBOSE:
+                print("Load package", package)
+
+            #check if already loaded
+            # - we are dependent on manifest.getAll returning first-order dependencies first
+            if package in self.loaded_packages:
+                if VERBOSE:
+                    print("Package %s is already loaded"%package)
+                return
+
+            self.loaded_packages.add(package)
+            specs, failed = _get_pkg_msg_specs_by_dir(package, roslib.packages.get_pkg_dir(package))
+            if VERBOSE:
+                print("Package contains the following messages: %s"%specs)
+            for key, spec in specs:
+                #register spec under both local and fully-qualified key
+                self.register(key, spec)
+                self.register(package + roslib.names.PRN_SEPARATOR + key, spec)
+
+_default_registry = MsgRegistry()
+# aliases of the default registry's tables, for backwards compatibility
+REGISTERED_TYPES = _default_registry.types
+_loaded_packages = _default_registry.loaded_packages
+
+def get_default_registry():
+    """
+    @return: registry used by the module-level registration functions
+    @rtype: L{MsgRegistry}
+    """
+    return _default_registry
 
 def is_registered(msg_type_name):
     """
@@ -739,14 +998,7 @@ def get_registered(msg_type_name, default_package=None):
     @return: msg spec for msg type name
     @rtype: L{MsgSpec}
     """
-    if msg_type_name in REGISTERED_TYPES:
-        return REGISTERED_TYPES[msg_type_name]
-    elif default_package:
-        # if msg_type_name has no package specifier, try with default package resolution
-        p, n = roslib.names.package_resource_name(msg_type_name)
-        if not p:
-            return REGISTERED_TYPES[roslib.names.resource_name(default_package, msg_type_name)]
-    raise KeyError(msg_type_name)
+    return _default_registry.get_registered(msg_type_name, default_package)
 
 def register(msg_type_name, msg_spec):
     """
@@ -757,7 +1009,5 @@ def register(msg_type_name, msg_spec):
     @param msg_spec: spec to load
     @type  msg_spec: L{MsgSpec}
     """
-    if VERBOSE:
-        print("Register msg %s"%msg_type_name)
-    REGISTERED_TYPES[msg_type_name] = msg_spec
+    _default_registry.register(msg_type_name, msg_spec)
 
@@ -43,13 +43,21 @@ import os
 import sys
 import stat
 import string
+import threading
+import time
 
-from subprocess import Popen, PIPE
+from collections import OrderedDict
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 
 from catkin.find_in_workspaces import find_in_workspaces as catkin_find
 import rospkg
 
+import roslib.crawler
+import roslib.envcache
 import roslib.manifest
+import roslib.pkgindex
+import roslib.snapshot
 
 SRC_DIR = 'src'
 
@@ -72,16 +80,83 @@ class MultipleNodesException(ROSPkgException):
     Exception that indicates that multiple ROS nodes by the same name are in the same package.
     """
     pass
+class ResourceTimeoutException(ROSPkgException):
+    """
+    Exception that indicates that searching for a resource did not
+    complete within the specified timeout.
+    """
+    pass
 
 # TODO: go through the code and eliminate unused methods -- there's far too many combos here
 
-MANIFEST_FILE = 'manifest.xml'
-PACKAGE_FILE = 'package.xml'
+MANIFEST_FILE = roslib.crawler.MANIFEST_FILE
+PACKAGE_FILE = roslib.crawler.PACKAGE_FILE
 
 #
 # Map package/directory structure
 #
 
+# bounded LRU of (markers, resolve, directory) -> (directory containing
+# marker, marker file, stat key of marker file). A hit is validated by
+# the stat key of the marker file alone, so markers that are added in
+# the directories below the one found are not noticed. Results without
+# a marker are re-computed, from the cached results of the parent.
+_DIR_CACHE_SIZE = 4096
+_dir_cache = OrderedDict()
+_dir_cache_lock = threading.Lock()
+
+def _marker_stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size, st.st_ino)
+
+def _get_dir_cache_entry(d, markers, resolve):
+    key = (markers, resolve, d)
+    with _dir_cache_lock:
+        entry = _dir_cache.pop(key, None)
+        if entry is not None:
+            _dir_cache[key] = entry
+    if entry is not None and entry[1] is not None:
+        if _marker_stat_key(entry[1]) == entry[2]:
+            return entry
+
+    entry = None
+    for m in markers:
+        path = os.path.join(d, m)
+        marker_key = _marker_stat_key(path)
+        if marker_key is not None:
+            entry = (d, path, marker_key)
+            break
+    if entry is None:
+        parent = os.path.dirname(os.path.realpath(d) if resolve else d)
+        if not parent or parent == d:
+            entry = (None, None, None)
+        else:
+            # siblings and children of a resolved directory hit here
+            entry = _get_dir_cache_entry(parent, markers, resolve)
+    with _dir_cache_lock:
+        _dir_cache[key] = entry
+        while len(_dir_cache) > _DIR_CACHE_SIZE:
+            _dir_cache.popitem(last=False)
+    return entry
+
+def _find_marker_dir(d, markers, resolve=False):
+    """
+    Find the nearest directory, starting at d and walking up, that
+    contains one of the marker files. Results are kept in a bounded
+    LRU cache keyed by directory and validated against the stat of
+    the marker file found.
+    @param markers: names of marker files, e.g. ('stack.xml',)
+    @type  markers: (str)
+    @param resolve: resolve symlinks before walking up to the parent
+    @type  resolve: bool
+    @return: directory containing marker, or None
+    @rtype: str
+    """
+    return _get_dir_cache_entry(d, tuple(markers), resolve)[0]
+
 def get_dir_pkg(d):
     """
     Get the package that the directory is contained within. This is
@@ -95,25 +170,301 @@ def get_dir_pkg(d):
     """
     #TODO: the realpath is going to create issues with symlinks, most likely
 
-    parent = os.path.dirname(os.path.realpath(d))
     #walk up until we hit ros root or ros/pkg
-    while not os.path.exists(os.path.join(d, MANIFEST_FILE)) and not os.path.exists(os.path.join(d, PACKAGE_FILE)) and parent != d:
-        d = parent
-        parent = os.path.dirname(d)
-    if os.path.exists(os.path.join(d, MANIFEST_FILE)) or os.path.exists(os.path.join(d, PACKAGE_FILE)):
+    d = _find_marker_dir(d, (MANIFEST_FILE, PACKAGE_FILE), resolve=True)
+    if d is not None:
         pkg = os.path.basename(os.path.abspath(d))
         return d, pkg
     return None, None
 
-_pkg_dir_cache = {}
+def _is_pkg_dir(d):
+    """
+    @return: True if d contains a package manifest
+    @rtype: bool
+    """
+    return os.path.isfile(os.path.join(d, MANIFEST_FILE)) or \
+        os.path.isfile(os.path.join(d, PACKAGE_FILE))
+
+class _PackageLocator(object):
+    """
+    In-process replacement for 'rospack find'. The package paths of a
+    single (ROS_ROOT, ROS_PACKAGE_PATH) configuration are crawled once
+    and the package->directory map is kept in memory. The modification
+    times of the crawled directories are recorded so that packages
+    that are added, moved or deleted later on are picked up by a
+    re-crawl without ever having to spawn rospack.
+    """
+
+    def __init__(self, ros_root, ros_package_path):
+        """
+        @param ros_root: ROS_ROOT value
+        @type  ros_root: str
+        @param ros_package_path: ROS_PACKAGE_PATH value
+        @type  ros_package_path: str
+        """
+        self.ros_root = ros_root
+        self.ros_package_path = ros_package_path
+        self.paths = rospkg.environment._compute_package_paths(ros_root, ros_package_path)
+        self._pkg_dirs = None
+        self._dir_mtimes = {}
+        # optional roslib.watcher.Watcher that keeps the package map up to date
+        self.watcher = None
+        # package map of a snapshot is used as is
+        snapshot = roslib.snapshot.get_snapshot(ros_root, ros_package_path)
+        self.frozen = snapshot is not None
+        if self.frozen:
+            self._pkg_dirs = dict(snapshot.packages)
+
+    def _crawl(self):
+        pkg_dirs = {}
+        dir_mtimes = {}
+        # merge in reverse order so that the first path wins
+        for result in reversed(roslib.crawler.crawl(self.paths)):
+            pkg_dirs.update(result.packages)
+            dir_mtimes.update(result.dir_mtimes)
+        self._pkg_dirs = pkg_dirs
+        self._dir_mtimes = dir_mtimes
+
+    def is_stale(self):
+        """
+        @return: True if any of the crawled directories has been
+        modified since the last crawl
+        @rtype: bool
+        """
+        if self.frozen:
+            return False
+        if self._pkg_dirs is None:
+            return True
+        for d, mtime in self._dir_mtimes.items():
+            if roslib.crawler.get_mtime(d) != mtime:
+                return True
+        return False
+
+    def _get_watcher(self):
+        """
+        @return: running watcher or None
+        @rtype: L{roslib.watcher.Watcher}
+        """
+        watcher = self.watcher
+        if watcher is not None and not watcher.running:
+            # watcher has been stopped, its map may be out of date
+            self.watcher = watcher = None
+            self._pkg_dirs = None
+        return watcher
+
+    def find(self, package):
+        """
+        @param package: package name
+        @type  package: str
+        @return: directory of package, or None if package cannot be located
+        @rtype: str
+        """
+        watcher = self._get_watcher()
+        if watcher is not None:
+            return watcher.packages.get(package, None)
+        if self._pkg_dirs is None:
+            self._crawl()
+        d = self._pkg_dirs.get(package, None)
+        if d is not None:
+            if self.frozen or _is_pkg_dir(d):
+                return d
+        elif not self.is_stale():
+            return None
+        # cached answer is no longer valid, re-crawl
+        self._crawl()
+        return self._pkg_dirs.get(package, None)
+
+    def pkg_dirs(self):
+        """
+        @return: package name to directory map
+        @rtype: {str: str}
+        """
+        watcher = self._get_watcher()
+        if watcher is not None:
+            return dict(watcher.packages)
+        if self.is_stale():
+            self._crawl()
+        return dict(self._pkg_dirs)
+
+    def list(self):
+        """
+        @return: names of all packages on the package paths
+        @rtype: [str]
+        """
+        return list(self.pkg_dirs().keys())
+
+# {(ros_root, ros_package_path): _PackageLocator}
+_pkg_locators = roslib.envcache.EnvCache('package_locators', _PackageLocator)
+
+def _get_pkg_locator(ros_root, ros_package_path):
+    """
+    @return: package locator for the specified environment. Locators
+    are shared across calls with the same environment.
+    @rtype: L{_PackageLocator}
+    """
+    return _pkg_locators.get((ros_root, ros_package_path))
+
+def _read_pkg_index(ros_root, ros_package_path):
+    return roslib.pkgindex.read_index(_get_pkg_index_file(), ros_root, ros_package_path)
+
+# {(ros_root, ros_package_path): PackageIndex or None}
+_pkg_indexes = roslib.envcache.EnvCache('package_indexes', _read_pkg_index)
+# environments for which this process has written the index
+_pkg_indexes_written = set()
+
+def _get_pkg_index_file():
+    return os.path.join(rospkg.get_ros_home(), roslib.pkgindex.INDEX_FILE)
+
+def _get_pkg_index(ros_root, ros_package_path):
+    """
+    @return: binary package index for the specified environment, or
+    None if there is no index for the environment
+    @rtype: L{roslib.pkgindex.PackageIndex}
+    """
+    return _pkg_indexes.get((ros_root, ros_package_path))
+
+def _write_pkg_index(locator):
+    """
+    Write the binary package index for the environment of locator so
+    that other processes do not have to crawl the package paths.
+    Failures are ignored as ROS_HOME may not be writable.
+
+    @return: True if index was written
+    @rtype: bool
+    """
+    try:
+        roslib.pkgindex.write_index(_get_pkg_index_file(), locator.ros_root, locator.ros_package_path, locator.pkg_dirs())
+        return True
+    except Exception:
+        return False
+
+def _update_pkg_index(locator, index, located):
+    """
+    (Re-)write missing or out-of-date index once per process.
+
+    @param located: packages that were located with locator, and
+    their directory (None if not found)
+    @type  located: {str: str}
+    """
+    key = (locator.ros_root, locator.ros_package_path)
+    if key in _pkg_indexes_written:
+        return
+    if index is None or [p for p, d in located.items() if d and index.get(p) != d]:
+        _pkg_indexes_written.add(key)
+        if _write_pkg_index(locator):
+            # index may still be in use by other threads, leave
+            # closing it to garbage collection
+            _pkg_indexes.pop(key)
+
+def _load_rospack_cache(ros_root, ros_package_path):
+    cache = {}
+    if not _read_rospack_cache(cache, ros_root, ros_package_path):
+        cache.clear()
+    return cache
+
+# {(ros_root, ros_package_path): {package: (dir, ros_root, ros_package_path)}}
+_pkg_dir_caches = roslib.envcache.EnvCache('rospack_caches', _load_rospack_cache)
+
+def _get_cached_pkg_dir(package, index, ros_root, ros_package_path):
+    """
+    Look up package in the on-disk caches: the binary index, or the
+    text rospack_cache if there is no index for the environment.
+    @return: directory of package, or None if not cached
+    @rtype: str
+    """
+    # the binary index is memory-mapped and does not need to be loaded
+    if index is not None:
+        dir_ = index.get(package)
+        if dir_ is not None and _is_pkg_dir(dir_):
+            return dir_
+        return None
+
+    # fall back to text rospack_cache, which is read once per environment
+    key = (ros_root, ros_package_path)
+    cache = _pkg_dir_caches.get(key)
+
+    # now that we've resolved the args, check the cache
+    if package in cache:
+        dir_, rr, rpp = cache[package]
+        if os.path.isfile(os.path.join(dir_, MANIFEST_FILE)):
+            return dir_
+        else:
+            # invalidate cache
+            _pkg_dir_caches.pop(key)
+    return None
+
+def get_pkg_dirs(packages, ros_root=None, ros_package_path=None):
+    """
+    Locate directories of multiple packages in one pass. The
+    environment is resolved, and the package caches are consulted,
+    once for all packages.
+
+    @param packages: package names
+    @type  packages: [str]
+    @param ros_root: if specified, override ROS_ROOT
+    @type  ros_root: str
+    @param ros_package_path: if specified, override ROS_PACKAGE_PATH
+    @type  ros_package_path: str
+    @return: map of found packages to their directory, and map of
+    missing packages to an error message
+    @rtype: ({str: str}, {str: str})
+    """
+    if ros_root:
+        ros_root = rospkg.environment._resolve_path(ros_root)
+    elif ROS_ROOT in os.environ:
+        # record setting for _pkg_dir_caches
+        ros_root = os.environ[ROS_ROOT]
+
+    if ros_package_path is not None:
+        ros_package_path = rospkg.environment._resolve_paths(ros_package_path)
+    elif ROS_PACKAGE_PATH in os.environ:
+        # record setting for _pkg_dir_caches
+        ros_package_path = os.environ[ROS_PACKAGE_PATH]
+
+    found = {}
+    missing = {}
+    located = {}
+    locator = _get_pkg_locator(ros_root, ros_package_path)
+    # a watched or snapshot locator is always up to date, on-disk
+    # caches may not be
+    watched = locator.watcher is not None or locator.frozen
+    if not watched:
+        index = _get_pkg_index(ros_root, ros_package_path)
+    for package in packages:
+        if package in found or package in missing:
+            continue
+        if not watched:
+            dir_ = _get_cached_pkg_dir(package, index, ros_root, ros_package_path)
+            if dir_ is not None:
+                found[package] = dir_
+                continue
+
+        pkg_dir = located[package] = locator.find(package)
+        if not pkg_dir:
+            missing[package] = "Cannot locate installation of package %s. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, ros_root, ros_package_path)
+            continue
+
+        pkg_dir = os.path.normpath(pkg_dir)
+        if locator.frozen:
+            found[package] = pkg_dir
+        elif not os.path.exists(pkg_dir):
+            missing[package] = "Cannot locate installation of package %s: [%s] is not a valid path. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, pkg_dir, ros_root, ros_package_path)
+        elif not os.path.isdir(pkg_dir):
+            missing[package] = "Package %s is invalid: file [%s] is in the way"%(package, pkg_dir)
+        else:
+            # don't update cache: this should only be updated from
+            # rospack_cache as it will corrupt package list otherwise.
+            found[package] = pkg_dir
+    if located and not watched:
+        _update_pkg_index(locator, index, located)
+    return found, missing
 
 def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
     """
     Locate directory package is stored in. This routine uses an
-    internal cache.
-
-    NOTE: cache does *not* rebuild if packages are relocated after
-    this process is initiated.
+    internal cache per (ROS_ROOT, ROS_PACKAGE_PATH) configuration,
+    which is re-crawled when directories on the package path change.
+    Use L{get_pkg_dirs()} to locate multiple packages.
     
     @param package: package name
     @type  package: str
@@ -128,65 +479,11 @@ def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
     @rtype: str
     @raise InvalidROSPkgException: if required is True and package cannot be located
     """    
-
-    #UNIXONLY
-    #TODO: replace with non-rospack-based solution (e.g. os.walk())
     try:
-        penv = os.environ.copy()
-        if ros_root:
-            ros_root = rospkg.environment._resolve_path(ros_root)
-            penv[ROS_ROOT] = ros_root
-        elif ROS_ROOT in os.environ:
-            # record setting for _pkg_dir_cache
-            ros_root = os.environ[ROS_ROOT]
-
-        # determine rospack exe name
-        rospack = 'rospack'
-
-        if ros_package_path is not None:
-            ros_package_path = rospkg.environment._resolve_paths(ros_package_path)
-            penv[ROS_PACKAGE_PATH] = ros_package_path
-        elif ROS_PACKAGE_PATH in os.environ:
-            # record setting for _pkg_dir_cache
-            ros_package_path = os.environ[ROS_PACKAGE_PATH]
-
-        # update cache if we haven't. NOTE: we only get one cache
-        if not _pkg_dir_cache:
-            _read_rospack_cache(_pkg_dir_cache, ros_root, ros_package_path)
-            
-        # now that we've resolved the args, check the cache
-        if package in _pkg_dir_cache:
-            dir_, rr, rpp = _pkg_dir_cache[package]
-            if rr == ros_root and rpp == ros_package_path:
-                if os.path.isfile(os.path.join(dir_, MANIFEST_FILE)):
-                    return dir_
-                else:
-                    # invalidate cache
-                    _invalidate_cache(_pkg_dir_cache)
-            
-        rpout, rperr = Popen([rospack, 'find', package], \
-                                 stdout=PIPE, stderr=PIPE, env=penv).communicate()
-
-        pkg_dir = (rpout or '').strip()
-        #python3.1 popen returns as bytes
-        if (isinstance(pkg_dir, bytes)):
-            pkg_dir = pkg_dir.decode()
-        if not pkg_dir:
-            raise InvalidROSPkgException("Cannot locate installation of package %s: %s. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, rperr.strip(), ros_root, ros_package_path))
-
-        pkg_dir = os.path.normpath(pkg_dir)
-        if not os.path.exists(pkg_dir):
-            raise InvalidROSPkgException("Cannot locate installation of package %s: [%s] is not a valid path. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, pkg_dir, ros_root, ros_package_path))
-        elif not os.path.isdir(pkg_dir):
-            raise InvalidROSPkgException("Package %s is invalid: file [%s] is in the way"%(package, pkg_dir))
-        # don't update cache: this should only be updated from
-        # rospack_cache as it will corrupt package list otherwise.
-        #_pkg_dir_cache[package] = (pkg_dir, ros_root, ros_package_path)
-        return pkg_dir
-    except OSError as e:
-        if required:
-            raise InvalidROSPkgException("Environment configuration is invalid: cannot locate rospack (%s)"%e)
-        return None
+        found, missing = get_pkg_dirs([package], ros_root=ros_root, ros_package_path=ros_package_path)
+        if package in missing:
+            raise InvalidROSPkgException(missing[package])
+        return found[package]
     except Exception as e:
         if required:
             raise
@@ -280,12 +577,9 @@ def _update_rospack_cache(env=None):
     """
     if env is None:
         env = os.environ
-    cache = _pkg_dir_cache
-    if cache:
-        return True
     ros_root = env[ROS_ROOT]
     ros_package_path = env.get(ROS_PACKAGE_PATH, '')
-    return _read_rospack_cache(cache, ros_root, ros_package_path)
+    return bool(_pkg_dir_caches.get((ros_root, ros_package_path)))
 
 def _invalidate_cache(cache):
     # I've only made this a separate routine because roslib.packages should really be using
@@ -299,8 +593,6 @@ def _read_rospack_cache(cache, ros_root, ros_package_path):
     environment.
     
     @param cache: empty dictionary to store package list in. 
-        If no cache argument provided, will use internal _pkg_dir_cache
-        and will return cached answers if available.
         The format of the cache is {package_name: dir_path, ros_root, ros_package_path}.
     @type  cache: {str: str, str, str}
     @param ros_package_path: ROS_ROOT value
@@ -356,65 +648,174 @@ def list_pkgs_by_path(path, packages=None, cache=None, env=None):
     ros_root = env[ROS_ROOT]
     ros_package_path = env.get(ROS_PACKAGE_PATH, '')
 
-    path = os.path.abspath(path)
-    for d, dirs, files in os.walk(path, topdown=True):
-        if MANIFEST_FILE in files:
-            package = os.path.basename(d)
-            if package not in packages:
-                packages.append(package)
-                if cache is not None:
-                    cache[package] = d, ros_root, ros_package_path
-            del dirs[:]
-            continue #leaf
-        elif 'rospack_nosubdirs' in files:
-            del dirs[:]
-            continue #leaf
-        #small optimization
-        elif '.svn' in dirs:
-            dirs.remove('.svn')
-        elif '.git' in dirs:
-            dirs.remove('.git')
-
-        for sub_d in dirs:
-            # followlinks=True only available in Python 2.6, so we
-            # have to implement manually
-            sub_p = os.path.join(d, sub_d)
-            if os.path.islink(sub_p):
-                packages.extend(list_pkgs_by_path(sub_p, cache=cache))
-            
+    known = set(packages)
+    for package, d in sorted(roslib.crawler.crawl_path(path).packages.items()):
+        if package not in known:
+            known.add(package)
+            packages.append(package)
+            if cache is not None:
+                cache[package] = d, ros_root, ros_package_path
     return packages
 
-def find_node(pkg, node_type, rospack=None):
+def find_node(pkg, node_type, rospack=None, timeout=None):
     """
     Warning: unstable API due to catkin.
 
     Locate the executable that implements the node
     
     :param node_type: type of node, ``str``
+    :param timeout: see L{find_resource()}, ``float``
     :returns: path to node or None if node is not in the package ``str``
     :raises: :exc:rospkg.ResourceNotFound` If package does not exist 
+    :raises: :exc:`ResourceTimeoutException` If search times out
     """
 
     if rospack is None:
         rospack = rospkg.RosPack()
-    return find_resource(pkg, node_type, filter_fn=_executable_filter, rospack=rospack)
+    return find_resource(pkg, node_type, filter_fn=_executable_filter, rospack=rospack, timeout=timeout)
 
-def _executable_filter(test_path):
-    s = os.stat(test_path)
+def find_nodes(nodes, rospack=None, timeout=None):
+    """
+    Warning: unstable API due to catkin.
+
+    Locate the executables that implement multiple nodes. This is
+    equivalent to calling L{find_node()} for each node, but package
+    lookups and resource index validation are shared between the
+    nodes.
+
+    :param nodes: (package, node_type) pairs, ``[(str, str)]``
+    :param timeout: see L{find_resource()}, applies to each node, ``float``
+    :returns: list of paths for each node, in the same order as nodes, ``[[str]]``
+    :raises: :exc:rospkg.ResourceNotFound` If a package does not exist 
+    :raises: :exc:`ResourceTimeoutException` If search times out
+    """
+    if rospack is None:
+        rospack = rospkg.RosPack()
+    search_paths = {}
+    validated = set()
+    return [_find_resource_in_pkg(pkg, node_type, _executable_filter, rospack, search_paths, validated, timeout)
+            for pkg, node_type in nodes]
+
+def _is_executable_mode(test_path, mode):
     flags = stat.S_IRUSR | stat.S_IXUSR
     if os.name == 'nt' and os.path.splitext(test_path)[1] == '.py':
         flags = stat.S_IRUSR
-    return (s.st_mode & flags) == flags
+    return (mode & flags) == flags
 
-def _find_resource(d, resource_name, filter_fn=None):
+def _executable_filter(test_path):
+    return _is_executable_mode(test_path, os.stat(test_path).st_mode)
+
+# resource names are case-insensitive on Windows
+_case_insensitive = sys.platform in ['win32', 'cygwin']
+
+class _Cancelled(Exception):
+    """
+    Raised to abort a resource search that is no longer needed.
+    """
+    pass
+
+class _ResourceIndex(object):
+    """
+    Index of the files underneath a directory, which maps file names
+    to paths. The index is crawled on first use; the modification
+    times of all crawled directories are recorded so that the index
+    is re-crawled when files are added, removed or renamed.
+    """
+
+    def __init__(self, root):
+        """
+        @param root: directory to index
+        @type  root: str
+        """
+        self.root = root
+        # {name: [(path, st_mode)]}, paths in os.walk order
+        self._files = None
+        self._dir_mtimes = {}
+
+    def _crawl(self, cancel=None):
+        files = {}
+        # record root even if it does not exist yet
+        dir_mtimes = {self.root: roslib.crawler.get_mtime(self.root)}
+        for p, dirs, names in os.walk(self.root):
+            if cancel is not None and cancel.is_set():
+                raise _Cancelled()
+            dir_mtimes[p] = roslib.crawler.get_mtime(p)
+            for name in names:
+                path = os.path.abspath(os.path.join(p, name))
+                try:
+                    mode = os.stat(path).st_mode
+                except OSError:
+                    # dangling symlink
+                    continue
+                if _case_insensitive:
+                    name = name.lower()
+                files.setdefault(name, []).append((path, mode))
+            # remove .svn/.git/etc
+            dirs[:] = [x for x in dirs if not x.startswith('.')]
+        self._files = files
+        self._dir_mtimes = dir_mtimes
+
+    def is_stale(self):
+        """
+        @return: True if index has not been crawled or any of the
+        crawled directories has been modified since
+        @rtype: bool
+        """
+        if self._files is None:
+            return True
+        for d, mtime in self._dir_mtimes.items():
+            if roslib.crawler.get_mtime(d) != mtime:
+                return True
+        return False
+
+    def get(self, name, validate=True, cancel=None):
+        """
+        @param name: file name
+        @type  name: str
+        @param validate: if False, do not check whether index is stale
+        @type  validate: bool
+        @param cancel: (optional) event that aborts crawling the index
+        @type  cancel: threading.Event
+        @return: paths and modes of files named name
+        @rtype: [(str, int)]
+        @raise _Cancelled: if cancel is set while crawling
+        """
+        if self._files is None or (validate and self.is_stale()):
+            self._crawl(cancel)
+        return self._files.get(name, [])
+
+# {directory: _ResourceIndex}
+_resource_indexes = {}
+
+def _get_resource_index(d):
+    index = _resource_indexes.get(d, None)
+    if index is None:
+        index = _resource_indexes[d] = _ResourceIndex(d)
+    return index
+
+def _find_resource(d, resource_name, filter_fn=None, validated=None, cancel=None):
     """
     subroutine of find_resource
+
+    @param validated: (optional) set of directories whose resource
+    index has already been validated. Used to share validation
+    between multiple lookups.
+    @type  validated: set(str)
+    @param cancel: (optional) event that aborts the search
+    @type  cancel: threading.Event
+    @raise _Cancelled: if cancel is set
     """
-    matches = []
+    if cancel is not None and cancel.is_set():
+        raise _Cancelled()
+    index = _get_resource_index(d)
+    validate = validated is None or d not in validated
+    if validated is not None:
+        validated.add(d)
+
     # TODO: figure out how to generalize find_resource to take multiple resource name options
-    if sys.platform in ['win32', 'cygwin']:
+    if _case_insensitive:
         # Windows logic requires more file patterns to resolve and is
-        # not case-sensitive, so leave it separate
+        # not case-sensitive
 
         # in the near-term, just hack in support for .exe/.bat/.py. In the long
         # term this needs to:
@@ -427,40 +828,88 @@ def _find_resource(d, resource_name, filter_fn=None):
         #   specified extension manually
         resource_name = resource_name.lower()
         patterns = [resource_name, resource_name+'.exe', resource_name+'.bat', resource_name+'.py']
-        for p, dirs, files in os.walk(d):
-            # case insensitive
-            files = [f.lower() for f in files]
-            for name in patterns:
-                if name in files:
-                    test_path = os.path.join(p, name)
-                    if filter_fn is not None:
-                        if filter_fn(test_path):
-                            matches.append(test_path)
-                    else:
-                        matches.append(test_path)
-            # remove .svn/.git/etc
-            to_prune = [x for x in dirs if x.startswith('.')]
-            for x in to_prune:
-                dirs.remove(x)
-    else: #UNIX            
-        for p, dirs, files in os.walk(d):
-            if resource_name in files:
-                test_path = os.path.join(p, resource_name)
-                if filter_fn is not None:
-                    if filter_fn(test_path):
+    else: #UNIX
+        patterns = [resource_name]
+
+    matches = []
+    for name in patterns:
+        entries = index.get(name, validate, cancel)
+        validate = False
+        for test_path, mode in entries:
+            if filter_fn is None:
+                matches.append(test_path)
+            elif filter_fn is _executable_filter:
+                # use mode captured by index, but double-check files
+                # that were not executable at crawl time (chmod does
+                # not change directory mtimes)
+                try:
+                    if _is_executable_mode(test_path, mode) or _executable_filter(test_path):
                         matches.append(test_path)
+                except OSError:
+                    pass
+            elif filter_fn(test_path):
+                matches.append(test_path)
+    return matches
+
+# number of threads used to search resource roots concurrently
+_RESOURCE_THREADS = 4
+_resource_pool = None
+_resource_pool_pid = None
+_resource_pool_lock = threading.Lock()
+
+def _get_resource_pool():
+    """
+    @return: thread pool shared by resource searches, re-created in
+    forked processes as the threads of the parent do not exist there
+    @rtype: ThreadPool
+    """
+    global _resource_pool, _resource_pool_pid
+    with _resource_pool_lock:
+        if _resource_pool is None or _resource_pool_pid != os.getpid():
+            _resource_pool = ThreadPool(_RESOURCE_THREADS)
+            _resource_pool_pid = os.getpid()
+        return _resource_pool
+
+def _find_resource_in_roots(roots, resource_name, filter_fn=None, validated=None, timeout=None):
+    """
+    subroutine of find_resource. Search roots concurrently and return
+    the matches of all roots, in order of roots, without duplicates.
+
+    @param timeout: (optional) timeout in seconds for the whole search
+    @type  timeout: float
+    @raise ResourceTimeoutException: if the search times out
+    """
+    if len(roots) == 1 and timeout is None:
+        # nothing to run concurrently
+        return _find_resource(roots[0], resource_name, filter_fn=filter_fn, validated=validated)
+    if timeout is not None:
+        deadline = time.time() + timeout
+    cancel = threading.Event()
+    pool = _get_resource_pool()
+    results = [pool.apply_async(_find_resource, (d, resource_name, filter_fn, validated, cancel)) for d in roots]
+    unique_matches = []
+    try:
+        for d, result in zip(roots, results):
+            try:
+                if timeout is None:
+                    matches = result.get()
                 else:
-                    matches.append(test_path)
-            # remove .svn/.git/etc
-            to_prune = [x for x in dirs if x.startswith('.')]
-            for x in to_prune:
-                dirs.remove(x)
-    return [os.path.abspath(m) for m in matches]
+                    matches = result.get(max(0, deadline - time.time()))
+            except TimeoutError:
+                raise ResourceTimeoutException("Timed out after %ss searching for resource %s in %s"%(timeout, resource_name, d))
+            # the same file may be found in several roots
+            for match in matches:
+                if match not in unique_matches:
+                    unique_matches.append(match)
+        return unique_matches
+    finally:
+        # abort the searches that are still running after a timeout
+        cancel.set()
 
 # TODO: this routine really belongs in rospkg, but the catkin-isms really, really don't
 # belong in rospkg.  With more thought, they can probably be abstracted out so as
 # to no longer be catkin-specific. 
-def find_resource(pkg, resource_name, filter_fn=None, rospack=None):
+def find_resource(pkg, resource_name, filter_fn=None, rospack=None, timeout=None):
     """
     Warning: unstable API due to catkin.
 
@@ -470,12 +919,33 @@ def find_resource(pkg, resource_name, filter_fn=None, rospack=None):
     the binary build directory, it will only return matches in that
     directory; it will not return matches from the ROS_PACKAGE_PATH as
     well in this case.
+
+    The binary (libexec, share) and source directories of the package
+    are searched concurrently; the matches of all of them are returned,
+    in that order and without duplicates.
     
     :param filter: function that takes in a path argument and
         returns True if the it matches the desired resource, ``fn(str)``
     :param rospack: `rospkg.RosPack` instance to use
+    :param timeout: (optional) timeout in seconds, ``float``
     :returns: lists of matching paths for resource within a given scope, ``[str]``
     :raises: :exc:`rospkg.ResourceNotFound` If package does not exist 
+    :raises: :exc:`ResourceTimeoutException` If search does not complete within timeout
+    """
+    if rospack is None:
+        rospack = rospkg.RosPack()
+    return _find_resource_in_pkg(pkg, resource_name, filter_fn, rospack, timeout=timeout)
+
+def _find_resource_in_pkg(pkg, resource_name, filter_fn, rospack, search_paths=None, validated=None, timeout=None):
+    """
+    subroutine of find_resource and find_nodes
+
+    @param search_paths: (optional) cache of catkin search paths by
+    package, which is updated by this routine.
+    @type  search_paths: {str: [str]}
+    @param validated: (optional) set of directories whose resource
+    index has already been validated.
+    @type  validated: set(str)
     """
 
     # New resource-location policy in Fuerte, induced by the new catkin 
@@ -488,33 +958,30 @@ def find_resource(pkg, resource_name, filter_fn=None, rospack=None):
     #
     # NOTE: package *must* exist on ROS_PACKAGE_PATH no matter what
 
-    if rospack is None:
-        rospack = rospkg.RosPack()
-
     # lookup package as it *must* exist
     pkg_path = rospack.get_path(pkg)
 
-    source_path_to_packages = rospack.get_custom_cache('source_path_to_packages', {})
-
-    # if found in binary dir, start with that.  in any case, use matches
-    # from ros_package_path
-    matches = []
-    search_paths = catkin_find(
-        search_dirs=['libexec', 'share'], project=pkg, first_matching_workspace_only=True,
-        source_path_to_packages=source_path_to_packages)
-
-    # persist mapping of packages in rospack instance
-    if source_path_to_packages:
-        rospack.set_custom_cache('source_path_to_packages', source_path_to_packages)
-
-    for search_path in search_paths:
-        matches.extend(_find_resource(search_path, resource_name, filter_fn=filter_fn))
-
-    matches.extend(_find_resource(pkg_path, resource_name, filter_fn=filter_fn))
-
-    # Uniquify the results, in case we found the same file twice, while keeping order
-    unique_matches = []
-    for match in matches:
-        if match not in unique_matches:
-            unique_matches.append(match)
-    return unique_matches
+    if search_paths is not None and pkg in search_paths:
+        pkg_search_paths = search_paths[pkg]
+    else:
+        source_path_to_packages = rospack.get_custom_cache('source_path_to_packages', {})
+
+        # if found in binary dir, start with that.  in any case, use matches
+        # from ros_package_path
+        pkg_search_paths = catkin_find(
+            search_dirs=['libexec', 'share'], project=pkg, first_matching_workspace_only=True,
+            source_path_to_packages=source_path_to_packages)
+
+        # persist mapping of packages in rospack instance
+        if source_path_to_packages:
+            rospack.set_custom_cache('source_path_to_packages', source_path_to_packages)
+        if search_paths is not None:
+            search_paths[pkg] = pkg_search_paths
+
+    # search roots in order of precedence, the same directory may be
+    # both a catkin search path and the package path
+    roots = []
+    for d in list(pkg_search_paths) + [pkg_path]:
+        if d not in roots:
+            roots.append(d)
+    return _find_resource_in_roots(roots, resource_name, filter_fn=filter_fn, validated=validated, timeout=timeout)
@@ -0,0 +1,232 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Internal library for the binary package location index. The index is
+a memory-mapped replacement for the text rospack_cache: lookups hash
+the package name into a bucket table and read the single matching
+entry, so the file never has to be parsed in full.
+
+File layout (all integers are unsigned 32-bit little-endian)::
+
+  header:  magic, version, entry count, bucket count,
+           ROS_ROOT length, ROS_PACKAGE_PATH length
+           ROS_ROOT, ROS_PACKAGE_PATH (utf-8, padded to 4 bytes)
+  buckets: bucket count x entry offset (EMPTY if unused)
+  entries: name length, directory length, name, directory (utf-8)
+
+The bucket count is a power of two; collisions are resolved with
+linear probing on the crc32 of the package name. A length of NONE
+encodes an unset environment variable.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+
+import roslib.diskcache
+
+MAGIC = b'RLPI'
+VERSION = 1
+INDEX_FILE = 'roslib_package_index'
+
+_HEADER = struct.Struct('<4sIIIII')
+_UINT32 = struct.Struct('<I')
+_ENTRY = struct.Struct('<II')
+
+EMPTY = 0xFFFFFFFF
+NONE = 0xFFFFFFFF
+
+class PackageIndexException(Exception): pass
+
+def _hash(name):
+    return zlib.crc32(name) & 0xFFFFFFFF
+
+def _encode(s):
+    if s is None:
+        return None
+    return s.encode('utf-8')
+
+def _pad(n):
+    return (4 - n % 4) % 4
+
+def _pack_str(b):
+    if b is None:
+        return NONE, b''
+    return len(b), b + b'\0' * _pad(len(b))
+
+class PackageIndex(object):
+    """
+    Read-only, memory-mapped view of a binary package index file.
+    """
+
+    def __init__(self, filename):
+        """
+        @param filename: path to index file
+        @type  filename: str
+        @raise PackageIndexException: if file is not a valid index
+        @raise IOError: if file cannot be read
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise PackageIndexException("[%s] is not a package index"%filename)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self._count, self._nbuckets, rr_len, rpp_len = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise PackageIndexException("[%s] is not a package index"%filename)
+            if version != VERSION:
+                raise PackageIndexException("[%s] has unsupported version %s"%(filename, version))
+            if self._nbuckets & (self._nbuckets - 1):
+                raise PackageIndexException("[%s] is corrupt"%filename)
+            offset = _HEADER.size
+            self.ros_root, offset = self._read_str(offset, rr_len)
+            self.ros_package_path, offset = self._read_str(offset, rpp_len)
+            self._buckets = offset
+            if self._buckets + self._nbuckets * _UINT32.size > size:
+                raise PackageIndexException("[%s] is truncated"%filename)
+        except:
+            self.close()
+            raise
+
+    def _read_str(self, offset, length):
+        if length == NONE:
+            return None, offset
+        end = offset + length
+        return self._map[offset:end].decode('utf-8'), end + _pad(length)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def matches(self, ros_root, ros_package_path):
+        """
+        @return: True if index was built for the specified environment
+        @rtype: bool
+        """
+        return self.ros_root == ros_root and self.ros_package_path == ros_package_path
+
+    def __len__(self):
+        return self._count
+
+    def _entry(self, offset):
+        name_len, dir_len = _ENTRY.unpack_from(self._map, offset)
+        offset += _ENTRY.size
+        return self._map[offset:offset+name_len], offset + name_len, dir_len
+
+    def get(self, package):
+        """
+        @param package: package name
+        @type  package: str
+        @return: directory of package, or None if package is not in index
+        @rtype: str
+        """
+        if not self._nbuckets:
+            return None
+        name = _encode(package)
+        mask = self._nbuckets - 1
+        i = _hash(name) & mask
+        for _ in range(self._nbuckets):
+            offset = _UINT32.unpack_from(self._map, self._buckets + i * _UINT32.size)[0]
+            if offset == EMPTY:
+                return None
+            entry_name, dir_offset, dir_len = self._entry(offset)
+            if entry_name == name:
+                return self._map[dir_offset:dir_offset+dir_len].decode('utf-8')
+            i = (i + 1) & mask
+        return None
+
+    def items(self):
+        """
+        @return: iterator over (package, directory) pairs
+        @rtype: iter((str, str))
+        """
+        for i in range(self._nbuckets):
+            offset = _UINT32.unpack_from(self._map, self._buckets + i * _UINT32.size)[0]
+            if offset != EMPTY:
+                name, dir_offset, dir_len = self._entry(offset)
+                yield name.decode('utf-8'), self._map[dir_offset:dir_offset+dir_len].decode('utf-8')
+
+def write_index(filename, ros_root, ros_package_path, pkg_dirs):
+    """
+    Write binary package index. The file is written to a temporary
+    file first and then atomically moved into place, so concurrent
+    readers always see a complete index.
+
+    @param filename: path to index file
+    @type  filename: str
+    @param pkg_dirs: package name to directory map
+    @type  pkg_dirs: {str: str}
+    """
+    entries = [(_encode(k), _encode(v)) for k, v in pkg_dirs.items()]
+    nbuckets = 1
+    while nbuckets < 2 * len(entries):
+        nbuckets *= 2
+
+    rr_len, rr = _pack_str(_encode(ros_root))
+    rpp_len, rpp = _pack_str(_encode(ros_package_path))
+    header = _HEADER.pack(MAGIC, VERSION, len(entries), nbuckets, rr_len, rpp_len) + rr + rpp
+
+    buckets = [EMPTY] * nbuckets
+    mask = nbuckets - 1
+    body = []
+    offset = len(header) + nbuckets * _UINT32.size
+    for name, d in entries:
+        i = _hash(name) & mask
+        while buckets[i] != EMPTY:
+            i = (i + 1) & mask
+        buckets[i] = offset
+        entry = _ENTRY.pack(len(name), len(d)) + name + d
+        body.append(entry)
+        offset += len(entry)
+
+    roslib.diskcache.write_atomic(filename, header + struct.pack('<%dI'%nbuckets, *buckets) + b''.join(body))
+
+def read_index(filename, ros_root, ros_package_path):
+    """
+    @return: index for the specified environment, or None if index
+    does not exist, is invalid or was built for a different environment
+    @rtype: L{PackageIndex}
+    """
+    try:
+        index = PackageIndex(filename)
+    except (IOError, OSError, ValueError, PackageIndexException, struct.error):
+        return None
+    if not index.matches(ros_root, ros_package_path):
+        index.close()
+        return None
+    return index
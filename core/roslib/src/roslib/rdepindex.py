@@ -0,0 +1,347 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Internal library for the persisted reverse dependency index, which
+answers 'rospack depends-on' and 'rospack depends-on1' without
+reading every manifest of the workspace.
+
+The index records the direct dependencies and the (mtime, size,
+inode) of the manifest of every package. It is kept next to the
+binary package location index under ROS_HOME, for the same
+environment. When a manifest changes, only the entry of that package
+is replaced, so keeping the index current costs a stat per package
+and a parse per changed manifest. The index is brought up to date at
+most once every L{roslib.depgraph.VALIDATE_INTERVAL} seconds. Queries
+are answered by a L{roslib.depgraph.DependencyGraph} of the indexed
+dependencies, which is only rebuilt when the index has changed.
+
+The export tags of every package are inverted (tag ->
+package -> attributes), so that plugin discovery ('rospack plugins')
+is a dictionary lookup.
+"""
+
+import marshal
+import os
+import sys
+import threading
+import time
+
+import rospkg
+
+import roslib.depgraph
+import roslib.diskcache
+import roslib.envcache
+import roslib.manifest
+import roslib.packages
+
+# bump whenever the serialized layout changes
+FORMAT = 3
+INDEX_FILE = 'roslib_rdep_index'
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size, st.st_ino)
+
+def _manifest_file(pkg_dir):
+    """
+    @return: path and stat key of the manifest of package: manifest.xml,
+    or package.xml for catkin packages without a manifest.xml
+    @rtype: (str, tuple)
+    """
+    path = os.path.join(pkg_dir, roslib.manifest.MANIFEST_FILE)
+    key = _stat_key(path)
+    if key is None:
+        path = os.path.join(pkg_dir, roslib.packages.PACKAGE_FILE)
+        key = _stat_key(path)
+    return path, key
+
+def _read_manifest(path):
+    """
+    @return: direct dependencies and exports listed in manifest.
+    Invalid manifests have neither.
+    @rtype: ([str], [(str, {str: str})])
+    """
+    try:
+        if os.path.basename(path) == roslib.manifest.MANIFEST_FILE:
+            m = roslib.manifest.parse_file(path)
+            return [d.package for d in m.depends], [(e.tag, e.attrs) for e in m.exports]
+        return roslib.depgraph._parse_package_xml(path)
+    except Exception:
+        return [], []
+
+class ReverseDependencyIndex(object):
+    """
+    Reverse dependency index of a single (ROS_ROOT, ROS_PACKAGE_PATH)
+    configuration.
+    """
+
+    def __init__(self, ros_root, ros_package_path, packages=None, exports=None):
+        """
+        @param packages: manifest path, stat key, direct
+        dependencies and exports by package name. Dependencies may be
+        system dependencies of catkin packages, which are ignored.
+        @type  packages: {str: (str, tuple, [str], [(str, {str: str})])}
+        @param exports: attributes of export tags by tag and package name
+        @type  exports: {str: {str: [{str: str}]}}
+        """
+        self.ros_root = ros_root
+        self.ros_package_path = ros_package_path
+        self.packages = packages or {}
+        self.exports = exports or {}
+        # True if the index differs from the file it was read from
+        self.dirty = False
+        # time of the last refresh(), see get_index()
+        self.validated = None
+        # guards refresh() against concurrent queries
+        self.lock = threading.Lock()
+        # graph of the indexed dependencies, see graph()
+        self._graph = None
+
+    def _set_manifest(self, package, depends, exports):
+        old = self.packages.get(package, None)
+        if old is not None:
+            for tag in set([tag for tag, attrs in old[3]]):
+                by_package = self.exports.get(tag, None)
+                if by_package is not None:
+                    by_package.pop(package, None)
+                    if not by_package:
+                        del self.exports[tag]
+        for tag, attrs in exports:
+            self.exports.setdefault(tag, {}).setdefault(package, []).append(attrs)
+
+    def update(self, package, pkg_dir):
+        """
+        Re-read the manifest of a single package and replace its edges.
+        @param package: package name
+        @type  package: str
+        @param pkg_dir: package directory
+        @type  pkg_dir: str
+        """
+        path, key = _manifest_file(pkg_dir)
+        depends, exports = _read_manifest(path) if key is not None else ([], [])
+        self._set_manifest(package, depends, exports)
+        self.packages[package] = (path, key, depends, exports)
+        self.dirty = True
+        self._graph = None
+
+    def remove(self, package):
+        """
+        Remove package and its edges from the index.
+        @param package: package name
+        @type  package: str
+        """
+        if package in self.packages:
+            self._set_manifest(package, [], [])
+            del self.packages[package]
+            self.dirty = True
+            self._graph = None
+
+    def refresh(self, pkg_dirs):
+        """
+        Bring index up to date with the packages of the environment.
+        Only manifests that have changed since they were indexed are
+        read.
+        @param pkg_dirs: package name to directory map
+        @type  pkg_dirs: {str: str}
+        """
+        for package, pkg_dir in pkg_dirs.items():
+            entry = self.packages.get(package, None)
+            if entry is not None:
+                path, key = _manifest_file(pkg_dir)
+                if entry[0] == path and entry[1] == key:
+                    continue
+            self.update(package, pkg_dir)
+        for package in [p for p in self.packages if p not in pkg_dirs]:
+            self.remove(package)
+        self.validated = time.time()
+
+    def graph(self):
+        """
+        @return: dependency graph of the indexed packages. The graph
+        is not modified by later updates of the index.
+        @rtype: L{roslib.depgraph.DependencyGraph}
+        """
+        with self.lock:
+            if self._graph is None:
+                depends = dict([(p, entry[2]) for p, entry in self.packages.items()])
+                self._graph = roslib.depgraph.DependencyGraph('package', depends)
+            return self._graph
+
+    def depends_on1(self, package):
+        """
+        @return: packages that depend directly on package, sorted
+        @rtype: [str]
+        @raise DependencyGraphException: if package does not exist
+        """
+        return self.graph().depends_on1(package)
+
+    def depends_on(self, package):
+        """
+        @return: packages that depend on package, sorted
+        @rtype: [str]
+        @raise DependencyGraphException: if package does not exist or
+        a dependency is circular
+        """
+        return self.graph().depends_on(package)
+
+    def get_exports(self, tag, attr):
+        """
+        Workspace-wide equivalent of
+        L{roslib.manifest.Manifest.get_export()}.
+        @return: (package, value) of attribute attr of all export tags
+        named tag, sorted by package
+        @rtype: [(str, str)]
+        """
+        with self.lock:
+            by_package = sorted(self.exports.get(tag, {}).items())
+        exports = []
+        for package, attrs_list in by_package:
+            exports.extend([(package, attrs[attr]) for attrs in attrs_list if attr in attrs])
+        return exports
+
+    def plugins(self, package, attrib):
+        """
+        Equivalent of 'rospack plugins --attrib=attrib package'.
+        @return: (package, value) of attribute attrib of all <package>
+        export tags of package and the packages that directly depend on it
+        @rtype: [(str, str)]
+        @raise DependencyGraphException: if package does not exist
+        """
+        candidates = set(self.depends_on1(package) + [package])
+        plugins = [(p, v) for p, v in self.get_exports(package, attrib) if p in candidates]
+        # as rospack, package itself comes last
+        return sorted(plugins, key=lambda x: x[0] == package)
+
+    def dumps(self):
+        """
+        @return: index as marshal data
+        @rtype: bytes
+        """
+        return marshal.dumps((FORMAT, self.ros_root, self.ros_package_path, self.packages, self.exports))
+
+def get_index_file():
+    """
+    @return: path of index file. Files are separated by Python version
+    as the marshal format is version-specific.
+    @rtype: str
+    """
+    return os.path.join(rospkg.get_ros_home(), '%s.py%s%s'%((INDEX_FILE,) + sys.version_info[:2]))
+
+def read_index(filename, ros_root, ros_package_path):
+    """
+    @return: index for the specified environment, or None if index
+    does not exist, is invalid or was built for a different environment
+    @rtype: L{ReverseDependencyIndex}
+    """
+    try:
+        with open(filename, 'rb') as f:
+            format_, rr, rpp, packages, exports = marshal.load(f)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+    if format_ != FORMAT or rr != ros_root or rpp != ros_package_path:
+        return None
+    return ReverseDependencyIndex(ros_root, ros_package_path, packages, exports)
+
+def _load_index(ros_root, ros_package_path):
+    index = read_index(get_index_file(), ros_root, ros_package_path)
+    if index is None:
+        index = ReverseDependencyIndex(ros_root, ros_package_path)
+    return index
+
+# {(ros_root, ros_package_path): ReverseDependencyIndex}
+_indexes = roslib.envcache.EnvCache('rdep_indexes', _load_index)
+
+def get_index(ros_root=None, ros_package_path=None):
+    """
+    @param ros_root: if specified, override ROS_ROOT
+    @type  ros_root: str
+    @param ros_package_path: if specified, override ROS_PACKAGE_PATH
+    @type  ros_package_path: str
+    @return: reverse dependency index of the environment, refreshed
+    if it has not been for L{roslib.depgraph.VALIDATE_INTERVAL}
+    seconds. The index is written back to ROS_HOME if it has changed;
+    failures are ignored as ROS_HOME may not be writable.
+    @rtype: L{ReverseDependencyIndex}
+    """
+    if ros_root is None:
+        ros_root = os.environ.get(roslib.packages.ROS_ROOT, None)
+    if ros_package_path is None:
+        ros_package_path = os.environ.get(roslib.packages.ROS_PACKAGE_PATH, None)
+    index = _indexes.get((ros_root, ros_package_path))
+    with index.lock:
+        # refreshing stats every package, which costs far more than a query
+        if index.validated is not None and \
+                0 <= time.time() - index.validated < roslib.depgraph.VALIDATE_INTERVAL:
+            return index
+        index.refresh(roslib.packages._get_pkg_locator(ros_root, ros_package_path).pkg_dirs())
+        if index.dirty:
+            try:
+                roslib.diskcache.write_atomic(get_index_file(), index.dumps())
+                index.dirty = False
+            except (IOError, OSError):
+                pass
+    return index
+
+def depends_on(package, ros_root=None, ros_package_path=None):
+    """
+    @return: packages that depend on package, directly or indirectly, sorted
+    @rtype: [str]
+    """
+    return get_index(ros_root, ros_package_path).depends_on(package)
+
+def depends_on1(package, ros_root=None, ros_package_path=None):
+    """
+    @return: packages that depend directly on package, sorted
+    @rtype: [str]
+    """
+    return get_index(ros_root, ros_package_path).depends_on1(package)
+
+def get_exports(tag, attr, ros_root=None, ros_package_path=None):
+    """
+    @return: (package, value) of attribute attr of all export tags
+    named tag in the workspace, sorted by package
+    @rtype: [(str, str)]
+    """
+    return get_index(ros_root, ros_package_path).get_exports(tag, attr)
+
+def plugins(package, attrib, ros_root=None, ros_package_path=None):
+    """
+    @return: (package, value) of attribute attrib of all <package>
+    export tags of package and the packages that directly depend on it
+    @rtype: [(str, str)]
+    """
+    return get_index(ros_root, ros_package_path).plugins(package, attrib)
@@ -42,7 +42,9 @@ routines will likely be *deleted* in future releases.
 import os
 import sys
 import subprocess
+import roslib.depgraph
 import roslib.exceptions
+import roslib.rdepindex
 import rospkg
 
 if sys.hexversion > 0x03000000: #Python3
@@ -76,7 +78,7 @@ def rospack_depends_on_1(pkg):
     @return: A list of the names of the packages which depend directly on pkg
     @rtype: list
     """
-    return rospackexec(['depends-on1', pkg]).split()
+    return roslib.rdepindex.depends_on1(pkg)
 
 def rospack_depends_on(pkg):
     """
@@ -85,7 +87,7 @@ def rospack_depends_on(pkg):
     @return: A list of the names of the packages which depend on pkg
     @rtype: list
     """
-    return rospackexec(['depends-on', pkg]).split()
+    return roslib.rdepindex.depends_on(pkg)
 
 def rospack_depends_1(pkg):
     """
@@ -94,7 +96,7 @@ def rospack_depends_1(pkg):
     @return: A list of the names of the packages which pkg directly depends on
     @rtype: list    
     """
-    return rospackexec(['deps1', pkg]).split()
+    return roslib.depgraph.get_package_subgraph(pkg).deps1(pkg)
 
 def rospack_depends(pkg):
     """
@@ -103,7 +105,7 @@ def rospack_depends(pkg):
     @return: A list of the names of the packages which pkg depends on
     @rtype: list    
     """
-    return rospackexec(['deps', pkg]).split()
+    return roslib.depgraph.get_package_subgraph(pkg).deps(pkg)
 
 def rospack_plugins(pkg):
     """
@@ -112,11 +114,8 @@ def rospack_plugins(pkg):
     @return: A list of the names of the packages which provide a plugin for pkg
     @rtype: list    
     """
-    val = rospackexec(['plugins', '--attrib=plugin', pkg])
-    if val:
-      return [tuple(x.split(' ')) for x in val.split('\n')]
-    else:
-      return []
+    plugins = roslib.rdepindex.plugins(pkg, 'plugin')
+    return [tuple([p] + v.split(' ')) for p, v in plugins]
 
 def rosstackexec(args):
     """
@@ -141,7 +140,7 @@ def rosstack_depends_on(s):
     @return: A list of the names of the stacks which depend on s
     @rtype: list
     """
-    return rosstackexec(['depends-on', s]).split()
+    return roslib.depgraph.get_stack_graph().depends_on(s)
 
 def rosstack_depends_on_1(s):
     """
@@ -150,7 +149,7 @@ def rosstack_depends_on_1(s):
     @return: A list of the names of the stacks which depend directly on s
     @rtype: list
     """
-    return rosstackexec(['depends-on1', s]).split()
+    return roslib.depgraph.get_stack_graph().depends_on1(s)
 
 def rosstack_depends(s):
     """
@@ -159,7 +158,7 @@ def rosstack_depends(s):
     @return: A list of the names of the stacks which s depends on 
     @rtype: list
     """
-    return rosstackexec(['depends', s]).split()
+    return roslib.depgraph.get_stack_graph().deps(s)
 
 def rosstack_depends_1(s):
     """
@@ -168,4 +167,4 @@ def rosstack_depends_1(s):
     @return: A list of the names of the stacks which s depends on directly
     @rtype: list
     """
-    return rosstackexec(['depends1', s]).split()
+    return roslib.depgraph.get_stack_graph().deps1(s)
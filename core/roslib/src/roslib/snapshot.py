@@ -0,0 +1,296 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Internal library for workspace metadata snapshots. A snapshot
+captures what roslib.packages, roslib.stacks, roslib.manifest and
+roslib.msgs/roslib.srvs would otherwise discover on every process
+start: package and stack locations, parsed manifest.xml and stack.xml
+files, stack versions and the msg/srv types of every package.
+
+Snapshots are intended for read-only deployments. If the
+ROSLIB_SNAPSHOT environment variable is set to a snapshot file, it is
+loaded with a single read when this module is imported, and its
+contents are used without checking the file system for changes.
+Package and stack queries only use the snapshot if ROS_ROOT and
+ROS_PACKAGE_PATH are the same as when it was created.
+
+Snapshots are created with the gensnapshot script or L{write()}.
+"""
+
+import marshal
+import os
+import sys
+
+import rospkg
+
+# environment variable that points to the snapshot file to load
+SNAPSHOT_ENV = 'ROSLIB_SNAPSHOT'
+# bump whenever the serialized layout changes
+FORMAT = 2
+# resource types listed in snapshots
+RESOURCE_TYPES = ['msg', 'srv']
+
+class SnapshotException(Exception): pass
+
+class Snapshot(object):
+    """
+    Workspace metadata of a single (ROS_ROOT, ROS_PACKAGE_PATH)
+    configuration.
+    """
+    __slots__ = ['ros_root', 'ros_package_path', 'packages', 'stacks',
+                 'manifests', 'stack_versions', 'resources']
+
+    def __init__(self, ros_root, ros_package_path, packages, stacks, manifests, stack_versions, resources):
+        """
+        @param packages: package name to directory map
+        @type  packages: {str: str}
+        @param stacks: stack name to directory map
+        @type  stacks: {str: str}
+        @param manifests: fields of parsed manifests by absolute file
+        path, see L{roslib.manifestcache}
+        @type  manifests: {str: tuple}
+        @param stack_versions: stack version by stack directory
+        @type  stack_versions: {str: str}
+        @param resources: resource type names by resource type and package name
+        @type  resources: {str: {str: [str]}}
+        """
+        self.ros_root = ros_root
+        self.ros_package_path = ros_package_path
+        self.packages = packages
+        self.stacks = stacks
+        self.manifests = manifests
+        self.stack_versions = stack_versions
+        self.resources = resources
+
+    def matches(self, ros_root, ros_package_path):
+        """
+        @return: True if snapshot was created for the specified environment
+        @rtype: bool
+        """
+        return self.ros_root == ros_root and self.ros_package_path == ros_package_path
+
+    def list_types(self, package, include_depends, subdir):
+        """
+        Equivalent of L{roslib.msgs.list_msg_types()} and
+        L{roslib.srvs.list_srv_types()}.
+        @param subdir: resource type, one of L{RESOURCE_TYPES}
+        @type  subdir: str
+        @return: type names, or None if the snapshot does not contain
+        the package or its manifest
+        @rtype: [str]
+        """
+        import roslib.manifest
+        import roslib.manifestcache
+        listing = self.resources.get(subdir, {})
+        if package not in listing:
+            return None
+        types = list(listing[package])
+        if include_depends:
+            path = os.path.join(self.packages[package], roslib.manifest.MANIFEST_FILE)
+            fields = self.manifests.get(os.path.abspath(path), None)
+            if fields is None:
+                return None
+            for dep in fields[roslib.manifestcache.DEPENDS_FIELD]:
+                types.extend([t if dep == package else '%s/%s'%(dep, t) for t in listing.get(dep, [])])
+        return types
+
+    def dumps(self):
+        """
+        @return: snapshot as marshal data
+        @rtype: bytes
+        """
+        return marshal.dumps((FORMAT, tuple(sys.version_info[:2]),
+                              self.ros_root, self.ros_package_path, self.packages, self.stacks,
+                              self.manifests, self.stack_versions, self.resources))
+
+def create(ros_root, ros_package_path):
+    """
+    Create a snapshot of the specified environment. The currently
+    loaded snapshot, if any, is not consulted.
+    @return: snapshot
+    @rtype: L{Snapshot}
+    """
+    global _snapshot
+    import roslib.crawler
+    import roslib.manifest
+    import roslib.manifestcache
+    import roslib.msgs
+    import roslib.resources
+    import roslib.srvs
+    import roslib.stack_manifest
+    import roslib.stacks
+
+    current, _snapshot = _snapshot, None
+    try:
+        paths = rospkg.environment._compute_package_paths(ros_root, ros_package_path)
+        packages = {}
+        stacks = {}
+        # merge in reverse order so that the first path wins
+        for result in reversed(roslib.crawler.crawl(paths)):
+            packages.update(result.packages)
+            stacks.update(result.stacks)
+
+        manifests = {}
+        for dirs, filename, load_all in [
+            (packages.values(), roslib.manifest.MANIFEST_FILE, roslib.manifest.load_all),
+            (stacks.values(), roslib.stack_manifest.STACK_FILE, roslib.stack_manifest.load_all)]:
+            files = [os.path.abspath(os.path.join(d, filename)) for d in dirs]
+            files = [f for f in files if os.path.isfile(f)]
+            parsed, _ = load_all(files)
+            for f in files:
+                name = os.path.basename(os.path.dirname(f))
+                if name in parsed:
+                    manifests[f] = roslib.manifestcache._dump(parsed[name])
+
+        stack_versions = {}
+        for d in stacks.values():
+            try:
+                stack_versions[d] = roslib.stacks.get_stack_version_by_dir(d)
+            except Exception:
+                # version is looked up on demand and raises then
+                pass
+
+        resources = {}
+        for subdir, filter_fn, ext in [('msg', roslib.msgs._msg_filter, roslib.msgs.EXT),
+                                       ('srv', roslib.srvs._srv_filter, roslib.srvs.EXT)]:
+            listing = resources[subdir] = {}
+            for package, d in packages.items():
+                types = roslib.resources.list_package_resources_by_dir(d, False, subdir, filter_fn)
+                listing[package] = [t[:-len(ext)] for t in types]
+    finally:
+        _snapshot = current
+    return Snapshot(ros_root, ros_package_path, packages, stacks, manifests, stack_versions, resources)
+
+def write(filename, ros_root, ros_package_path):
+    """
+    Create a snapshot of the specified environment and write it to filename.
+    @return: snapshot
+    @rtype: L{Snapshot}
+    @raise IOError: if file cannot be written
+    @raise OSError: if file cannot be written
+    """
+    import roslib.diskcache
+    snapshot = create(ros_root, ros_package_path)
+    roslib.diskcache.write_atomic(filename, snapshot.dumps())
+    return snapshot
+
+def read(filename):
+    """
+    @return: snapshot
+    @rtype: L{Snapshot}
+    @raise SnapshotException: if file is not a valid snapshot for this
+    version of Python
+    @raise IOError: if file cannot be read
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    try:
+        fields = marshal.loads(data)
+        format_, version = fields[:2]
+    except (EOFError, ValueError, TypeError):
+        raise SnapshotException("[%s] is not a snapshot"%filename)
+    if format_ != FORMAT:
+        raise SnapshotException("[%s] has unsupported format %s"%(filename, format_))
+    if tuple(version) != tuple(sys.version_info[:2]):
+        raise SnapshotException("[%s] was created with Python %s.%s"%((filename,) + tuple(version)))
+    return Snapshot(*fields[2:])
+
+def load(filename):
+    """
+    Read snapshot and use it for subsequent queries.
+    @raise SnapshotException: if file is not a valid snapshot
+    @raise IOError: if file cannot be read
+    """
+    global _snapshot
+    _snapshot = read(filename)
+    _reset_locators()
+
+def unload():
+    """
+    Stop using the loaded snapshot, if any.
+    """
+    global _snapshot
+    _snapshot = None
+    _reset_locators()
+
+def _reset_locators():
+    # package locators decide whether to use the snapshot when created
+    import roslib.packages
+    roslib.packages._pkg_locators.clear()
+
+def get_snapshot(ros_root, ros_package_path):
+    """
+    @return: loaded snapshot if it matches the specified environment, or None
+    @rtype: L{Snapshot}
+    """
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.matches(ros_root, ros_package_path):
+        return snapshot
+    return None
+
+def get_env_snapshot(env=None):
+    """
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: loaded snapshot if it matches the environment, or None
+    @rtype: L{Snapshot}
+    """
+    if env is None:
+        env = os.environ
+    return get_snapshot(env.get(rospkg.environment.ROS_ROOT, None),
+                        env.get(rospkg.environment.ROS_PACKAGE_PATH, None))
+
+def get_manifest_fields(path):
+    """
+    @param path: absolute path of manifest file
+    @type  path: str
+    @return: fields of manifest from loaded snapshot, or None
+    @rtype: tuple
+    """
+    snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot.manifests.get(path, None)
+    return None
+
+def _load_from_env():
+    filename = os.environ.get(SNAPSHOT_ENV, None)
+    if not filename:
+        return None
+    try:
+        return read(filename)
+    except (IOError, OSError, SnapshotException) as e:
+        sys.stderr.write("WARNING: ignoring %s: %s\n"%(SNAPSHOT_ENV, e))
+        return None
+
+_snapshot = _load_from_env()
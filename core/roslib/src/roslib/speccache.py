@@ -0,0 +1,193 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Internal library for caching parsed .msg and .srv specifications. The
+fields of a parsed spec are stored compactly as a marshal file per
+spec under ROS_HOME, keyed by the SHA-1 of the spec text and the
+package context, so that an unchanged file is never tokenized again,
+in any process. Recently used entries are also kept in memory.
+
+The number of files on disk is bounded: a file's modification time is
+updated whenever it is used, and the least recently used files are
+removed once there are more than L{MAX_ENTRIES}.
+
+Set the ROSLIB_NO_SPEC_CACHE environment variable to bypass the cache.
+"""
+
+import hashlib
+import marshal
+import os
+import random
+import sys
+import threading
+
+from collections import OrderedDict
+
+import roslib.diskcache
+
+# bump whenever the serialized field layout changes
+FORMAT = 1
+CACHE_DIR = 'roslib_spec_cache'
+# environment variable that disables the cache if set
+NO_CACHE = 'ROSLIB_NO_SPEC_CACHE'
+# maximum number of files on disk
+MAX_ENTRIES = 8192
+
+# maximum number of specs kept in memory
+_LRU_SIZE = 1024
+# {key: fields}
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+# on average, check the number of files on disk every _EVICT_INTERVAL writes
+_EVICT_INTERVAL = 64
+
+def _enabled():
+    return not os.environ.get(NO_CACHE, '')
+
+def get_cache_dir():
+    """
+    @return: cache directory. Directories are separated by Python
+    version as the marshal format is version-specific.
+    @rtype: str
+    """
+    return os.path.join(roslib.diskcache.get_cache_dir(CACHE_DIR), 'py%s%s'%sys.version_info[:2])
+
+def _key(kind, text, package_context):
+    h = hashlib.sha1()
+    for s in (kind, '\0', package_context or '', '\0', text):
+        # text is a byte string on Python 2, and may contain non-ASCII
+        # bytes. Only unicode strings need to be encoded.
+        if not isinstance(s, bytes):
+            s = s.encode('utf-8')
+        h.update(s)
+    return h.hexdigest()
+
+def get(kind, text, package_context):
+    """
+    @param kind: spec kind, e.g. 'msg' or 'srv'
+    @type  kind: str
+    @param text: spec text
+    @type  text: str
+    @param package_context: package context the spec is parsed in
+    @type  package_context: str
+    @return: cached fields of spec, or None
+    @rtype: tuple
+    """
+    if not _enabled():
+        return None
+    key = _key(kind, text, package_context)
+    with _lru_lock:
+        fields = _lru.pop(key, None)
+        if fields is not None:
+            _lru[key] = fields
+            return fields
+    filename = os.path.join(get_cache_dir(), key)
+    try:
+        with open(filename, 'rb') as f:
+            format_, fields = marshal.loads(f.read())
+    except Exception:
+        return None
+    if format_ != FORMAT:
+        return None
+    try:
+        # mark as recently used
+        os.utime(filename, None)
+    except OSError:
+        pass
+    _lru_put(key, fields)
+    return fields
+
+def put(kind, text, package_context, fields):
+    """
+    Store fields of parsed spec. Failures are ignored as ROS_HOME may
+    not be writable.
+    @param fields: marshal-able fields of spec
+    @type  fields: tuple
+    """
+    if not _enabled():
+        return
+    key = _key(kind, text, package_context)
+    _lru_put(key, fields)
+    try:
+        roslib.diskcache.write_atomic(os.path.join(get_cache_dir(), key), marshal.dumps((FORMAT, fields)))
+    except Exception:
+        return
+    if random.random() * _EVICT_INTERVAL < 1:
+        evict()
+
+def _lru_put(key, fields):
+    with _lru_lock:
+        _lru.pop(key, None)
+        _lru[key] = fields
+        while len(_lru) > _LRU_SIZE:
+            _lru.popitem(last=False)
+
+def evict(max_entries=None):
+    """
+    Remove the least recently used files if there are more than
+    max_entries files on disk, down to 90% of max_entries.
+    @param max_entries: (optional) defaults to L{MAX_ENTRIES}
+    @type  max_entries: int
+    """
+    if max_entries is None:
+        max_entries = MAX_ENTRIES
+    d = get_cache_dir()
+    try:
+        names = os.listdir(d)
+    except OSError:
+        return
+    if len(names) <= max_entries:
+        return
+    entries = []
+    # skip temporary files that are being written
+    for name in [n for n in names if not n.startswith('.')]:
+        path = os.path.join(d, name)
+        try:
+            entries.append((os.stat(path).st_mtime, path))
+        except OSError:
+            pass
+    entries.sort()
+    for mtime, path in entries[:len(entries) - int(max_entries * 0.9)]:
+        try:
+            os.remove(path)
+        except OSError:
+            # removed concurrently
+            pass
+
+def clear():
+    """
+    Clear the in-process cache. The on-disk cache is left intact.
+    """
+    with _lru_lock:
+        _lru.clear()
@@ -50,6 +50,8 @@ import roslib.msgs
 import roslib.names
 import roslib.packages
 import roslib.resources
+import roslib.snapshot
+import roslib.speccache
 
 # don't directly use code from this, though we do depend on the
 # manifest.Depend data type
@@ -122,6 +124,11 @@ def list_srv_types(package, include_depends):
     @return: service type names
     @rtype: [str]
     """
+    snapshot = roslib.snapshot.get_env_snapshot()
+    if snapshot is not None:
+        types = snapshot.list_types(package, include_depends, 'srv')
+        if types is not None:
+            return types
     types = roslib.resources.list_package_resources(package, include_depends, 'srv', _srv_filter)
     return [x[:-len(EXT)] for x in types]
 
@@ -185,6 +192,22 @@ def load_from_string(text, package_context='', full_name='', short_name=''):
     msg_out = roslib.msgs.load_from_string(text_out.getvalue(), package_context, '%sResponse'%(full_name), '%sResponse'%(short_name))
     return SrvSpec(msg_in, msg_out, text, full_name, short_name, package_context)
 
+def _load_from_string_cached(text, package_context, full_name, short_name):
+    """
+    L{load_from_string()}, using the spec cache
+    """
+    fields = roslib.speccache.get('srv', text, package_context)
+    if fields is not None:
+        in_fields, in_text, out_fields, out_text = fields
+        msg_in = roslib.msgs._restore_spec(in_fields, in_text, package_context, '%sRequest'%(full_name), '%sRequest'%(short_name))
+        msg_out = roslib.msgs._restore_spec(out_fields, out_text, package_context, '%sResponse'%(full_name), '%sResponse'%(short_name))
+        return SrvSpec(msg_in, msg_out, text, full_name, short_name, package_context)
+    spec = load_from_string(text, package_context, full_name, short_name)
+    roslib.speccache.put('srv', text, package_context,
+                         (roslib.msgs._dump_spec(spec.request), spec.request.text,
+                          roslib.msgs._dump_spec(spec.response), spec.response.text))
+    return spec
+
 def load_from_file(file_name, package_context=''):
     """
     Convert the .srv representation in the file to a SrvSpec instance.
@@ -216,7 +239,7 @@ def load_from_file(file_name, package_context=''):
     f = open(file_name, 'r')
     try:
         text = f.read()
-        return (type_, load_from_string(text, package_context, type_, base_type_))
+        return (type_, _load_from_string_cached(text, package_context, type_, base_type_))
     finally:
         f.close()
 
@@ -46,6 +46,7 @@ import getopt
 
 STACK_FILE = 'stack.xml'
 
+import roslib.manifestcache
 import roslib.manifestlib
 # re-export symbols so that external code does not have to import manifestlib as well
 from roslib.manifestlib import ManifestException, StackDepend
@@ -97,6 +98,22 @@ def stack_file(stack, required=True):
     d = roslib.stacks.get_stack_dir(stack)
     return _stack_file_by_dir(d, required)
         
+def load_all(paths, processes=None):
+    """
+    Parse many stack.xml files in parallel. Parsing is fanned out to a
+    process pool in chunks and errors are collected per file instead
+    of aborting.
+    @param paths: stack.xml file paths or stack directories
+    @type  paths: [str]
+    @param processes: number of processes, defaults to the number of CPUs
+    @type  processes: int
+    @return: StackManifest instances by stack name, and errors by file path.
+    If the same stack is in multiple paths, the first one wins.
+    @rtype: ({str: L{StackManifest}}, {str: Exception})
+    """
+    files = [os.path.join(p, STACK_FILE) if os.path.isdir(p) else p for p in paths]
+    return roslib.manifestcache.load_all(files, StackManifest, processes=processes)
+
 def parse_file(file):
     """
     Parse stack.xml file
@@ -105,7 +122,7 @@ def parse_file(file):
     @return: StackManifest instance
     @rtype:  L{StackManifest}
     """
-    return roslib.manifestlib.parse_file(StackManifest(), file)
+    return roslib.manifestcache.parse_file(StackManifest(), file)
 
 def parse(string, filename='string'):
     """
@@ -43,7 +43,10 @@ import os
 import sys
 import re
 
+import roslib.crawler
+import roslib.envcache
 import roslib.packages
+import roslib.snapshot
 import roslib.stack_manifest
 
 import rospkg
@@ -51,7 +54,7 @@ import rospkg
 ROS_ROOT=rospkg.environment.ROS_ROOT
 ROS_PACKAGE_PATH=rospkg.environment.ROS_PACKAGE_PATH
 
-STACK_FILE = 'stack.xml'
+STACK_FILE = roslib.crawler.STACK_FILE
 ROS_STACK = 'ros'
 
 class ROSStackException(Exception): pass
@@ -68,14 +71,11 @@ def stack_of(pkg, env=None):
     if env is None:
         env = os.environ
     pkg_dir = roslib.packages.get_pkg_dir(pkg, ros_root=env[ROS_ROOT], ros_package_path=env.get(ROS_PACKAGE_PATH, None))
-    d = pkg_dir
-    while d and os.path.dirname(d) != d:
-        stack_file = os.path.join(d, STACK_FILE)
-        if os.path.exists(stack_file):
-            #TODO: need to resolve issues regarding whether the
-            #stack.xml or the directory defines the stack name
-            return os.path.basename(d)
-        d = os.path.dirname(d)
+    d = roslib.packages._find_marker_dir(pkg_dir, (STACK_FILE,))
+    if d and os.path.dirname(d) != d:
+        #TODO: need to resolve issues regarding whether the
+        #stack.xml or the directory defines the stack name
+        return os.path.basename(d)
         
 def get_stack_dir(stack, env=None):
     """
@@ -92,24 +92,33 @@ def get_stack_dir(stack, env=None):
     @rtype: str
     @raise InvalidROSStackException: if stack cannot be located.
     """
-    _init_rosstack(env=env)
+    snapshot = roslib.snapshot.get_env_snapshot(env)
+    if snapshot is not None:
+        if stack in snapshot.stacks:
+            return snapshot.stacks[stack]
+        raise InvalidROSStackException(stack)
+    rosstack = _get_rosstack(env=env)
     try:
-        return _rosstack.get_path(stack)
+        return rosstack.get_path(stack)
     except rospkg.ResourceNotFound:
         # preserve old signature
         raise InvalidROSStackException(stack)
 
-_rosstack = None
-_ros_paths = None
+def _create_rosstack(*ros_paths):
+    return rospkg.RosStack(list(ros_paths))
+
+# {tuple(ros_paths): rospkg.RosStack}
+_rosstacks = roslib.envcache.EnvCache('rosstacks', _create_rosstack)
 
-def _init_rosstack(env=None):
-    global _rosstack, _ros_paths
+def _get_rosstack(env=None):
+    """
+    @return: RosStack instance for the environment, shared across
+    calls with the same ROS paths
+    @rtype: rospkg.RosStack
+    """
     if env is None:
         env = os.environ
-    ros_paths = rospkg.get_ros_paths(env)
-    if ros_paths != _ros_paths:
-        _ros_paths = ros_paths
-        _rosstack = rospkg.RosStack(ros_paths)
+    return _rosstacks.get(tuple(rospkg.get_ros_paths(env)))
     
 def list_stacks(env=None):
     """
@@ -122,8 +131,10 @@ def list_stacks(env=None):
     @return: complete list of stacks names in ROS environment
     @rtype: [str]
     """
-    _init_rosstack(env=env)
-    return _rosstack.list()
+    snapshot = roslib.snapshot.get_env_snapshot(env)
+    if snapshot is not None:
+        return list(snapshot.stacks.keys())
+    return _get_rosstack(env=env).list()
 
 def list_stacks_by_path(path, stacks=None, cache=None):
     """
@@ -145,31 +156,13 @@ def list_stacks_by_path(path, stacks=None, cache=None):
     """
     if stacks is None:
         stacks = []
-    MANIFEST_FILE = rospkg.MANIFEST_FILE
-    basename = os.path.basename
-    for d, dirs, files in os.walk(path, topdown=True):
-        if STACK_FILE in files:
-            stack = basename(d)
-            if stack not in stacks:
-                stacks.append(stack)
-                if cache is not None:
-                    cache[stack] = d
-            del dirs[:]
-            continue #leaf
-        elif MANIFEST_FILE in files:
-            del dirs[:]
-            continue #leaf     
-        elif 'rospack_nosubdirs' in files:
-            del dirs[:]
-            continue  #leaf
-        # remove hidden dirs (esp. .svn/.git)
-        [dirs.remove(di) for di in dirs if di[0] == '.']
-        for sub_d in dirs:
-            # followlinks=True only available in Python 2.6, so we
-            # have to implement manually
-            sub_p = os.path.join(d, sub_d)
-            if os.path.islink(sub_p):
-                stacks.extend(list_stacks_by_path(sub_p, cache=cache))
+    known = set(stacks)
+    for stack, d in sorted(roslib.crawler.crawl_path(path).stacks.items()):
+        if stack not in known:
+            known.add(stack)
+            stacks.append(stack)
+            if cache is not None:
+                cache[stack] = d
     return stacks
 
 # #2022
@@ -199,8 +192,10 @@ def get_stack_version(stack, env=None):
     @return: version number of stack, or None if stack is unversioned.
     @rtype: str
     """
-    _init_rosstack(env=env)
-    return _rosstack.get_stack_version(stack)
+    snapshot = roslib.snapshot.get_env_snapshot(env)
+    if snapshot is not None and snapshot.stacks.get(stack, None) in snapshot.stack_versions:
+        return snapshot.stack_versions[snapshot.stacks[stack]]
+    return _get_rosstack(env=env).get_stack_version(stack)
 
 def get_stack_version_by_dir(stack_dir):
     """
@@ -212,6 +207,9 @@ def get_stack_version_by_dir(stack_dir):
     @return: version number of stack, or None if stack is unversioned.
     @rtype: str
     """
+    snapshot = roslib.snapshot._snapshot
+    if snapshot is not None and stack_dir in snapshot.stack_versions:
+        return snapshot.stack_versions[stack_dir]
     # REP 109: check for <version> tag first, then CMakeLists.txt
     manifest_filename = os.path.join(stack_dir, STACK_FILE)
     if os.path.isfile(manifest_filename):
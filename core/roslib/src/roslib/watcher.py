@@ -0,0 +1,549 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Optional file system watcher for long-running processes. A watcher
+keeps the package and stack maps of roslib.packages and roslib.stacks
+up to date as manifest.xml, package.xml and stack.xml files appear,
+move or disappear underneath the package path, without having to
+throw the whole cache away.
+
+On Linux, changes are detected with inotify (via ctypes). Elsewhere,
+or if inotify is unavailable, the crawled directories are polled for
+modification time changes instead.
+
+Example::
+
+  import roslib.watcher
+  watcher = roslib.watcher.watch()
+  ...
+  watcher.stop()
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+import rospkg
+
+import roslib.crawler
+
+# files whose creation or removal changes the package/stack layout
+MARKER_FILES = set([roslib.crawler.MANIFEST_FILE, roslib.crawler.PACKAGE_FILE,
+                    roslib.crawler.STACK_FILE, roslib.crawler.CATKIN_IGNORE,
+                    roslib.crawler.ROSPACK_NOSUBDIRS])
+
+# default interval, in seconds, between polls/checks for missing roots
+DEFAULT_INTERVAL = 1.0
+
+class _Root(object):
+    """
+    Crawl state of a single package path root.
+    """
+    __slots__ = ['path', 'packages', 'stacks', 'dirs']
+
+    def __init__(self, path):
+        self.path = path
+        self.packages = {}
+        self.stacks = {}
+        # {directory: mtime} of all crawled directories, including
+        # package directories
+        self.dirs = {}
+
+def _is_under(path, d):
+    return path == d or path.startswith(d + os.sep)
+
+class Watcher(object):
+    """
+    Base class of package path watchers. Changed directories are
+    detected by L{poll()}, which polls the modification times of all
+    crawled directories unless a subclass has a cheaper way; this
+    class re-crawls them and updates the package and stack maps
+    incrementally.
+
+    The merged maps are available as L{packages} and L{stacks}. The
+    first package path root wins if a name exists more than once.
+    """
+
+    def __init__(self, paths, interval=DEFAULT_INTERVAL):
+        """
+        @param paths: package path roots to watch, in order of precedence
+        @type  paths: [str]
+        @param interval: seconds between polls
+        @type  interval: float
+        """
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.interval = interval
+        # merged {name: directory} maps
+        self.packages = {}
+        self.stacks = {}
+        self._roots = [_Root(p) for p in self.paths]
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        for root in self._roots:
+            self._scan(root, root.path)
+        self._merge(set().union(*[r.packages for r in self._roots]), 'packages')
+        self._merge(set().union(*[r.stacks for r in self._roots]), 'stacks')
+
+    def add_listener(self, fn):
+        """
+        @param fn: callback that is invoked with ({package: dir}, {stack: dir})
+        after every update. dir is None for removed packages/stacks.
+        @type  fn: fn({str: str}, {str: str})
+        """
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    @property
+    def running(self):
+        """
+        True if background thread is running
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Start watching in a background (daemon) thread.
+        """
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='roslib.watcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop background thread and release resources.
+        """
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll(self.interval)
+            except Exception as e:
+                sys.stderr.write("roslib.watcher: %s\n"%e)
+                self._stop_event.wait(self.interval)
+
+    def poll(self, timeout=0):
+        """
+        Wait up to timeout seconds for changes and apply them.
+        @return: True if maps were updated
+        @rtype: bool
+        """
+        if timeout:
+            self._stop_event.wait(timeout)
+        return self._update(self._changed_dirs())
+
+    def _root_of(self, d):
+        """
+        @return: innermost root that contains d, or None
+        @rtype: L{_Root}
+        """
+        match = None
+        for root in self._roots:
+            if _is_under(d, root.path) and (match is None or len(root.path) > len(match.path)):
+                match = root
+        return match
+
+    def _dirs_added(self, dirs):
+        """
+        Hook for subclasses: dirs have been crawled
+        """
+        pass
+
+    def _dirs_removed(self, dirs):
+        """
+        Hook for subclasses: dirs are no longer part of the crawl
+        """
+        pass
+
+    def _forget(self, root, d):
+        """
+        Remove everything underneath directory d from root.
+        @return: names of removed packages, names of removed stacks
+        and removed directories
+        @rtype: (set(str), set(str), set(str))
+        """
+        removed = []
+        for m in [root.packages, root.stacks]:
+            names = set([name for name, x in m.items() if _is_under(x, d)])
+            for name in names:
+                del m[name]
+            removed.append(names)
+        dirs = set([x for x in root.dirs if _is_under(x, d)])
+        for x in dirs:
+            del root.dirs[x]
+        return removed[0], removed[1], dirs
+
+    def _scan(self, root, d):
+        """
+        Crawl directory d of root and add its packages and stacks.
+        Entries already known to root take precedence.
+        @return: names of added packages, names of added stacks
+        and crawled directories
+        @rtype: (set(str), set(str), set(str))
+        """
+        result = roslib.crawler.crawl_path(d)
+        added = []
+        for m, found in [(root.packages, result.packages), (root.stacks, result.stacks)]:
+            names = set()
+            for name, x in found.items():
+                if name not in m:
+                    m[name] = x
+                    names.add(name)
+            added.append(names)
+        dirs = dict(result.dir_mtimes)
+        for x in result.packages.values():
+            dirs[x] = roslib.crawler.get_mtime(x)
+        root.dirs.update(dirs)
+        self._dirs_added([x for x, mtime in dirs.items() if mtime is not None])
+        return added[0], added[1], set(dirs)
+
+    def _merge(self, names, attr):
+        """
+        Recompute winning directory of names in merged map.
+        @return: {name: dir} of entries that changed
+        @rtype: {str: str}
+        """
+        merged = getattr(self, attr)
+        changes = {}
+        for name in names:
+            new = None
+            for root in self._roots:
+                new = getattr(root, attr).get(name, None)
+                if new is not None:
+                    break
+            if merged.get(name, None) != new:
+                if new is None:
+                    del merged[name]
+                else:
+                    merged[name] = new
+                changes[name] = new
+        return changes
+
+    def _update(self, dirty):
+        """
+        Re-crawl changed directories and notify listeners.
+        @param dirty: changed directories
+        @type  dirty: [str]
+        @return: True if maps were updated
+        @rtype: bool
+        """
+        # only re-crawl outermost directories
+        todo = []
+        for d in sorted(set(dirty), key=len):
+            if not [x for x in todo if _is_under(d, x)]:
+                todo.append(d)
+        todo = [(self._root_of(d), d) for d in todo]
+        todo = [(root, d) for root, d in todo if root is not None]
+        with self._lock:
+            changed_packages = set()
+            changed_stacks = set()
+            old_dirs = set()
+            new_dirs = set()
+            # forget everything first, so that a directory that moved
+            # within a root is not shadowed by its old location
+            for root, d in todo:
+                p, s, dirs = self._forget(root, d)
+                changed_packages.update(p)
+                changed_stacks.update(s)
+                old_dirs.update(dirs)
+            for root, d in todo:
+                p, s, dirs = self._scan(root, d)
+                changed_packages.update(p)
+                changed_stacks.update(s)
+                new_dirs.update(dirs)
+            self._dirs_removed(old_dirs - new_dirs)
+            packages = self._merge(changed_packages, 'packages')
+            stacks = self._merge(changed_stacks, 'stacks')
+        if packages or stacks:
+            for fn in list(self._listeners):
+                fn(packages, stacks)
+            return True
+        return False
+
+    def _changed_dirs(self):
+        """
+        @return: crawled directories whose modification time changed
+        @rtype: [str]
+        """
+        with self._lock:
+            return [d for root in self._roots for d, mtime in list(root.dirs.items())
+                    if roslib.crawler.get_mtime(d) != mtime]
+
+class PollingWatcher(Watcher):
+    """
+    Portable watcher that polls the modification times of all crawled
+    directories, see L{Watcher.poll()}.
+    """
+    pass
+
+# inotify(7)
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+    IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct('iIII')
+
+_libc = None
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        for name in ['inotify_init1', 'inotify_add_watch', 'inotify_rm_watch']:
+            # raises AttributeError on old libcs
+            getattr(_libc, name)
+    return _libc
+
+def _fsencode(path):
+    if isinstance(path, bytes):
+        return path
+    return path.encode(sys.getfilesystemencoding() or 'utf-8')
+
+def _fsdecode(path):
+    if isinstance(path, str):
+        return path
+    return path.decode(sys.getfilesystemencoding() or 'utf-8')
+
+class InotifyWatcher(Watcher):
+    """
+    Linux watcher based on inotify(7). Only directories that are part
+    of the crawl are watched; events that do not concern marker files
+    or sub-directories are ignored.
+    """
+
+    def __init__(self, paths, interval=DEFAULT_INTERVAL):
+        """
+        @raise OSError: if inotify is not available
+        """
+        libc = _get_libc()
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        # {wd: path}, {path: wd}
+        self._wd_paths = {}
+        self._path_wds = {}
+        try:
+            super(InotifyWatcher, self).__init__(paths, interval)
+        except:
+            self._close()
+            raise
+
+    def _close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def stop(self):
+        super(InotifyWatcher, self).stop()
+        self._close()
+
+    def _dirs_added(self, dirs):
+        libc = _get_libc()
+        for d in dirs:
+            wd = libc.inotify_add_watch(self._fd, _fsencode(d), _WATCH_MASK)
+            if wd < 0:
+                e = ctypes.get_errno()
+                if e in [errno.ENOENT, errno.ENOTDIR, errno.EACCES]:
+                    continue
+                raise OSError(e, "cannot watch [%s]: %s"%(d, os.strerror(e)))
+            self._wd_paths[wd] = d
+            self._path_wds[d] = wd
+
+    def _dirs_removed(self, dirs):
+        libc = _get_libc()
+        for d in dirs:
+            wd = self._path_wds.pop(d, None)
+            if wd is not None:
+                self._wd_paths.pop(wd, None)
+                libc.inotify_rm_watch(self._fd, wd)
+
+    def _is_pkg_dir(self, d):
+        return os.path.isfile(os.path.join(d, roslib.crawler.MANIFEST_FILE)) or \
+            os.path.isfile(os.path.join(d, roslib.crawler.PACKAGE_FILE))
+
+    def _read_events(self):
+        """
+        @return: changed directories
+        @rtype: [str]
+        """
+        dirty = []
+        try:
+            buff = os.read(self._fd, 65536)
+        except OSError as e:
+            if e.errno in [errno.EAGAIN, errno.EINTR]:
+                return dirty
+            raise
+        offset = 0
+        while offset + _EVENT.size <= len(buff):
+            wd, mask, cookie, length = _EVENT.unpack_from(buff, offset)
+            offset += _EVENT.size
+            name = _fsdecode(buff[offset:offset+length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, re-crawl everything
+                dirty.extend(self.paths)
+                continue
+            d = self._wd_paths.get(wd, None)
+            if d is None:
+                continue
+            if mask & IN_IGNORED:
+                self._wd_paths.pop(wd, None)
+                if self._path_wds.get(d, None) == wd:
+                    del self._path_wds[d]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                dirty.append(d)
+            elif name in MARKER_FILES:
+                dirty.append(d)
+            elif mask & IN_ISDIR and name[0] != '.':
+                if d in self.paths or not self._is_pkg_dir(d):
+                    sub_d = os.path.join(d, name)
+                    if mask & IN_MOVED_FROM:
+                        # watch now refers to the new location of the directory
+                        self._dirs_removed([x for x in self._path_wds if _is_under(x, sub_d)])
+                    dirty.append(sub_d)
+        return dirty
+
+    def poll(self, timeout=0):
+        if self._fd < 0:
+            return False
+        try:
+            readable = select.select([self._fd], [], [], timeout)[0]
+        except (OSError, select.error) as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            readable = None
+        dirty = self._read_events() if readable else []
+        # roots that do not exist yet cannot be watched
+        dirty.extend([r.path for r in self._roots
+                      if r.path not in self._path_wds and os.path.isdir(r.path)])
+        return self._update(dirty)
+
+def create_watcher(paths, interval=DEFAULT_INTERVAL, polling=False):
+    """
+    Create watcher for the package path roots. The watcher is not
+    started.
+
+    @param paths: package path roots, in order of precedence
+    @type  paths: [str]
+    @param interval: seconds between polls
+    @type  interval: float
+    @param polling: if True, do not use inotify
+    @type  polling: bool
+    @rtype: L{Watcher}
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(paths, interval)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths, interval)
+
+def watch(env=None, interval=DEFAULT_INTERVAL, polling=False):
+    """
+    Start watching the package path of env. While the watcher is
+    running, roslib.packages.get_pkg_dir() and the roslib.stacks
+    routines are answered from its incrementally updated maps.
+
+    @param env: override environment variables
+    @type  env: {str: str}
+    @return: started watcher. Call stop() to stop watching. A watcher
+    previously started for the same package path is stopped.
+    @rtype: L{Watcher}
+    """
+    import roslib.packages
+    import roslib.stacks
+    if env is None:
+        env = os.environ
+    ros_root = env.get(rospkg.environment.ROS_ROOT, None)
+    ros_package_path = env.get(rospkg.environment.ROS_PACKAGE_PATH, None)
+    locator = roslib.packages._get_pkg_locator(ros_root, ros_package_path)
+    watcher = create_watcher(locator.paths, interval, polling)
+    ros_paths = rospkg.get_ros_paths(env)
+
+    def update_stacks(packages, stacks):
+        rosstack = roslib.stacks._rosstacks.peek(tuple(ros_paths))
+        if rosstack is None:
+            return
+        cache = rosstack._location_cache
+        if cache is None:
+            return
+        for name, d in stacks.items():
+            if d is None:
+                cache.pop(name, None)
+            else:
+                cache[name] = d
+        # stack manifests may have changed as well
+        for name in stacks:
+            rosstack._manifests.pop(name, None)
+    watcher.add_listener(update_stacks)
+
+    watcher.start()
+    old, locator.watcher = locator.watcher, watcher
+    if old is not None:
+        # otherwise its thread would run until the process exits
+        old.stop()
+    return watcher
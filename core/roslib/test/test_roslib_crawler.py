@@ -0,0 +1,115 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+class RoslibCrawlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _touch(self, *args):
+        p = os.path.join(self.tmp, *args)
+        if not os.path.isdir(os.path.dirname(p)):
+            os.makedirs(os.path.dirname(p))
+        with open(p, 'w') as f:
+            f.write('<package><name>%s</name></package>'%os.path.basename(os.path.dirname(p)))
+        return os.path.dirname(p)
+
+    def test_crawl_path(self):
+        from roslib.crawler import crawl_path
+        s1 = self._touch('s1', 'stack.xml')
+        foo = self._touch('s1', 'foo', 'manifest.xml')
+        # unary stack
+        bar = self._touch('bar', 'stack.xml')
+        self._touch('bar', 'manifest.xml')
+        # catkin package is named by package.xml
+        baz = self._touch('src', 'baz', 'package.xml')
+        # nested packages and hidden/ignored directories are not crawled
+        self._touch('s1', 'foo', 'nested', 'manifest.xml')
+        self._touch('.hidden', 'hidden', 'manifest.xml')
+        self._touch('ignored', 'CATKIN_IGNORE')
+        self._touch('ignored', 'ignored_pkg', 'manifest.xml')
+        # stacks are not nested
+        self._touch('s1', 's2', 'stack.xml')
+
+        result = crawl_path(self.tmp)
+        self.assertEquals({'foo': foo, 'bar': bar, 'baz': baz}, result.packages)
+        self.assertEquals({'s1': s1, 'bar': bar}, result.stacks)
+        self.assert_(self.tmp in result.dir_mtimes)
+        self.failIf(foo in result.dir_mtimes)
+
+    def test_crawl_path_nosubdirs(self):
+        from roslib.crawler import crawl_path
+        # rospack_nosubdirs stops descent but does not hide the package
+        # or stack in the same directory
+        foo = self._touch('foo', 'manifest.xml')
+        self._touch('foo', 'rospack_nosubdirs')
+        s1 = self._touch('s1', 'stack.xml')
+        self._touch('s1', 'rospack_nosubdirs')
+        self._touch('s1', 'bar', 'manifest.xml')
+        self._touch('d', 'rospack_nosubdirs')
+        self._touch('d', 'baz', 'manifest.xml')
+
+        result = crawl_path(self.tmp)
+        self.assertEquals({'foo': foo}, result.packages)
+        self.assertEquals({'s1': s1}, result.stacks)
+
+    def test_crawl_path_symlink_loop(self):
+        from roslib.crawler import crawl_path
+        foo = self._touch('a', 'foo', 'manifest.xml')
+        os.symlink(self.tmp, os.path.join(self.tmp, 'a', 'loop'))
+        os.symlink(os.path.join(self.tmp, 'a'), os.path.join(self.tmp, 'b'))
+        result = crawl_path(self.tmp)
+        self.assertEquals({'foo': foo}, result.packages)
+
+    def test_crawl(self):
+        from roslib.crawler import crawl
+        foo1 = self._touch('p1', 'foo', 'manifest.xml')
+        foo2 = self._touch('p2', 'foo', 'manifest.xml')
+        bar = self._touch('p2', 'bar', 'manifest.xml')
+        paths = [os.path.join(self.tmp, p) for p in ['p1', 'p2', 'p3']]
+        for threads in [1, None]:
+            results = crawl(paths, threads=threads)
+            self.assertEquals(paths, [r.path for r in results])
+            self.assertEquals({'foo': foo1}, results[0].packages)
+            self.assertEquals({'foo': foo2, 'bar': bar}, results[1].packages)
+            self.assertEquals({}, results[2].packages)
+            # missing roots are recorded
+            self.assertEquals({paths[2]: None}, results[2].dir_mtimes)
@@ -0,0 +1,139 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from .workspace import manifest, stack, write
+
+class RoslibDepgraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.old_home = os.environ.get('ROS_HOME', None)
+        os.environ['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+        ws = self.ws = os.path.join(self.tmp, 'ws')
+        # stack s1 <- s2
+        write(os.path.join(ws, 's1', 'stack.xml'), stack([]))
+        write(os.path.join(ws, 's2', 'stack.xml'), stack(['s1']))
+        # a <- b <- d, a <- c <- d, d depends on b before c
+        write(os.path.join(ws, 's1', 'a', 'manifest.xml'), manifest([]))
+        write(os.path.join(ws, 's1', 'b', 'manifest.xml'), manifest(['a']))
+        write(os.path.join(ws, 's2', 'c', 'manifest.xml'), manifest(['a']))
+        write(os.path.join(ws, 's2', 'd', 'manifest.xml'), manifest(['b', 'c', 'b']))
+        # catkin package, system dependencies are ignored
+        write(os.path.join(ws, 'e', 'package.xml'), '<package><name>e</name><build_depend>d</build_depend><run_depend>boost</run_depend></package>')
+        self.env = {'ROS_ROOT': os.path.join(ws, 's1'), 'ROS_PACKAGE_PATH': ws}
+
+    def tearDown(self):
+        if self.old_home is None:
+            os.environ.pop('ROS_HOME', None)
+        else:
+            os.environ['ROS_HOME'] = self.old_home
+        shutil.rmtree(self.tmp)
+
+    def test_DependencyGraph(self):
+        from roslib.depgraph import DependencyGraph, DependencyGraphException
+        g = DependencyGraph('package', {'a': [], 'b': ['a'], 'c': ['b', 'a'], 'd': ['c', 'x']})
+        self.assertEquals(4, len(g))
+        self.assert_('a' in g)
+        self.failIf('x' in g)
+        self.assertEquals(['b', 'a'], g.deps1('c'))
+        self.assertEquals(['a', 'b'], g.deps('c'))
+        self.assertEquals([], g.deps('a'))
+        self.assertEquals(['c'], g.depends_on1('b'))
+        self.assertEquals(['b', 'c', 'd'], g.depends_on('a'))
+        self.assert_(g.depends('c', 'a'))
+        self.failIf(g.depends('a', 'c'))
+        for name in ['x', 'd']:
+            try:
+                g.deps(name)
+                self.fail("should have raised")
+            except DependencyGraphException:
+                pass
+        g = DependencyGraph('stack', {'a': ['b'], 'b': ['a']})
+        try:
+            g.deps('a')
+            self.fail("should have raised")
+        except DependencyGraphException as e:
+            self.assert_('circular' in str(e))
+
+    def test_get_package_graph(self):
+        import roslib.depgraph
+        g = roslib.depgraph.get_package_graph(self.env)
+        self.assertEquals(['a', 'b', 'c', 'd', 'e'], g.names)
+        self.assertEquals(['b', 'c'], g.deps1('d'))
+        self.assertEquals(['a', 'b', 'c'], g.deps('d'))
+        self.assertEquals(['a', 'b', 'c', 'd'], g.deps('e'))
+        self.assertEquals(['b', 'c', 'd', 'e'], g.depends_on('a'))
+        self.assertEquals(['b', 'c'], g.depends_on1('a'))
+        self.assert_(g is roslib.depgraph.get_package_graph(self.env))
+
+        # changing a manifest reloads the graph, once the sources are
+        # checked again
+        time.sleep(0.01)
+        write(os.path.join(self.ws, 's2', 'c', 'manifest.xml'), manifest([]))
+        self.assert_(g is roslib.depgraph.get_package_graph(self.env))
+        g.validated -= roslib.depgraph.VALIDATE_INTERVAL
+        g = roslib.depgraph.get_package_graph(self.env)
+        self.assertEquals(['b', 'd', 'e'], g.depends_on('a'))
+
+    def test_get_package_subgraph(self):
+        import roslib.depgraph
+        from roslib.depgraph import DependencyGraphException
+        g = roslib.depgraph.get_package_subgraph('d', self.env)
+        self.assertEquals(['a', 'b', 'c', 'd'], g.names)
+        self.assertEquals(['a', 'b', 'c'], g.deps('d'))
+        g = roslib.depgraph.get_package_subgraph('e', self.env)
+        self.assertEquals(['a', 'b', 'c', 'd'], g.deps('e'))
+        g = roslib.depgraph.get_package_subgraph('b', self.env)
+        self.assertEquals(['a', 'b'], g.names)
+        self.assertEquals(['a'], g.deps1('b'))
+        write(os.path.join(self.ws, 's2', 'c', 'manifest.xml'), manifest(['x']))
+        for name in ['d', 'x']:
+            try:
+                roslib.depgraph.get_package_subgraph(name, self.env).deps(name)
+                self.fail("should have raised")
+            except DependencyGraphException:
+                pass
+
+    def test_get_stack_graph(self):
+        import roslib.depgraph
+        g = roslib.depgraph.get_stack_graph(self.env)
+        self.assertEquals(['s1', 's2'], g.names)
+        self.assertEquals(['s1'], g.deps('s2'))
+        self.assertEquals(['s2'], g.depends_on('s1'))
+        self.assertEquals([], g.depends_on1('s2'))
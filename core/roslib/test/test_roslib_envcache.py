@@ -0,0 +1,93 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import threading
+import unittest
+
+class RoslibEnvCacheTest(unittest.TestCase):
+
+    def test_env_cache(self):
+        from roslib.envcache import EnvCache, get_stats
+        created = []
+        def factory(ros_root, ros_package_path):
+            created.append((ros_root, ros_package_path))
+            return [ros_root, ros_package_path]
+        cache = EnvCache('test_env_cache', factory, max_size=2)
+        a = cache.get(('/a', None))
+        self.assertEquals(['/a', None], a)
+        self.assert_(a is cache.get(('/a', None)))
+        self.assertEquals([('/a', None)], created)
+        cache.get(('/b', '/b/pkgs'))
+        # /a was used more recently than /b, /b must be evicted
+        cache.get(('/a', None))
+        cache.get(('/c', None))
+        self.assert_(('/a', None) in cache)
+        self.failIf(('/b', '/b/pkgs') in cache)
+        self.assertEquals(None, cache.peek(('/b', '/b/pkgs')))
+        self.assertEquals({'hits': 2, 'misses': 3, 'evictions': 1, 'size': 2}, cache.stats())
+        self.assertEquals(cache.stats(), get_stats()['test_env_cache'])
+
+        cache.pop(('/a', None))
+        self.assertEquals(1, len(cache))
+        cache.clear()
+        self.assertEquals({'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0}, cache.stats())
+
+    def test_env_cache_threads(self):
+        from roslib.envcache import EnvCache
+        cache = EnvCache('test_env_cache_threads', lambda *key: object(), max_size=4)
+        values = {}
+        def worker(i):
+            key = ('/ws%s'%(i % 4), None)
+            value = cache.get(key)
+            values.setdefault(key, set()).add(id(value))
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(40)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # each environment must only be created once
+        self.assertEquals(4, cache.misses)
+        self.assertEquals(36, cache.hits)
+        for ids in values.values():
+            self.assertEquals(1, len(ids))
+
+    def test_rosstacks(self):
+        import roslib.stacks
+        env = {'ROS_ROOT': '/does/not/exist', 'ROS_PACKAGE_PATH': ''}
+        r1 = roslib.stacks._get_rosstack(env)
+        env2 = {'ROS_ROOT': '/does/not/exist2', 'ROS_PACKAGE_PATH': ''}
+        r2 = roslib.stacks._get_rosstack(env2)
+        # alternating environments must not thrash
+        self.assert_(r1 is roslib.stacks._get_rosstack(env))
+        self.assert_(r2 is roslib.stacks._get_rosstack(env2))
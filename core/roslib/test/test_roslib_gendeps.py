@@ -0,0 +1,107 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .workspace import MSG_FILES, write_files
+
+class RoslibGendepsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        write_files(self.tmp, MSG_FILES)
+        self.env = dict(os.environ)
+        os.environ['ROS_ROOT'] = os.path.join(self.tmp, 'ros')
+        os.environ['ROS_PACKAGE_PATH'] = self.tmp
+        os.environ['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.env)
+        shutil.rmtree(self.tmp)
+
+    def _path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_get_package_files(self):
+        import roslib.gendeps
+        self.assertEquals([self._path('app/msg/Shape.msg'), self._path('app/msg/Status.msg'), self._path('app/msg/Thing.msg'),
+                           self._path('app/srv/Do.srv')],
+                          roslib.gendeps.get_package_files('app'))
+        self.assertEquals([self._path('std_msgs/msg/Header.msg')], roslib.gendeps.get_package_files('std_msgs'))
+
+    def test_compute(self):
+        import rospkg
+        import roslib.gendeps
+        import roslib.gentools
+        import roslib.msgs
+        files = [self._path(f) for f in ['app/srv/Do.srv', 'app/msg/Thing.msg', 'geo/msg/Polygon.msg',
+                                          'app/msg/Status.msg', 'geo/msg/Point.msg', 'app/msg/Bad.txt']]
+        results = roslib.gendeps.compute(files)
+        self.assertEquals(len(files), len(results))
+        order = [r['file'] for r in results]
+        # embedded types first
+        self.assert_(order.index(files[4]) < order.index(files[2]) < order.index(files[1]) < order.index(files[0]))
+        self.assert_(order.index(files[3]) < order.index(files[1]))
+        self.assertEquals(files[5], order[-1])
+        self.assert_('error' in results[-1])
+
+        # same results as computed for every file on its own
+        for r in results[:-1]:
+            registry = roslib.msgs.MsgRegistry()
+            rospack = rospkg.RosPack()
+            deps = roslib.gentools.get_file_dependencies(r['file'], rospack=rospack, registry=registry)
+            self.assertEquals(list(deps['files'].values()), r['deps'])
+            self.assertEquals(roslib.gentools.compute_md5(deps, rospack=rospack, registry=registry), r['md5'])
+            self.assertEquals(roslib.gentools.compute_full_text(deps, registry=registry), r['full_text'])
+        self.assertEquals('app/Do', results[-2]['type'])
+        self.assertEquals([self._path('std_msgs/msg/Header.msg'), self._path('geo/msg/Point.msg')],
+                          results[order.index(files[2])]['deps'])
+
+    def test_compute_missing_dependency(self):
+        import roslib.gendeps
+        import roslib.msgs
+        files = [self._path(f) for f in ['app/msg/Thing.msg', 'nodep/msg/Shape.msg']]
+        # geo/Point is registered while processing app, which does not
+        # make it available to nodep
+        for registry in [None, roslib.msgs.MsgRegistry()]:
+            results = roslib.gendeps.compute(files, registry=registry)
+            self.assertEquals(files, [r['file'] for r in results])
+            self.assert_('md5' in results[0])
+            self.assert_('missing a dependency' in results[1]['error'], results[1])
+        # registry is shared between calls
+        results = roslib.gendeps.compute(files[1:], registry=registry)
+        self.assert_('error' in results[0])
@@ -0,0 +1,210 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import types
+import unittest
+
+from .workspace import MSG_FILES, write, write_files
+
+def _load_client():
+    # executed into a module of its own: runpy.run_path() clears the
+    # globals of the script on Python 2 before its functions are called
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts', 'gendeps_client')
+    client = types.ModuleType('gendeps_client')
+    client.__file__ = path
+    with open(path) as f:
+        exec(compile(f.read(), path, 'exec'), client.__dict__)
+    return client
+
+class RoslibGendepsdTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        write_files(self.tmp, MSG_FILES)
+        for name in MSG_FILES:
+            # files modified while results are computed are not cached
+            os.utime(os.path.join(self.tmp, name), (1, 1))
+        self.env = dict(os.environ)
+        os.environ['ROS_ROOT'] = os.path.join(self.tmp, 'ros')
+        os.environ['ROS_PACKAGE_PATH'] = self.tmp
+        os.environ['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.env)
+        shutil.rmtree(self.tmp)
+
+    def _write(self, name, text):
+        write(os.path.join(self.tmp, name), text)
+
+    def _md5(self, name):
+        import roslib.gendeps
+        return roslib.gendeps.compute([os.path.join(self.tmp, name)])[0]['md5']
+
+    def test_get_socket_path(self):
+        import roslib.gendepsd
+        path = roslib.gendepsd.get_socket_path()
+        self.assert_(path.startswith(os.path.join(self.tmp, 'ros_home', roslib.gendepsd.SOCKET_DIR)))
+        env = dict(os.environ, ROS_PACKAGE_PATH='/other')
+        self.assertNotEquals(path, roslib.gendepsd.get_socket_path(env))
+        # the client computes the same path without importing roslib
+        client = _load_client()
+        self.assertEquals(path, client.get_socket_path())
+        self.assertEquals(roslib.gendepsd.get_socket_path(env), client.get_socket_path(env))
+        self.assert_(client._socket_path_fits(path))
+        self.failIf(client._socket_path_fits('/' + 'x' * 100))
+
+    def test_cache(self):
+        import roslib.gendepsd
+        cache = roslib.gendepsd.GendepsCache()
+        polygon = os.path.join(self.tmp, 'geo/msg/Polygon.msg')
+        md5 = self._md5('geo/msg/Polygon.msg')
+        r = cache.compute([polygon])[0]
+        self.assertEquals(md5, r['md5'])
+        self.assert_(r is cache.compute([polygon])[0])
+        self.failIf(cache.is_stale())
+
+        # changing an embedded type invalidates the results
+        self._write('geo/msg/Point.msg', 'float64 x\nfloat64 y\nfloat64 z\n')
+        self.assert_(cache.is_stale())
+        r = cache.compute([polygon])[0]
+        self.assertNotEquals(md5, r['md5'])
+        self.assertEquals(self._md5('geo/msg/Polygon.msg'), r['md5'])
+
+        # errors are not cached
+        missing = os.path.join(self.tmp, 'geo/msg/Missing.msg')
+        self.assert_('error' in cache.compute([missing])[0])
+        self._write('geo/msg/Missing.msg', 'int32 x\n')
+        self.assertEquals('geo/Missing', cache.compute([missing])[0]['type'])
+
+    def test_cache_manifests(self):
+        import roslib.gendepsd
+        cache = roslib.gendepsd.GendepsCache()
+        shape = os.path.join(self.tmp, 'app/msg/Shape.msg')
+        cache.compute([shape])
+        self.failIf(cache.is_stale())
+        # manifests of indirect dependencies
+        self._write('std_msgs/manifest.xml', '<package><depend package="other"/></package>\n')
+        os.utime(os.path.join(self.tmp, 'std_msgs/manifest.xml'), (2, 2))
+        self.assert_(cache.is_stale())
+        cache.compute([shape])
+        self.failIf(cache.is_stale())
+        self._write('std_msgs/package.xml', '<package><name>std_msgs</name></package>\n')
+        self.assert_(cache.is_stale())
+
+        # files that change while they are read are not trusted
+        self._write('geo/msg/Point.msg', 'float64 x\n')
+        cache.compute([shape])
+        self.assert_(cache.is_stale())
+
+    def test_cache_missing_dependency(self):
+        import roslib.gendepsd
+        cache = roslib.gendepsd.GendepsCache()
+        polygon = os.path.join(self.tmp, 'geo/msg/Polygon.msg')
+        shape = os.path.join(self.tmp, 'nodep/msg/Shape.msg')
+        self.assert_('md5' in cache.compute([polygon])[0])
+        # geo/Point is registered, but nodep does not depend on geo
+        self.assert_('missing a dependency' in cache.compute([shape])[0]['error'])
+
+    def test_handle(self):
+        import roslib.gendepsd
+        cache = roslib.gendepsd.GendepsCache()
+        cwd = os.path.join(self.tmp, 'geo')
+        md5 = self._md5('geo/msg/Polygon.msg')
+        self.assertEquals({'stdout': md5 + '\n', 'stderr': '', 'code': 0},
+                          roslib.gendepsd.handle(cache, ['--md5', 'msg/Polygon.msg'], cwd))
+        # in the order of gendeps
+        deps = [os.path.join(self.tmp, 'std_msgs/msg/Header.msg'), os.path.join(self.tmp, 'geo/msg/Point.msg')]
+        self.assertEquals(' '.join(deps) + '\n', roslib.gendepsd.handle(cache, ['msg/Polygon.msg'], cwd)['stdout'])
+        self.assert_(roslib.gendepsd.handle(cache, ['--cat', 'msg/Polygon.msg'], cwd)['stdout'].startswith(MSG_FILES['geo/msg/Polygon.msg']))
+        self.assertEquals(1, roslib.gendepsd.handle(cache, ['--md5', 'msg/Missing.msg'], cwd)['code'])
+        # errors of the command line are reported by gendeps itself
+        self.assert_(roslib.gendepsd.handle(cache, ['--md5', '--cat', 'msg/Polygon.msg'], cwd)['fallback'])
+        self.assert_(roslib.gendepsd.handle(cache, ['--sha1', 'msg/Polygon.msg'], cwd)['fallback'])
+        self.assert_(roslib.gendepsd.handle(cache, [], cwd)['fallback'])
+
+    def test_server(self):
+        import json
+        import roslib.gendepsd
+        path = roslib.gendepsd.get_socket_path()
+        done = []
+        def serve():
+            done.append(roslib.gendepsd.serve(path, idle_timeout=0.5))
+        t = threading.Thread(target=serve)
+        t.start()
+        try:
+            for i in range(100):
+                if os.path.exists(path):
+                    break
+                time.sleep(0.05)
+            # a second server exits immediately
+            self.failIf(roslib.gendepsd.serve(path))
+            cwd = os.path.join(self.tmp, 'geo')
+            response = roslib.gendepsd.request(['--batch', '-p', 'geo'], cwd=cwd, path=path)
+            self.assertEquals(0, response['code'])
+            results = json.loads(response['stdout'])
+            self.assertEquals(['Point.msg', 'Polygon.msg'], [os.path.basename(r['file']) for r in results])
+            self.assertEquals(self._md5('geo/msg/Polygon.msg'), results[1]['md5'])
+        finally:
+            t.join(10)
+        # exits when idle and removes its socket
+        self.assertEquals([True], done)
+        self.failIf(os.path.exists(path))
+
+    def test_client_timeout(self):
+        import socket
+        client = _load_client()
+        client.REQUEST_TIMEOUT = 0.1
+        fallback = []
+        class Fallback(Exception):
+            pass
+        def _run_gendeps(argv):
+            fallback.append(argv)
+            raise Fallback()
+        client._run_gendeps = _run_gendeps
+        # a server that never answers
+        path = client.get_socket_path()
+        os.makedirs(os.path.dirname(path))
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.bind(path)
+            s.listen(1)
+            self.assertRaises(Fallback, client.gendeps_client_main, ['msg/Polygon.msg'])
+        finally:
+            s.close()
+        self.assertEquals([['msg/Polygon.msg']], fallback)
@@ -0,0 +1,118 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import hashlib
+import unittest
+
+HEADER_MSG = 'uint32 seq\ntime stamp\nstring frame_id\n'
+
+def _md5(text):
+    return hashlib.md5(text.encode()).hexdigest()
+
+class RoslibGentoolsTest(unittest.TestCase):
+
+    def _registry(self, types):
+        import roslib.msgs
+        registry = roslib.msgs.MsgRegistry()
+        header = roslib.msgs.load_from_string(HEADER_MSG, '', 'std_msgs/Header', 'Header')
+        for k in [roslib.msgs.HEADER, 'std_msgs/Header']:
+            registry.register(k, header)
+        registry.initialized = True
+        for name, text in types.items():
+            registry.register(name, roslib.msgs.load_from_string(text, 'foo_msgs', name, name.split('/')[1]))
+        return registry
+
+    def _compute_md5(self, registry, name):
+        import rospkg
+        import roslib.gentools
+        rospack = rospkg.RosPack()
+        deps = roslib.gentools.get_dependencies(registry.get_registered(name), 'foo_msgs',
+                                                compute_files=False, rospack=rospack, registry=registry)
+        return roslib.gentools.compute_md5(deps, rospack, registry=registry), deps
+
+    def test_compute_md5(self):
+        import roslib.msgs
+        registry = self._registry({'foo_msgs/A': 'int32 x\n', 'foo_msgs/B': 'A a\nA[] b\nHeader h\n'})
+        md5_a = _md5('int32 x')
+        md5_header = _md5('uint32 seq\ntime stamp\nstring frame_id')
+        md5_b, deps = self._compute_md5(registry, 'foo_msgs/B')
+        self.assertEquals(_md5('%s a\n%s b\n%s h'%(md5_a, md5_a, md5_header)), md5_b)
+        self.assertEquals(['foo_msgs/A', 'foo_msgs/A', 'std_msgs/Header'], deps['deps'])
+        self.assertEquals(['foo_msgs/A', 'std_msgs/Header'], deps['uniquedeps'])
+        self.assertEquals({'foo_msgs/A': md5_a, 'std_msgs/Header': md5_header}, registry.md5s)
+        # memoized result
+        self.assertEquals(md5_b, self._compute_md5(registry, 'foo_msgs/B')[0])
+        # other registries are not affected
+        self.assertEquals({}, self._registry({}).md5s)
+        self.failIf('foo_msgs/A' in roslib.msgs.get_default_registry().md5s)
+
+        # registering a different spec invalidates the memo
+        registry.register('foo_msgs/A', roslib.msgs.load_from_string('int32 x\n', 'foo_msgs', 'foo_msgs/A', 'A'))
+        self.assertEquals(2, len(registry.md5s))
+        registry.register('foo_msgs/A', roslib.msgs.load_from_string('int64 x\n', 'foo_msgs', 'foo_msgs/A', 'A'))
+        self.assertEquals({}, registry.md5s)
+        md5_a = _md5('int64 x')
+        self.assertEquals(_md5('%s a\n%s b\n%s h'%(md5_a, md5_a, md5_header)),
+                          self._compute_md5(registry, 'foo_msgs/B')[0])
+
+    def test_get_dependencies_dynamic(self):
+        import rospkg
+        import roslib.gentools
+        import roslib.msgs
+        # registered types may be used from a package that is not
+        # present, e.g. for dynamically generated messages
+        registry = self._registry({'foo_msgs/Bar': 'Header h\n'})
+        spec = roslib.msgs.load_from_string('foo_msgs/Bar b\n', 'dyn_pkg', 'dyn_pkg/Dyn', 'Dyn')
+        deps = roslib.gentools.get_dependencies(spec, 'dyn_pkg', compute_files=False,
+                                                rospack=rospkg.RosPack(), registry=registry)
+        self.assertEquals(['foo_msgs/Bar', 'std_msgs/Header'], deps['uniquedeps'])
+
+    def test_compute_md5_nested(self):
+        # diamond-shaped type graph
+        registry = self._registry({'foo_msgs/A': 'B b\nC c\n', 'foo_msgs/B': 'D d\n',
+                                   'foo_msgs/C': 'D d\nfoo_msgs/D[] e\n', 'foo_msgs/D': 'int32 x\n'})
+        md5_d = _md5('int32 x')
+        md5_b = _md5('%s d'%md5_d)
+        md5_c = _md5('%s d\n%s e'%(md5_d, md5_d))
+        md5_a, deps = self._compute_md5(registry, 'foo_msgs/A')
+        self.assertEquals(_md5('%s b\n%s c'%(md5_b, md5_c)), md5_a)
+        self.assertEquals(['foo_msgs/B', 'foo_msgs/C', 'foo_msgs/D'], sorted(deps['uniquedeps']))
+        self.assertEquals({'foo_msgs/B': md5_b, 'foo_msgs/C': md5_c, 'foo_msgs/D': md5_d}, registry.md5s)
+
+    def test_compute_full_text(self):
+        import roslib.gentools
+        registry = self._registry({'foo_msgs/A': 'int32 x\n', 'foo_msgs/B': 'A a\n'})
+        deps = self._compute_md5(registry, 'foo_msgs/B')[1]
+        sep = '='*80
+        self.assertEquals('A a\n\n%s\nMSG: foo_msgs/A\nint32 x\n'%sep,
+                          roslib.gentools.compute_full_text(deps, registry=registry))
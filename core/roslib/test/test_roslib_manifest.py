@@ -147,6 +147,48 @@ class RoslibManifestTest(unittest.TestCase):
         print(str(e))
         self.assert_(b in str(e), "file name should be in error message: %s"%(str(e)))
     
+  def test_load_all(self):
+    import shutil
+    import tempfile
+    import roslib.manifestcache
+    from roslib.manifest import load_all, Manifest
+    from roslib.manifestlib import ManifestException
+    d = tempfile.mkdtemp()
+    try:
+      paths = []
+      for root in ['a', 'b']:
+        for i in range(10):
+          pkg_dir = os.path.join(d, root, 'pkg%s'%i)
+          os.makedirs(pkg_dir)
+          with open(os.path.join(pkg_dir, 'manifest.xml'), 'w') as f:
+            if i == 3:
+              f.write('<package><depend/></package>')
+            else:
+              f.write('<package><depend package="%s"/></package>'%root)
+          paths.append(pkg_dir)
+      missing = os.path.join(d, 'missing', 'manifest.xml')
+      paths.append(missing)
+
+      min_parallel = roslib.manifestcache._MIN_PARALLEL
+      try:
+        for processes in [1, 2]:
+          roslib.manifestcache._MIN_PARALLEL = 0
+          manifests, errors = load_all(paths, processes=processes)
+          self.assertEquals(set(['pkg%s'%i for i in range(10) if i != 3]), set(manifests.keys()))
+          for m in manifests.values():
+            self.assert_(isinstance(m, Manifest))
+            # first path wins
+            self.assertEquals(['a'], [dep.package for dep in m.depends])
+          self.assertEquals(set([os.path.join(d, r, 'pkg3', 'manifest.xml') for r in ['a', 'b']] + [missing]),
+                            set(errors.keys()))
+          self.assert_(isinstance(errors[os.path.join(d, 'a', 'pkg3', 'manifest.xml')], ManifestException))
+          self.assert_(isinstance(errors[missing], ValueError))
+      finally:
+        roslib.manifestcache._MIN_PARALLEL = min_parallel
+      self.assertEquals(({}, {}), load_all([]))
+    finally:
+      shutil.rmtree(d)
+
 EXAMPLE1 = """<package>
   <description brief="a brief description">Line 1
 Line 2
@@ -0,0 +1,157 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+def get_test_path():
+    return os.path.abspath(os.path.dirname(__file__))
+
+class RoslibManifestCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.env = {}
+        for k in ['ROS_HOME', 'ROSLIB_NO_MANIFEST_CACHE']:
+            self.env[k] = os.environ.get(k, None)
+        os.environ['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+        os.environ.pop('ROSLIB_NO_MANIFEST_CACHE', None)
+        import roslib.manifestcache
+        roslib.manifestcache.clear()
+
+    def tearDown(self):
+        for k, v in self.env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        shutil.rmtree(self.tmp)
+
+    def _fields(self, m):
+        import roslib.manifestcache
+        return roslib.manifestcache._dump(m)
+
+    def test_parse_file(self):
+        import roslib.manifestcache
+        import roslib.manifestlib
+        from roslib.manifest import Manifest
+        from roslib.stack_manifest import StackManifest
+        for cls, name in [(Manifest, 'example1.xml'), (StackManifest, 'stack_example1.xml')]:
+            p = os.path.join(get_test_path(), 'manifest_tests', name)
+            expected = self._fields(roslib.manifestlib.parse_file(cls(), p))
+            # cold, in-process cache, on-disk cache
+            m = roslib.manifestcache.parse_file(cls(), p)
+            self.assert_(isinstance(m, cls))
+            self.assertEquals(expected, self._fields(m))
+            self.assertEquals([getattr(d, m._type) for d in m.depends], expected[roslib.manifestcache.DEPENDS_FIELD])
+            self.assertEquals(expected, self._fields(roslib.manifestcache.parse_file(cls(), p)))
+            roslib.manifestcache.clear()
+            self.assertEquals(expected, self._fields(roslib.manifestcache.parse_file(cls(), p)))
+        cache_dir = os.path.join(os.environ['ROS_HOME'], roslib.manifestcache.CACHE_DIR)
+        self.assert_(os.path.isdir(cache_dir))
+
+    def test_lazy_fields(self):
+        import roslib.manifestcache
+        from roslib.manifest import Manifest
+        from roslib.manifestlib import _Lazy
+        p = os.path.join(self.tmp, 'manifest.xml')
+        with open(p, 'w') as f:
+            f.write('<package><description>a <b>b</b></description><foo x="1"/></package>')
+        # cold, in-process cache, on-disk cache
+        for clear in [False, False, True]:
+            if clear:
+                roslib.manifestcache.clear()
+            m = roslib.manifestcache.parse_file(Manifest(), p)
+            # caching does not materialize lazy fields
+            self.assert_(isinstance(m._description, _Lazy))
+            self.assert_(isinstance(m._unknown_tags, _Lazy))
+            self.assertEquals('a <b>b</b>', m.description)
+            self.assertEquals(['<foo x="1"/>'], [e.toxml() for e in m.unknown_tags])
+        # materialized fields are cached as well
+        fields = self._fields(m)
+        self.assertEquals('a <b>b</b>', roslib.manifestcache._restore(Manifest(), fields).description)
+        self.assertEquals(['<foo x="1"/>'], [e.toxml() for e in roslib.manifestcache._restore(Manifest(), fields).unknown_tags])
+
+    def test_invalidation(self):
+        import roslib.manifest
+        import roslib.manifestcache
+        from roslib.manifestlib import ManifestException
+        p = os.path.join(self.tmp, 'manifest.xml')
+        with open(p, 'w') as f:
+            f.write('<package><depend package="a"/></package>')
+        self.assertEquals(['a'], [d.package for d in roslib.manifest.parse_file(p).depends])
+        # changed size
+        with open(p, 'w') as f:
+            f.write('<package><depend package="a"/><depend package="b"/></package>')
+        self.assertEquals(['a', 'b'], [d.package for d in roslib.manifest.parse_file(p).depends])
+        # changed mtime, same size
+        with open(p, 'w') as f:
+            f.write('<package><depend package="c"/><depend package="d"/></package>')
+        os.utime(p, (time.time() + 10, time.time() + 10))
+        roslib.manifestcache.clear()
+        self.assertEquals(['c', 'd'], [d.package for d in roslib.manifest.parse_file(p).depends])
+        # errors are not cached
+        with open(p, 'w') as f:
+            f.write('<package><depend/></package>')
+        for i in range(2):
+            try:
+                roslib.manifest.parse_file(p)
+                self.fail("should have raised")
+            except ManifestException: pass
+        try:
+            roslib.manifest.parse_file(os.path.join(self.tmp, 'missing.xml'))
+            self.fail("should have raised")
+        except ValueError: pass
+
+    def test_corrupt_and_bypass(self):
+        import roslib.manifest
+        import roslib.manifestcache
+        p = os.path.join(self.tmp, 'manifest.xml')
+        with open(p, 'w') as f:
+            f.write('<package><depend package="a"/></package>')
+        roslib.manifest.parse_file(p)
+        filename = roslib.manifestcache._cache_file(p, 'package')
+        self.assert_(os.path.isfile(filename))
+        with open(filename, 'wb') as f:
+            f.write(b'garbage')
+        roslib.manifestcache.clear()
+        self.assertEquals(['a'], [d.package for d in roslib.manifest.parse_file(p).depends])
+
+        os.environ['ROSLIB_NO_MANIFEST_CACHE'] = '1'
+        os.remove(filename)
+        roslib.manifestcache.clear()
+        self.assertEquals(['a'], [d.package for d in roslib.manifest.parse_file(p).depends])
+        self.failIf(os.path.exists(filename))
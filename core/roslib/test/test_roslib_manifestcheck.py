@@ -0,0 +1,90 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+def get_test_path():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), 'manifest_tests'))
+
+class RoslibManifestcheckTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.old_home = os.environ.get('ROS_HOME', None)
+        os.environ['ROS_HOME'] = self.tmp
+
+    def tearDown(self):
+        if self.old_home is None:
+            os.environ.pop('ROS_HOME', None)
+        else:
+            os.environ['ROS_HOME'] = self.old_home
+        shutil.rmtree(self.tmp)
+
+    def test_check_files(self):
+        import roslib.manifestcheck
+        good = os.path.join(get_test_path(), 'example1.xml')
+        bad = os.path.join(get_test_path(), 'bad1.xml')
+        errors = roslib.manifestcheck.check_files([good, bad])
+        self.assertEquals([bad], list(errors.keys()))
+        self.assert_(errors[bad].startswith('Traceback'))
+        self.assert_('ManifestException' in errors[bad])
+        self.assert_(os.path.isfile(roslib.manifestcheck.get_stamp_file(good)))
+        self.failIf(os.path.exists(roslib.manifestcheck.get_stamp_file(bad)))
+
+    def test_get_stamp_file(self):
+        import roslib.manifestcheck
+        pkg = os.path.join(self.tmp, 'pkg')
+        os.makedirs(pkg)
+        link = os.path.join(self.tmp, 'link')
+        os.symlink(pkg, link)
+        # symlinked package paths share the stamp of the physical path
+        self.assertEquals(roslib.manifestcheck.get_stamp_file(os.path.join(pkg, 'manifest.xml')),
+                          roslib.manifestcheck.get_stamp_file(os.path.join(link, 'manifest.xml')))
+
+    def test_main(self):
+        import roslib.manifestcheck
+        good = os.path.join(get_test_path(), 'example1.xml')
+        bad = os.path.join(get_test_path(), 'bad2.xml')
+        stderr = StringIO()
+        self.assertEquals(0, roslib.manifestcheck.main(['manifestcheck', good], stderr=stderr))
+        self.assertEquals('', stderr.getvalue())
+        self.assertEquals(1, roslib.manifestcheck.main(['manifestcheck', good, bad], stderr=stderr))
+        self.assert_('ManifestException' in stderr.getvalue())
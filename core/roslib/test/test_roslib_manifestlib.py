@@ -206,6 +206,17 @@ class RoslibManifestlibTest(unittest.TestCase):
     self._subtest_parse_example1(parse(_Manifest(), EXAMPLE1))
     self._subtest_parse_stack_example1(parse(_Manifest('stack'), STACK_EXAMPLE1))
     
+  def test_parse_depends_and_unknown_tags(self):
+    # names bound while parsing depends must not shadow the root
+    # element, which is needed for unknown tags afterwards (Python 2
+    # leaks list comprehension variables)
+    from roslib.manifestlib import parse, _Manifest
+    for text in ['<package><depend package="a"/><depend package="b"/><foo/></package>',
+                 u'<package><depend package="a"/><depend package="b"/><foo/></package>']:
+      m = parse(_Manifest(), text)
+      self.assertEquals(['a', 'b'], [d.package for d in m.depends])
+      self.assertEquals(['foo'], [e.tagName for e in m.unknown_tags])
+
   def test__Manifest(self):
     from roslib.manifestlib import _Manifest
     m = _Manifest()
@@ -214,6 +225,24 @@ class RoslibManifestlibTest(unittest.TestCase):
     m = _Manifest('stack')
     self.assertEquals('stack', m._type)    
     
+  def test_get_export(self):
+    from roslib.manifestlib import _Manifest, Export
+    m = _Manifest()
+    self.assertEquals([], m.get_export('python', 'path'))
+    m.exports.append(Export('python', {'path': 'a'}, None))
+    m.exports.append(Export('cpp', {'cflags': '-Ia'}, None))
+    self.assertEquals(['a'], m.get_export('python', 'path'))
+    # changes of the exports list and of the exports are reflected
+    m.exports.append(Export('python', {'path': 'b'}, None))
+    self.assertEquals(['a', 'b'], m.get_export('python', 'path'))
+    m.exports[0] = Export('python', {'path': 'c'}, None)
+    self.assertEquals(['c', 'b'], m.get_export('python', 'path'))
+    m.exports[1].tag = 'python'
+    m.exports[1].attrs['path'] = 'd'
+    self.assertEquals(['c', 'd', 'b'], m.get_export('python', 'path'))
+    m.exports = [Export('python', {}, None)]
+    self.assertEquals([], m.get_export('python', 'path'))
+
   def test_Manifest_str(self):
     # just make sure it doesn't crash
     from roslib.manifestlib import parse, _Manifest
@@ -243,6 +272,67 @@ class RoslibManifestlibTest(unittest.TestCase):
         print(str(e))
         self.assert_(b in str(e), "file name should be in error message [%s]"%(str(e)))
     
+  def test_parse_same_as_dom(self):
+    from roslib.manifestlib import parse, parse_dom, _Manifest
+    def value(v):
+      if isinstance(v, list):
+        return [value(x) for x in v]
+      elif hasattr(v, 'toxml'):
+        return v.toxml()
+      elif hasattr(v, 'xml'):
+        return v.__class__, v.xml()
+      return v
+    def result(fn, t, text):
+      try:
+        m = fn(_Manifest(t), text)
+      except Exception as e:
+        return e.__class__, str(e)
+      return [value(getattr(m, k)) for k in MANIFEST_FIELDS]
+    tests = [EXAMPLE1, STACK_EXAMPLE1, '', 'not xml', '<package>', '<foo/>', '<package/>',
+             '<package><description brief="b">x &amp; <b>y</b><!-- c --><![CDATA[<z>]]></description></package>',
+             '<package><description>a</description><description>b</description></package>',
+             '<package><depend/></package>', '<package><depend package=""/></package>',
+             '<package><depend thirdparty="t"/></package>', '<package><rosdep/></package>',
+             '<package><platform os="ubuntu"/></package>', '<package><versioncontrol url="u"/></package>',
+             '<package><license>a</license><license>b</license></package>',
+             '<package><license><![CDATA[BSD]]></license><author>a</author><author>b</author></package>',
+             '<package><review status="s" notes="n"/><url>u</url><url>v</url></package>',
+             '<package><export><a x="1">t<![CDATA[c]]><b/></a><c/></export><unknown>t<b/></unknown></package>',
+             '<stack><depend/></stack>', '<stack><export><a/></export></stack>', '<stack><rosdep name="r"/></stack>',
+             '<?xml version="1.0" encoding="ISO-8859-1"?><package><description>\xe9<b/></description></package>',
+             '<!DOCTYPE package [<!ENTITY e "x">]><package><description>&e;<b>&e;</b></description></package>',
+             ]
+    for text in tests:
+      for t in ['package', 'stack']:
+        self.assertEquals(result(parse_dom, t, text), result(parse, t, text))
+
+  def test_lazy_fields(self):
+    import copy
+    from roslib.manifestlib import parse, _Manifest, _Lazy
+    m = parse(_Manifest(), '<package><description>a <b>b</b></description><author>c</author><foo x="1"/></package>')
+    # not materialized yet
+    self.assert_(isinstance(m._description, _Lazy))
+    self.assert_(isinstance(m._unknown_tags, _Lazy))
+    m2 = copy.copy(m)
+    self.assertEquals('a <b>b</b>', m.description)
+    self.assertEquals('a <b>b</b>', m._description)
+    self.assertEquals(['<foo x="1"/>'], [e.toxml() for e in m.unknown_tags])
+    # copies materialize independently
+    self.assertEquals('a <b>b</b>', m2.description)
+    m2.description = 'd'
+    self.assertEquals('d', m2.description)
+    self.assertEquals('a <b>b</b>', m.description)
+    self.assertEquals('c', m.author)
+    # no description
+    self.assertEquals(None, parse(_Manifest(), '<package/>').description)
+    # empty descriptions, as bytes on Python 2
+    for text in ['<package><description/></package>', '<package><description></description></package>']:
+      self.assertEquals('', parse(_Manifest(), text).description)
+
+MANIFEST_FIELDS = ['description', 'brief', 'author', 'license', 'license_url', 'url',
+                   'depends', 'rosdeps', 'platforms', 'logo', 'exports', 'version',
+                   'versioncontrol', 'status', 'notes', 'unknown_tags', '_type']
+
 EXAMPLE1 = """<package>
   <description brief="a brief description">Line 1
 Line 2
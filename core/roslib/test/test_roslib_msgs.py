@@ -0,0 +1,128 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import unittest
+
+# declarations, valid and invalid, in various formatting
+MSG_LINES = [
+    'int32 x', 'int32  y # comment', '  float64[] z  ', 'float64[3] w', 'Header header',
+    'std_msgs/String s', 'String t', 'time stamp', 'duration[] d', 'uint8[10] data\r',
+    'int32\tx2', 'int32 x3 y3', 'int32', '1nt32 x4', 'int32 1x', 'int32[a] x5', 'int32[[]] x6',
+    'int32 X=1', 'int32 Y = 2 # two', 'string S=foo # not a comment', 'string T = bar ',
+    'float32 F=1.5', 'bool B=True', 'uint8 U=256', 'Foo F=1', 'int32 A=1=2',
+    'byte b', 'char c', '# only a comment', '', '   ', 'int32 x7 #c=1', 'int32 x8\t# tab',
+    'int32 x9\xa0', '\xa0int32 x10', 'int32 #x11',
+]
+
+class RoslibMsgsTest(unittest.TestCase):
+
+    def _load(self, text, package_context, fast):
+        import roslib.msgs
+        try:
+            return roslib.msgs._load_from_string(text, package_context, fast=fast)
+        except roslib.msgs.MsgSpecException as e:
+            return 'MsgSpecException: %s'%e
+
+    def _fields(self, spec):
+        if isinstance(spec, str):
+            return spec
+        return (spec.types, spec.names, [(c.type, c.name, c.val, c.val_text) for c in spec.constants],
+                spec.text, spec.has_header(), spec.package,
+                [(f.name, f.type, f.base_type, f.is_array, f.array_len, f.is_header, f.is_builtin)
+                 for f in spec.parsed_fields()])
+
+    def test_load_from_string_same_as_reference(self):
+        # every line on its own, and pairs of lines
+        texts = list(MSG_LINES)
+        texts.extend(['%s\n%s'%(a, b) for a in MSG_LINES for b in MSG_LINES])
+        for package_context in ['', 'foo_msgs']:
+            for text in texts:
+                expected = self._fields(self._load(text, package_context, False))
+                # twice, so that the caches are used
+                for i in range(2):
+                    self.assertEquals(expected, self._fields(self._load(text, package_context, True)), text)
+
+    def test_load_from_string(self):
+        import roslib.msgs
+        spec = roslib.msgs.load_from_string('Header header\nint32 x # x\nPoint[] p\nint32 X=1', 'foo_msgs')
+        self.assertEquals(['Header', 'int32', 'foo_msgs/Point[]'], spec.types)
+        self.assertEquals(['header', 'x', 'p'], spec.names)
+        self.assertEquals(['X'], [c.name for c in spec.constants])
+        self.assert_(spec.has_header())
+        try:
+            roslib.msgs.load_from_string('int32 x\nint32 x')
+            self.fail("should have raised")
+        except roslib.msgs.MsgSpecException:
+            pass
+
+    def test_registry(self):
+        import roslib.msgs
+        spec = roslib.msgs.load_from_string('int32 x', 'foo_msgs')
+        r1 = roslib.msgs.MsgRegistry()
+        r2 = roslib.msgs.MsgRegistry()
+        r1.register('foo_msgs/Foo', spec)
+        self.assert_(r1.is_registered('foo_msgs/Foo'))
+        self.failIf(r2.is_registered('foo_msgs/Foo'))
+        self.failIf(roslib.msgs.is_registered('foo_msgs/Foo'))
+        self.assertEquals(spec, r1.get_registered('foo_msgs/Foo'))
+        self.assertEquals(spec, r1.get_registered('Foo', 'foo_msgs'))
+        try:
+            r2.get_registered('Foo', 'foo_msgs')
+            self.fail("should have raised")
+        except KeyError:
+            pass
+
+        # module-level functions use the default registry
+        default = roslib.msgs.get_default_registry()
+        self.assert_(default.types is roslib.msgs.REGISTERED_TYPES)
+        roslib.msgs.register('foo_msgs/Bar', spec)
+        try:
+            self.assert_(default.is_registered('foo_msgs/Bar'))
+            self.assertEquals(spec, roslib.msgs.get_registered('Bar', 'foo_msgs'))
+        finally:
+            del roslib.msgs.REGISTERED_TYPES['foo_msgs/Bar']
+
+    def test_registry_threads(self):
+        import threading
+        import roslib.msgs
+        r = roslib.msgs.MsgRegistry()
+        spec = roslib.msgs.load_from_string('int32 x', 'foo_msgs')
+        def register(i):
+            for j in range(200):
+                r.register('foo_msgs/T%s_%s'%(i, j), spec)
+        threads = [threading.Thread(target=register, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEquals(800, len(r.types))
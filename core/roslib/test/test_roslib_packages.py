@@ -47,6 +47,77 @@ class RoslibPackagesTest(unittest.TestCase):
     
     self.assertEquals([], roslib.packages.find_node('roslib', 'not_a_node'))
     
+  def test_find_nodes(self):
+    import roslib.packages
+    d = roslib.packages.get_pkg_dir('roslib')
+    p = os.path.join(d, 'test', 'fake_node.py')
+    self.assertEquals([[p], [], [p]], roslib.packages.find_nodes([('roslib', 'fake_node.py'), ('roslib', 'not_a_node'), ('roslib', 'fake_node.py')]))
+    self.assertEquals([], roslib.packages.find_nodes([]))
+
+  def test_resource_index(self):
+    import shutil
+    import tempfile
+    from roslib.packages import _find_resource, _executable_filter
+    d = tempfile.mkdtemp()
+    try:
+      self.assertEquals([], _find_resource(d, 'node'))
+      os.makedirs(os.path.join(d, 'scripts'))
+      os.makedirs(os.path.join(d, '.svn'))
+      node = os.path.join(d, 'scripts', 'node')
+      for p in [node, os.path.join(d, '.svn', 'node')]:
+        with open(p, 'w') as f:
+          f.write('#!/bin/sh')
+      # new file must be picked up
+      self.assertEquals([node], _find_resource(d, 'node'))
+      self.assertEquals([], _find_resource(d, 'node', filter_fn=_executable_filter))
+      # chmod does not change directory mtime
+      os.chmod(node, 0o755)
+      self.assertEquals([node], _find_resource(d, 'node', filter_fn=_executable_filter))
+      self.assertEquals([], _find_resource(d, 'node', filter_fn=lambda p: False))
+      os.remove(node)
+      self.assertEquals([], _find_resource(d, 'node'))
+    finally:
+      shutil.rmtree(d)
+
+  def test_find_resource_in_roots(self):
+    import shutil
+    import tempfile
+    import threading
+    import time
+    from roslib.packages import _find_resource, _find_resource_in_roots, _Cancelled, ResourceTimeoutException
+    d = tempfile.mkdtemp()
+    try:
+      roots = [os.path.join(d, 'libexec'), os.path.join(d, 'share'), os.path.join(d, 'src')]
+      for r in roots:
+        os.makedirs(r)
+      self.assertEquals([], _find_resource_in_roots(roots, 'node'))
+      nodes = [os.path.join(r, 'node') for r in roots]
+      for p in nodes[1:]:
+        with open(p, 'w') as f:
+          f.write('#!/bin/sh')
+      # matches of all roots, in order of roots and without duplicates
+      self.assertEquals(nodes[1:], _find_resource_in_roots(roots, 'node'))
+      self.assertEquals(nodes[1:], _find_resource_in_roots(roots + [roots[1]], 'node'))
+      self.assertEquals([nodes[2]], _find_resource_in_roots(roots[2:], 'node'))
+      self.assertEquals([nodes[2]], _find_resource_in_roots(roots[2:], 'node', timeout=5.0))
+
+      def slow_filter(p):
+        time.sleep(0.5)
+        return True
+      try:
+        _find_resource_in_roots(roots, 'node', filter_fn=slow_filter, timeout=0.05)
+        self.fail("should have raised")
+      except ResourceTimeoutException: pass
+
+      cancel = threading.Event()
+      cancel.set()
+      try:
+        _find_resource(roots[1], 'node', cancel=cancel)
+        self.fail("should have raised")
+      except _Cancelled: pass
+    finally:
+      shutil.rmtree(d)
+
   def test_get_pkg_dir(self):
     import roslib.packages
     import roslib.rospack
@@ -57,6 +128,62 @@ class RoslibPackagesTest(unittest.TestCase):
       self.fail("should have raised")
     except roslib.packages.InvalidROSPkgException: pass
 
+  def test_get_pkg_dir_by_path(self):
+    import roslib.packages
+    test_dir = os.path.join(get_test_path(), 'package_tests')
+    p1 = os.path.join(test_dir, 'p1')
+    p2 = os.path.join(test_dir, 'p2')
+    rpp = os.pathsep.join([p1, p2])
+    self.assertEquals(os.path.join(p1, 'foo'), roslib.packages.get_pkg_dir('foo', ros_package_path=rpp))
+    self.assertEquals(os.path.join(p1, 'bar'), roslib.packages.get_pkg_dir('bar', ros_package_path=rpp))
+    # test precedence
+    rpp = os.pathsep.join([p2, p1])
+    self.assertEquals(os.path.join(p2, 'foo'), roslib.packages.get_pkg_dir('foo', ros_package_path=rpp))
+    self.assertEquals(None, roslib.packages.get_pkg_dir('fake_roslib', required=False, ros_package_path=rpp))
+
+  def test_get_pkg_dirs(self):
+    import roslib.packages
+    test_dir = os.path.join(get_test_path(), 'package_tests')
+    p1 = os.path.join(test_dir, 'p1')
+    p2 = os.path.join(test_dir, 'p2')
+    rpp = os.pathsep.join([p2, p1])
+    found, missing = roslib.packages.get_pkg_dirs(['foo', 'bar', 'fake_roslib', 'foo'], ros_package_path=rpp)
+    self.assertEquals({'foo': os.path.join(p2, 'foo'), 'bar': os.path.join(p1, 'bar')}, found)
+    self.assertEquals(['fake_roslib'], list(missing.keys()))
+    self.assert_('fake_roslib' in missing['fake_roslib'])
+    self.assertEquals(({}, {}), roslib.packages.get_pkg_dirs([], ros_package_path=rpp))
+
+  def test_package_locator(self):
+    import shutil
+    import tempfile
+    from roslib.packages import _PackageLocator
+    d = tempfile.mkdtemp()
+    try:
+      locator = _PackageLocator(None, d)
+      self.assertEquals(None, locator.find('foo'))
+      self.failIf(locator.is_stale())
+
+      # new package must be picked up without a new locator
+      foo_d = os.path.join(d, 'sub', 'foo')
+      os.makedirs(foo_d)
+      with open(os.path.join(foo_d, 'manifest.xml'), 'w') as f:
+        f.write('<package/>')
+      self.assertEquals(foo_d, locator.find('foo'))
+
+      # catkin packages are named by package.xml
+      bar_d = os.path.join(d, 'bar_dir')
+      os.makedirs(bar_d)
+      with open(os.path.join(bar_d, 'package.xml'), 'w') as f:
+        f.write('<package><name>bar</name></package>')
+      self.assertEquals(bar_d, locator.find('bar'))
+      self.assertEquals(set(['foo', 'bar']), set(locator.list()))
+
+      # moved package
+      shutil.move(foo_d, os.path.join(d, 'foo'))
+      self.assertEquals(os.path.join(d, 'foo'), locator.find('foo'))
+    finally:
+      shutil.rmtree(d)
+
   def test_get_dir_pkg(self):
     import roslib.packages
     path = get_roslib_path()
@@ -70,6 +197,42 @@ class RoslibPackagesTest(unittest.TestCase):
 
     # must fail on parent of roslib
     self.assertEquals((None, None), roslib.packages.get_dir_pkg(os.path.dirname(path)))
+
+  def test_get_dir_pkg_cache(self):
+    import shutil
+    import tempfile
+    import roslib.packages
+    d = os.path.realpath(tempfile.mkdtemp())
+    try:
+      a = os.path.join(d, 'a')
+      b = os.path.join(a, 'b')
+      c = os.path.join(b, 'c')
+      os.makedirs(c)
+      self.assertEquals((None, None), roslib.packages.get_dir_pkg(c))
+      # new manifests must invalidate cached results
+      with open(os.path.join(a, 'manifest.xml'), 'w') as f:
+        f.write('<package/>')
+      self.assertEquals((a, 'a'), roslib.packages.get_dir_pkg(c))
+      self.assertEquals((a, 'a'), roslib.packages.get_dir_pkg(b))
+      # moved manifests, only the marker found is checked
+      os.remove(os.path.join(a, 'manifest.xml'))
+      with open(os.path.join(b, 'package.xml'), 'w') as f:
+        f.write('<package><name>b</name></package>')
+      self.assertEquals((b, 'b'), roslib.packages.get_dir_pkg(c))
+      with open(os.path.join(a, 'manifest.xml'), 'w') as f:
+        f.write('<package/>')
+      os.remove(os.path.join(b, 'package.xml'))
+      self.assertEquals((a, 'a'), roslib.packages.get_dir_pkg(c))
+      # sibling of a resolved directory
+      os.makedirs(os.path.join(b, 'd'))
+      self.assertEquals((a, 'a'), roslib.packages.get_dir_pkg(os.path.join(b, 'd')))
+
+      self.assertEquals(None, roslib.packages._find_marker_dir(c, ('stack.xml',)))
+      with open(os.path.join(d, 'stack.xml'), 'w') as f:
+        f.write('<stack/>')
+      self.assertEquals(d, roslib.packages._find_marker_dir(c, ('stack.xml',)))
+    finally:
+      shutil.rmtree(d)
     
 def get_roslib_path():
     return os.path.realpath(os.path.abspath(os.path.join(get_test_path(), '..')))
@@ -0,0 +1,85 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+class RoslibPkgIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_write_read_index(self):
+        from roslib.pkgindex import write_index, read_index, PackageIndex
+        filename = os.path.join(self.tmp, 'index')
+        pkg_dirs = dict([('pkg%s'%i, '/opt/ros/pkg%s'%i) for i in range(100)])
+        pkg_dirs['unicode_\u00fc'] = '/opt/ros/\u00fc'
+        write_index(filename, '/opt/ros', '/home/user/ros:/opt/ros', pkg_dirs)
+
+        index = read_index(filename, '/opt/ros', '/home/user/ros:/opt/ros')
+        try:
+            self.assertEquals(len(pkg_dirs), len(index))
+            for k, v in pkg_dirs.items():
+                self.assertEquals(v, index.get(k))
+            self.assertEquals(None, index.get('not_a_pkg'))
+            self.assertEquals(pkg_dirs, dict(index.items()))
+        finally:
+            index.close()
+
+        # environment must match
+        self.assertEquals(None, read_index(filename, '/opt/ros', '/opt/ros'))
+        self.assertEquals(None, read_index(filename, None, '/home/user/ros:/opt/ros'))
+
+        # unset variables are distinct from empty ones
+        write_index(filename, None, '', {})
+        index = read_index(filename, None, '')
+        self.assertEquals(0, len(index))
+        self.assertEquals(None, index.get('pkg0'))
+        index.close()
+        self.assertEquals(None, read_index(filename, '', ''))
+        # no temporary files are left behind
+        self.assertEquals(['index'], os.listdir(self.tmp))
+
+    def test_read_index_invalid(self):
+        from roslib.pkgindex import read_index
+        self.assertEquals(None, read_index(os.path.join(self.tmp, 'missing'), None, None))
+        for text in [b'', b'#ROS_ROOT=/opt/ros\n/opt/ros/foo\n', b'RLPI' + b'\xff' * 40]:
+            filename = os.path.join(self.tmp, 'index')
+            with open(filename, 'wb') as f:
+                f.write(text)
+            self.assertEquals(None, read_index(filename, None, None))
@@ -0,0 +1,138 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from .workspace import manifest, write
+
+class RoslibRdepindexTest(unittest.TestCase):
+
+    def setUp(self):
+        import roslib.rdepindex
+        self.tmp = tempfile.mkdtemp()
+        self.old_home = os.environ.get('ROS_HOME', None)
+        os.environ['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+        ws = self.ws = os.path.join(self.tmp, 'ws')
+        write(os.path.join(ws, 'a', 'manifest.xml'), manifest([], '<a plugin="a.xml"/>'))
+        write(os.path.join(ws, 'b', 'manifest.xml'), manifest(['a'], '<a plugin="b.xml"/><python path="b"/>'))
+        write(os.path.join(ws, 'c', 'manifest.xml'), manifest(['b'], '<a plugin="c.xml"/>'))
+        write(os.path.join(ws, 'd', 'package.xml'), '<package><name>d</name><run_depend>a</run_depend><run_depend>boost</run_depend>'
+               '<export><a plugin="d.xml"/></export></package>')
+        self.env = (ws, ws)
+        # count manifest reads
+        self.reads = []
+        self.read_manifest = roslib.rdepindex._read_manifest
+        def _read_manifest(path):
+            self.reads.append(path)
+            return self.read_manifest(path)
+        roslib.rdepindex._read_manifest = _read_manifest
+        roslib.rdepindex._indexes.clear()
+
+    def tearDown(self):
+        import roslib.rdepindex
+        roslib.rdepindex._read_manifest = self.read_manifest
+        roslib.rdepindex._indexes.clear()
+        if self.old_home is None:
+            os.environ.pop('ROS_HOME', None)
+        else:
+            os.environ['ROS_HOME'] = self.old_home
+        shutil.rmtree(self.tmp)
+
+    def _expire(self):
+        # as if VALIDATE_INTERVAL had passed
+        import roslib.rdepindex
+        roslib.rdepindex._indexes.peek(self.env).validated = None
+
+    def test_depends_on(self):
+        import roslib.depgraph
+        import roslib.rdepindex
+        self.assertEquals(['b', 'c', 'd'], roslib.rdepindex.depends_on('a', *self.env))
+        self.assertEquals(['b', 'd'], roslib.rdepindex.depends_on1('a', *self.env))
+        self.assertEquals([], roslib.rdepindex.depends_on('c', *self.env))
+        self.assertEquals(4, len(self.reads))
+        try:
+            roslib.rdepindex.depends_on('boost', *self.env)
+            self.fail("should have raised")
+        except roslib.depgraph.DependencyGraphException:
+            pass
+
+        # index is persisted, a new process does not read any manifest
+        roslib.rdepindex._indexes.clear()
+        del self.reads[:]
+        self.assertEquals(['b', 'c', 'd'], roslib.rdepindex.depends_on('a', *self.env))
+        self.assertEquals([], self.reads)
+
+        # only the changed manifest is read
+        time.sleep(0.01)
+        write(os.path.join(self.ws, 'c', 'manifest.xml'), manifest(['a', 'b']))
+        # not checked again within the interval
+        self.assertEquals(['b', 'd'], roslib.rdepindex.depends_on1('a', *self.env))
+        self.assertEquals([], self.reads)
+        self._expire()
+        self.assertEquals(['b', 'c', 'd'], roslib.rdepindex.depends_on1('a', *self.env))
+        self.assertEquals([os.path.join(self.ws, 'c', 'manifest.xml')], self.reads)
+
+        # removed packages are dropped
+        shutil.rmtree(os.path.join(self.ws, 'c'))
+        self._expire()
+        self.assertEquals(['b', 'd'], roslib.rdepindex.depends_on('a', *self.env))
+
+    def test_exports(self):
+        import roslib.rdepindex
+        self.assertEquals([('b', 'b')], roslib.rdepindex.get_exports('python', 'path', *self.env))
+        self.assertEquals([], roslib.rdepindex.get_exports('python', 'cpp', *self.env))
+        # c does not depend on a directly
+        self.assertEquals([('b', 'b.xml'), ('d', 'd.xml'), ('a', 'a.xml')],
+                          roslib.rdepindex.plugins('a', 'plugin', *self.env))
+
+        time.sleep(0.01)
+        write(os.path.join(self.ws, 'b', 'manifest.xml'), manifest(['a']))
+        self._expire()
+        self.assertEquals([], roslib.rdepindex.get_exports('python', 'path', *self.env))
+        self.assertEquals([('d', 'd.xml'), ('a', 'a.xml')], roslib.rdepindex.plugins('a', 'plugin', *self.env))
+
+    def test_graph(self):
+        import roslib.rdepindex
+        index = roslib.rdepindex.get_index(*self.env)
+        g = index.graph()
+        self.assert_(g is index.graph())
+        # updates replace the graph, queries on the old one are unaffected
+        write(os.path.join(self.ws, 'c', 'manifest.xml'), manifest(['a']))
+        index.update('c', os.path.join(self.ws, 'c'))
+        self.assert_(g is not index.graph())
+        self.assertEquals(['b', 'd'], g.depends_on1('a'))
+        self.assertEquals(['b', 'c', 'd'], index.depends_on1('a'))
@@ -0,0 +1,112 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .workspace import write
+
+class RoslibSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.env = {}
+        for k in ['ROS_ROOT', 'ROS_PACKAGE_PATH', 'ROS_HOME']:
+            self.env[k] = os.environ.get(k, None)
+        ws = self.ws = os.path.join(self.tmp, 'ws')
+        write(os.path.join(ws, 's1', 'stack.xml'), '<stack><version>1.2.3</version></stack>')
+        write(os.path.join(ws, 's1', 'a', 'manifest.xml'), '<package><description brief="a">A</description></package>')
+        write(os.path.join(ws, 's1', 'a', 'msg', 'Foo.msg'), 'int32 x\n')
+        write(os.path.join(ws, 's1', 'b', 'manifest.xml'), '<package><depend package="a"/></package>')
+        write(os.path.join(ws, 's1', 'b', 'srv', 'Bar.srv'), 'int32 x\n---\n')
+        os.environ['ROS_ROOT'] = os.path.join(ws, 's1')
+        os.environ['ROS_PACKAGE_PATH'] = ws
+        os.environ['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+
+    def tearDown(self):
+        import roslib.snapshot
+        roslib.snapshot.unload()
+        for k, v in self.env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        shutil.rmtree(self.tmp)
+
+    def test_snapshot(self):
+        import roslib.manifest
+        import roslib.msgs
+        import roslib.packages
+        import roslib.snapshot
+        import roslib.srvs
+        import roslib.stacks
+        filename = os.path.join(self.tmp, 'snapshot')
+        s = roslib.snapshot.write(filename, os.environ['ROS_ROOT'], os.environ['ROS_PACKAGE_PATH'])
+        self.assertEquals(['a', 'b'], sorted(s.packages.keys()))
+        self.assertEquals(['s1'], list(s.stacks.keys()))
+        self.assertEquals(3, len(s.manifests))
+
+        roslib.snapshot.load(filename)
+        self.assert_(roslib.snapshot.get_env_snapshot() is not None)
+        self.assert_(roslib.snapshot.get_env_snapshot({'ROS_ROOT': '/'}) is None)
+        # the snapshot is used without checking the file system
+        os.rename(self.ws, self.ws + '.moved')
+        try:
+            s1 = os.path.join(self.ws, 's1')
+            self.assertEquals(os.path.join(s1, 'a'), roslib.packages.get_pkg_dir('a'))
+            self.assertEquals(s1, roslib.stacks.get_stack_dir('s1'))
+            self.assertEquals(['s1'], roslib.stacks.list_stacks())
+            self.assertEquals('1.2.3', roslib.stacks.get_stack_version('s1'))
+            self.assertEquals('1.2.3', roslib.stacks.get_stack_version_by_dir(s1))
+            m = roslib.manifest.parse_file(os.path.join(s1, 'a', 'manifest.xml'))
+            self.assertEquals('a', m.brief)
+            self.assertEquals(['Foo'], roslib.msgs.list_msg_types('a', False))
+            self.assertEquals(['a/Foo'], roslib.msgs.list_msg_types('b', True))
+            self.assertEquals(['Bar'], roslib.srvs.list_srv_types('b', True))
+            try:
+                roslib.stacks.get_stack_dir('s2')
+                self.fail("should have raised")
+            except roslib.stacks.InvalidROSStackException:
+                pass
+        finally:
+            os.rename(self.ws + '.moved', self.ws)
+
+        # invalid snapshot files
+        write(filename, 'not a snapshot')
+        try:
+            roslib.snapshot.read(filename)
+            self.fail("should have raised")
+        except roslib.snapshot.SnapshotException:
+            pass
@@ -0,0 +1,172 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from .workspace import write
+
+MSG = """# comment
+Header header
+int32 x
+Point[] points
+string S=foo # bar
+float64 F = 1.5
+"""
+
+SRV = """int32 a
+int32 B=2
+---
+string result
+"""
+
+class RoslibSpeccacheTest(unittest.TestCase):
+
+    def setUp(self):
+        import roslib.msgs
+        import roslib.speccache
+        import roslib.srvs
+        self.tmp = tempfile.mkdtemp()
+        self.env = {}
+        for k in ['ROS_HOME', 'ROSLIB_NO_SPEC_CACHE']:
+            self.env[k] = os.environ.get(k, None)
+        os.environ['ROS_HOME'] = os.path.join(self.tmp, 'ros_home')
+        os.environ.pop('ROSLIB_NO_SPEC_CACHE', None)
+        roslib.speccache.clear()
+        # count parses
+        self.parses = []
+        self.load_funcs = (roslib.msgs.load_from_string, roslib.srvs.load_from_string)
+        def counting(fn):
+            def load_from_string(*args):
+                self.parses.append(args[0])
+                return fn(*args)
+            return load_from_string
+        roslib.msgs.load_from_string = counting(self.load_funcs[0])
+        roslib.srvs.load_from_string = counting(self.load_funcs[1])
+
+    def tearDown(self):
+        import roslib.msgs
+        import roslib.srvs
+        roslib.msgs.load_from_string, roslib.srvs.load_from_string = self.load_funcs
+        for k, v in self.env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        shutil.rmtree(self.tmp)
+
+    def _write(self, name, text):
+        return write(os.path.join(self.tmp, name), text)
+
+    def _fields(self, spec):
+        return (spec.types, spec.names, [(c.type, c.name, c.val, c.val_text) for c in spec.constants],
+                spec.text, spec.full_name, spec.short_name, spec.package, repr(spec.parsed_fields()))
+
+    def test_msg(self):
+        import roslib.msgs
+        import roslib.speccache
+        path = self._write('Foo.msg', MSG)
+        name, expected = roslib.msgs.load_from_file(path, 'foo_msgs')
+        self.assertEquals(1, len(self.parses))
+        # in-process and on-disk cache
+        for clear in [False, True]:
+            if clear:
+                roslib.speccache.clear()
+            n, spec = roslib.msgs.load_from_file(path, 'foo_msgs')
+            self.assertEquals(name, n)
+            self.assertEquals(self._fields(expected), self._fields(spec))
+            self.assertEquals(1, len(self.parses))
+        # package context is part of the key
+        n, spec = roslib.msgs.load_from_file(path, 'bar_msgs')
+        self.assertEquals('bar_msgs/Point[]', spec.types[2])
+        self.assertEquals(2, len(self.parses))
+
+        # errors are not cached
+        path = self._write('Bad.msg', 'int32 x\nint32 x\n')
+        for i in range(2):
+            try:
+                roslib.msgs.load_from_file(path, 'foo_msgs')
+                self.fail("should have raised")
+            except roslib.msgs.MsgSpecException:
+                pass
+        self.assertEquals(4, len(self.parses))
+
+    def test_msg_non_ascii(self):
+        import roslib.msgs
+        import roslib.speccache
+        path = os.path.join(self.tmp, 'Angle.msg')
+        with open(path, 'wb') as f:
+            f.write(b'# Winkel in \xc2\xb0\nfloat64 angle\n')
+        name, expected = roslib.msgs.load_from_file(path, 'foo_msgs')
+        roslib.speccache.clear()
+        n, spec = roslib.msgs.load_from_file(path, 'foo_msgs')
+        self.assertEquals(['float64'], spec.types)
+        self.assertEquals(1, len(self.parses))
+
+    def test_srv(self):
+        import roslib.speccache
+        import roslib.srvs
+        path = self._write('Foo.srv', SRV)
+        name, expected = roslib.srvs.load_from_file(path, 'foo_srvs')
+        roslib.speccache.clear()
+        n, spec = roslib.srvs.load_from_file(path, 'foo_srvs')
+        self.assertEquals(expected, spec)
+        for a, b in [(expected.request, spec.request), (expected.response, spec.response)]:
+            self.assertEquals(self._fields(a), self._fields(b))
+        self.assertEquals(1, len([p for p in self.parses if p == SRV]))
+
+    def test_no_cache(self):
+        import roslib.msgs
+        os.environ['ROSLIB_NO_SPEC_CACHE'] = '1'
+        path = self._write('Foo.msg', MSG)
+        roslib.msgs.load_from_file(path, 'foo_msgs')
+        roslib.msgs.load_from_file(path, 'foo_msgs')
+        self.assertEquals(2, len(self.parses))
+
+    def test_evict(self):
+        import roslib.speccache
+        for i in range(20):
+            roslib.speccache.put('msg', 'int32 x%s'%i, '', ([], [], []))
+        d = roslib.speccache.get_cache_dir()
+        # make the first entries the least recently used, except for x0
+        for i, name in enumerate(sorted(os.listdir(d))):
+            os.utime(os.path.join(d, name), (i, i))
+        roslib.speccache.clear()
+        roslib.speccache.get('msg', 'int32 x0', '')
+        roslib.speccache.evict(10)
+        self.assertEquals(9, len(os.listdir(d)))
+        roslib.speccache.clear()
+        self.assert_(roslib.speccache.get('msg', 'int32 x0', '') is not None)
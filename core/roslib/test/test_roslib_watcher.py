@@ -0,0 +1,148 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+class RoslibWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _touch(self, *args):
+        p = os.path.join(self.tmp, *args)
+        if not os.path.isdir(os.path.dirname(p)):
+            os.makedirs(os.path.dirname(p))
+        with open(p, 'w') as f:
+            f.write('<package/>')
+        return os.path.dirname(p)
+
+    def _test_watcher(self, watcher):
+        p1 = os.path.join(self.tmp, 'p1')
+        p2 = os.path.join(self.tmp, 'p2')
+        changes = []
+        watcher.add_listener(lambda packages, stacks: changes.append((packages, stacks)))
+        try:
+            self.assertEquals({'foo': os.path.join(p2, 'foo')}, watcher.packages)
+            self.failIf(watcher.poll())
+
+            # new package in new directory tree
+            bar = self._touch('p1', 'a', 'b', 'bar', 'manifest.xml')
+            self.assert_(watcher.poll(0.1))
+            self.assertEquals(bar, watcher.packages['bar'])
+            self.assertEquals([({'bar': bar}, {})], changes)
+
+            # higher-precedence package shadows existing one
+            foo = self._touch('p1', 'foo', 'manifest.xml')
+            self.assert_(watcher.poll(0.1))
+            self.assertEquals(foo, watcher.packages['foo'])
+
+            # removing it reveals the original package
+            os.remove(os.path.join(foo, 'manifest.xml'))
+            self.assert_(watcher.poll(0.1))
+            self.assertEquals(os.path.join(p2, 'foo'), watcher.packages['foo'])
+
+            # moved directory
+            os.rename(os.path.join(p1, 'a'), os.path.join(p1, 'c'))
+            self.assert_(watcher.poll(0.1))
+            self.assertEquals(os.path.join(p1, 'c', 'b', 'bar'), watcher.packages['bar'])
+
+            # stacks
+            s = self._touch('p2', 's', 'stack.xml')
+            self.assert_(watcher.poll(0.1))
+            self.assertEquals({'s': s}, watcher.stacks)
+            shutil.rmtree(s)
+            self.assert_(watcher.poll(0.1))
+            self.assertEquals({}, watcher.stacks)
+
+            # missing root is picked up once it is created
+            baz = self._touch('p3', 'baz', 'manifest.xml')
+            self.assert_(watcher.poll(0.1))
+            self.assertEquals(baz, watcher.packages['baz'])
+        finally:
+            watcher.stop()
+
+    def _create(self, cls):
+        self._touch('p2', 'foo', 'manifest.xml')
+        os.makedirs(os.path.join(self.tmp, 'p1'))
+        return cls([os.path.join(self.tmp, p) for p in ['p1', 'p2', 'p3']])
+
+    def test_watcher(self):
+        # the base class polls
+        from roslib.watcher import Watcher
+        self._test_watcher(self._create(Watcher))
+
+    def test_polling_watcher(self):
+        from roslib.watcher import PollingWatcher
+        self._test_watcher(self._create(PollingWatcher))
+
+    def test_inotify_watcher(self):
+        from roslib.watcher import InotifyWatcher
+        try:
+            watcher = self._create(InotifyWatcher)
+        except (OSError, AttributeError):
+            # inotify not available
+            return
+        self._test_watcher(watcher)
+
+    def test_watch(self):
+        import roslib.packages
+        import roslib.watcher
+        env = {'ROS_PACKAGE_PATH': self.tmp}
+        if 'ROS_ROOT' in os.environ:
+            env['ROS_ROOT'] = os.environ['ROS_ROOT']
+        watcher = roslib.watcher.watch(env=env, interval=0.1)
+        try:
+            self.assert_(watcher.running)
+            foo = self._touch('foo', 'manifest.xml')
+            # wait for background thread to pick up the change
+            for i in range(50):
+                if 'foo' in watcher.packages:
+                    break
+                time.sleep(0.1)
+            self.assertEquals(foo, roslib.packages.get_pkg_dir('foo', ros_package_path=self.tmp))
+
+            # watching again replaces the running watcher
+            old, watcher = watcher, roslib.watcher.watch(env=env, interval=0.1)
+            self.failIf(old.running)
+            self.assert_(watcher.running)
+            self.assertEquals(foo, roslib.packages.get_pkg_dir('foo', ros_package_path=self.tmp))
+        finally:
+            watcher.stop()
+        self.failIf(watcher.running)
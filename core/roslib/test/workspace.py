@@ -0,0 +1,91 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+"""
+Helpers for tests that need packages and stacks on disk.
+"""
+
+import os
+
+# msg/srv packages: app -> geo -> std_msgs
+MSG_FILES = {
+    'std_msgs/manifest.xml': '<package></package>\n',
+    'std_msgs/msg/Header.msg': 'uint32 seq\ntime stamp\nstring frame_id\n',
+    'geo/manifest.xml': '<package><depend package="std_msgs"/></package>\n',
+    'geo/msg/Point.msg': 'float64 x\nfloat64 y\n',
+    'geo/msg/Polygon.msg': 'Header header\nPoint[] points\ngeo/Point c\n',
+    'app/manifest.xml': '<package><depend package="geo"/></package>\n',
+    'app/msg/Shape.msg': 'geo/Polygon polygon\n',
+    'app/msg/Thing.msg': 'geo/Polygon p\nStatus s\n',
+    'app/msg/Status.msg': 'int8 OK=0\nint8 code\n',
+    'app/srv/Do.srv': 'Thing t\n---\nStatus s\n',
+    # does not declare its dependency on geo
+    'nodep/manifest.xml': '<package><depend package="std_msgs"/></package>\n',
+    'nodep/msg/Shape.msg': 'geo/Point center\n',
+}
+
+def write(path, text):
+    """
+    Write file, creating its directory if necessary.
+    @return: path
+    @rtype: str
+    """
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+def write_files(root, files):
+    """
+    @param files: file contents by path relative to root
+    @type  files: {str: str}
+    """
+    for name, text in files.items():
+        write(os.path.join(root, name), text)
+
+def manifest(depends, exports=''):
+    """
+    @return: manifest.xml with the specified dependencies and export tags
+    @rtype: str
+    """
+    return '<package>%s<export>%s</export></package>'%(
+        ''.join(['<depend package="%s"/>'%d for d in depends]), exports)
+
+def stack(depends):
+    """
+    @return: stack.xml with the specified dependencies
+    @rtype: str
+    """
+    return '<stack>%s</stack>'%''.join(['<depend stack="%s"/>'%d for d in depends])
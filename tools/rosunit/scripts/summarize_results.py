@@ -47,7 +47,7 @@ try:
 except ImportError:
     from io import StringIO
 
-import rospkg
+import roslib.rospack
 import rosunit.junitxml as junitxml
 
 def create_summary(result, packages):
@@ -97,11 +97,10 @@ def main():
         parser.error("Only one package may be specified")
     
     package = args[0]
-    r = rospkg.RosPack()
     if options.no_deps:
         packages = [package]
     else:
-        packages = [package] + r.get_depends_on(package, implicit=True)
+        packages = [package] + roslib.rospack.rospack_depends_on(package)
         packages = [p for p in packages if p]
 
     result = junitxml.read_all(packages)